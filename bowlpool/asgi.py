@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from bowlpool.handlers import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bowlpool.settings')
 
+# Under ASGI each request's sync database work runs in its own thread, so a
+# persistent connection would never be reused; see
+# https://docs.djangoproject.com/en/4.2/ref/databases/#persistent-connections
+os.environ.setdefault('BOWLPOOL_DB_CONN_MAX_AGE', '0')
+
 application = get_asgi_application()
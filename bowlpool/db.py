@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+
+@contextmanager
+def immediate_atomic(using=None):
+    """Like transaction.atomic(), but an outermost block takes SQLite's write lock
+    as it begins. Waiting for the lock up front, within the busy timeout, avoids
+    failing with "database is locked" when a read transaction later tries to write.
+    """
+
+    connection = transaction.get_connection(using)
+    connection.begin_immediate = True
+
+    try:
+        with transaction.atomic(using=using):
+            connection.begin_immediate = False
+            yield
+    finally:
+        connection.begin_immediate = False
+
+
+def retry_on_locked(func, attempts=None, backoff=0.05):
+    """Call func, retrying with exponential backoff while the database is locked
+    for longer than the busy timeout
+    :param attempts: Defaults to settings.BOWLPOOL_DB_LOCK_ATTEMPTS
+    """
+
+    if attempts is None:
+        attempts = settings.BOWLPOOL_DB_LOCK_ATTEMPTS
+
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as e:
+            if "database is locked" not in str(e) or attempt == attempts - 1:
+                raise
+
+            time.sleep(backoff * 2**attempt)
@@ -0,0 +1,34 @@
+"""
+ASGI handler that serves async versions of views where they exist.
+
+Give a view an async counterpart with with_async_view in a URLconf. The WSGI
+handler keeps calling the view itself, so both servers can run from one URLconf.
+"""
+
+import django
+from django.core.handlers import asgi
+
+
+def with_async_view(view, async_view):
+    view.async_view = async_view
+    return view
+
+
+class AsyncViewsMixin:
+    def resolve_request(self, request):
+        resolver_match = super().resolve_request(request)
+        resolver_match.func = getattr(
+            resolver_match.func, "async_view", resolver_match.func
+        )
+        return resolver_match
+
+
+class ASGIHandler(AsyncViewsMixin, asgi.ASGIHandler):
+    pass
+
+
+def get_asgi_application():
+    """django.core.asgi.get_asgi_application, with the handler above"""
+
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """The stock PBKDF2 hasher, with settings.BOWLPOOL_PASSWORD_ITERATIONS iterations.
+    A password hashed with a different count is rehashed with this one the next
+    time its user logs in. "manage.py benchmark_auth" times a few counts."""
+
+    @property
+    def iterations(self):
+        return settings.BOWLPOOL_PASSWORD_ITERATIONS
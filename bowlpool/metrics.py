@@ -0,0 +1,274 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+bowlpool.middleware.MetricsMiddleware records every request into histograms
+labelled with the URL name. Each worker process keeps its own histograms, so when
+BOWLPOOL_METRICS_DIR is set every worker also saves them there as <pid>.json, and
+the metrics view adds up the files of all workers. A file whose worker process is
+no longer running is removed, and Prometheus reads the drop in totals as a counter
+reset; an idle worker's file stays, however long ago it was saved. The workers must
+share a PID namespace with the process serving the metrics view.
+"""
+
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+
+SECONDS_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+BYTES_BUCKETS = [1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000]
+
+# name: (help, buckets)
+METRICS = {
+    "bowlpool_request_duration_seconds": (
+        "Time to produce the response, including any streamed body",
+        SECONDS_BUCKETS,
+    ),
+    "bowlpool_db_queries": ("SQL queries per request", QUERY_COUNT_BUCKETS),
+    "bowlpool_db_duration_seconds": (
+        "Time spent in SQL queries per request, including lock waits",
+        SECONDS_BUCKETS,
+    ),
+    "bowlpool_template_render_seconds": (
+        "Time spent rendering templates per request",
+        SECONDS_BUCKETS,
+    ),
+    "bowlpool_response_size_bytes": ("Response body size", BYTES_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets, counts=None, total=0.0):
+        self.buckets = buckets
+        # one count per bucket, plus the +Inf bucket; not cumulative
+        self.counts = counts or [0] * (len(buckets) + 1)
+        self.total = total
+
+    def observe(self, value):
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                break
+        else:
+            i = len(self.buckets)
+
+        self.counts[i] += 1
+        self.total += value
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+
+class RequestMetrics:
+    """What one request has spent so far, collected while it runs"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def __call__(self, execute, sql, params, many, context):
+        """A database execute wrapper counting and timing every query"""
+
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+# The metrics of the request being handled, if any
+current_request = ContextVar("current_request", default=None)
+
+_histograms = {}
+_lock = threading.Lock()
+_last_saved = 0.0
+
+
+def observe(name, view_name, value):
+    with _lock:
+        histogram = _histograms.get((name, view_name))
+
+        if histogram is None:
+            histogram = _histograms[(name, view_name)] = Histogram(METRICS[name][1])
+
+        histogram.observe(value)
+
+
+def record_request(view_name, request_metrics, response_size):
+    observe("bowlpool_request_duration_seconds", view_name, request_metrics.elapsed())
+    observe("bowlpool_db_queries", view_name, request_metrics.queries)
+    observe("bowlpool_db_duration_seconds", view_name, request_metrics.db_time)
+    observe(
+        "bowlpool_template_render_seconds", view_name, request_metrics.template_time
+    )
+    observe("bowlpool_response_size_bytes", view_name, response_size)
+
+    if settings.BOWLPOOL_METRICS_DIR:
+        save_if_due()
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """This process's histograms, as JSON-serializable data"""
+
+    with _lock:
+        return [
+            {
+                "name": name,
+                "view": view_name,
+                "counts": list(histogram.counts),
+                "total": histogram.total,
+            }
+            for (name, view_name), histogram in _histograms.items()
+        ]
+
+
+def save_if_due():
+    global _last_saved
+
+    now = time.monotonic()
+
+    if now - _last_saved < settings.BOWLPOOL_METRICS_SAVE_INTERVAL:
+        return
+
+    _last_saved = now
+    save(settings.BOWLPOOL_METRICS_DIR)
+
+
+def save(metrics_dir):
+    metrics_dir = Path(metrics_dir)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+
+    # write then rename, so readers never see a half-written file
+    path = metrics_dir / f"{os.getpid()}.json"
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(snapshot()))
+    os.replace(temp_path, path)
+
+
+def merge(snapshots):
+    """Add up the histograms of several snapshots
+    :return: A dict of (metric name, view name) to Histogram
+    """
+
+    merged = {}
+
+    for entries in snapshots:
+        for entry in entries:
+            if entry["name"] not in METRICS:
+                continue
+
+            histogram = Histogram(
+                METRICS[entry["name"]][1], entry["counts"], entry["total"]
+            )
+            key = (entry["name"], entry["view"])
+
+            if key in merged:
+                merged[key].merge(histogram)
+            else:
+                merged[key] = histogram
+
+    return merged
+
+
+def _worker_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running, as another user
+        return True
+
+    return True
+
+
+def load_snapshots(metrics_dir):
+    """Every saved worker snapshot, with this process's replaced by its live data.
+    Removes the files of workers that have gone."""
+
+    snapshots = [snapshot()]
+
+    for path in Path(metrics_dir).glob("*.json"):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+
+        if pid == os.getpid():
+            continue
+
+        try:
+            if not _worker_running(pid):
+                path.unlink(missing_ok=True)
+                continue
+
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # a worker may be replacing its file right now; skip it this time
+            continue
+
+    return snapshots
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(histograms):
+    lines = []
+
+    for name, (help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+
+        for (metric_name, view_name), histogram in sorted(histograms.items()):
+            if metric_name != name:
+                continue
+
+            labels = f'view="{view_name}"'
+            cumulative = 0
+
+            for upper_bound, count in zip(buckets + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{upper_bound}"}} {cumulative}'
+                )
+
+            lines.append(f"{name}_sum{{{labels}}} {_format_value(histogram.total)}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+    return "\n".join(lines) + "\n"
+
+
+@staff_member_required
+def metrics(request):
+    """Request metrics for every worker, in the Prometheus text format"""
+
+    if settings.BOWLPOOL_METRICS_DIR:
+        snapshots = load_snapshots(settings.BOWLPOOL_METRICS_DIR)
+    else:
+        snapshots = [snapshot()]
+
+    return HttpResponse(
+        render_prometheus(merge(snapshots)),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,149 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+
+def _record_query(execute, sql, params, many, context):
+    """A database execute wrapper passing each query to the current request's
+    metrics, if any"""
+
+    request_metrics = metrics.current_request.get()
+
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+
+    return request_metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Record the queries of every connection, including those of pool databases
+    registered part way through a request"""
+
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _install_query_recorders():
+    # for connections opened before this module was imported
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(None, connection)
+
+
+class MetricsMiddleware:
+    """Record each request's SQL queries, template rendering and response size
+    into bowlpool.metrics, and report them in a Server-Timing header.
+
+    Streamed bodies are produced after the headers are sent, so their queries and
+    size are recorded but can't be part of the header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+
+        try:
+            _install_query_recorders()
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+
+        return self.process_response(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+
+        try:
+            # connections belong to the thread that runs the request's sync code,
+            # so the recorders have to be installed from there
+            await sync_to_async(_install_query_recorders)()
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+
+        return self.process_response(request, response, request_metrics)
+
+    def process_response(self, request, response, request_metrics):
+        match = request.resolver_match
+        view_name = match.view_name if match else "unmatched"
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f"db;dur={request_metrics.db_time * 1000:.1f};"
+                f'desc="{request_metrics.queries} queries"',
+                f"tpl;dur={request_metrics.template_time * 1000:.1f}",
+                f"app;dur={request_metrics.elapsed() * 1000:.1f}",
+            ]
+        )
+
+        if not response.streaming:
+            metrics.record_request(view_name, request_metrics, len(response.content))
+        elif response.is_async:
+            response.streaming_content = self._measure_async_stream(
+                response.streaming_content, view_name, request_metrics
+            )
+        else:
+            response.streaming_content = self._measure_stream(
+                response.streaming_content, view_name, request_metrics
+            )
+
+        return response
+
+    @staticmethod
+    def _measure_stream(streaming_content, view_name, request_metrics):
+        size = 0
+        chunks = iter(streaming_content)
+
+        while True:
+            token = metrics.current_request.set(request_metrics)
+
+            try:
+                chunk = next(chunks, None)
+            finally:
+                metrics.current_request.reset(token)
+
+            if chunk is None:
+                break
+
+            size += len(chunk)
+            yield chunk
+
+        metrics.record_request(view_name, request_metrics, size)
+
+    @staticmethod
+    async def _measure_async_stream(streaming_content, view_name, request_metrics):
+        size = 0
+        chunks = aiter(streaming_content)
+
+        while True:
+            # the stream's sync_to_async calls copy this context, with its metrics
+            token = metrics.current_request.set(request_metrics)
+
+            try:
+                chunk = await anext(chunks, None)
+            finally:
+                metrics.current_request.reset(token)
+
+            if chunk is None:
+                break
+
+            size += len(chunk)
+            yield chunk
+
+        metrics.record_request(view_name, request_metrics, size)
@@ -20,27 +20,66 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timings cover the rest of the stack
+    "bowlpool.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "bowlpool_app.pools.PoolMiddleware",
+    "bowlpool_app.replicas.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 AUTHENTICATION_BACKENDS = [
+    "bowlpool_app.backends.CachedModelBackend",
+    # only loads the users of sessions that logged in before the backend above
     "django.contrib.auth.backends.ModelBackend",
 ]
 
+# Seconds each worker keeps a logged-in user after loading them; 0 to load them on
+# every request. See bowlpool_app.backends.
+BOWLPOOL_USER_CACHE_SECONDS = int(os.environ.get("BOWLPOOL_USER_CACHE_SECONDS", 30))
+
+# Sessions are read from the cache, and from the database only when the cache
+# doesn't have them
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+PASSWORD_HASHERS = [
+    "bowlpool.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# PBKDF2 iterations for new password hashes; Django 4.2's default is 600000. Each
+# login and registration spends this long hashing. See bowlpool.hashers.
+BOWLPOOL_PASSWORD_ITERATIONS = int(
+    os.environ.get("BOWLPOOL_PASSWORD_ITERATIONS", 600000)
+)
+
 ROOT_URLCONF = "bowlpool.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # the stock backend, timing renders for bowlpool.metrics
+        "BACKEND": "bowlpool.template_backend.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # templates are compiled once per process, even with DEBUG on; restart
+            # the server to pick up template changes
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -57,13 +96,154 @@ WSGI_APPLICATION = "bowlpool.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# WAL lets readers carry on while a pick submission writes, and the busy timeout
+# (in seconds) makes writers queue for the lock instead of failing right away.
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "bowlpool.sqlite_backend",
         "NAME": os.environ.get("BOWLPOOL_DB_PATH", BASE_DIR / "db.sqlite3"),
+        "CONN_MAX_AGE": int(os.environ.get("BOWLPOOL_DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": float(os.environ.get("BOWLPOOL_DB_BUSY_TIMEOUT", 20)),
+            "pragmas": {
+                "journal_mode": os.environ.get("BOWLPOOL_DB_JOURNAL_MODE", "WAL"),
+                "synchronous": os.environ.get("BOWLPOOL_DB_SYNCHRONOUS", "NORMAL"),
+                # negative sizes are in KiB
+                "cache_size": int(os.environ.get("BOWLPOOL_DB_CACHE_SIZE", -16000)),
+            },
+        },
+    }
+}
+
+# Pools other than the default one each keep their data in their own SQLite file
+# in BOWLPOOL_POOL_DB_DIR, with the default database's settings otherwise; see
+# bowlpool_app.pools. Create a pool's file with "manage.py migrate_pools".
+
+BOWLPOOL_POOL_DB_DIR = os.environ.get("BOWLPOOL_POOL_DB_DIR", BASE_DIR / "pools")
+
+# Read-only views read from the "replica" database; see bowlpool_app.replicas. It's a
+# read-only connection to the default database's file, or with
+# BOWLPOOL_DB_REPLICA_PATH set, to a copy of it kept up to date by
+# "manage.py sync_replica". Set BOWLPOOL_DB_REPLICA_READS=0 to read from the primary.
+# After writing, a user reads from the primary for BOWLPOOL_DB_REPLICA_STICKY_SECONDS,
+# which should outlast the copy's sync interval.
+
+BOWLPOOL_DB_REPLICA_PATH = os.environ.get("BOWLPOOL_DB_REPLICA_PATH")
+BOWLPOOL_DB_REPLICA_READS = os.environ.get("BOWLPOOL_DB_REPLICA_READS", "1") != "0"
+BOWLPOOL_DB_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("BOWLPOOL_DB_REPLICA_STICKY_SECONDS", 30)
+)
+
+DATABASES["replica"] = {
+    **DATABASES["default"],
+    "NAME": Path(BOWLPOOL_DB_REPLICA_PATH or DATABASES["default"]["NAME"])
+    .resolve()
+    .as_uri()
+    + "?mode=ro",
+    "OPTIONS": {
+        **DATABASES["default"]["OPTIONS"],
+        "pragmas": {
+            "query_only": 1,
+            "cache_size": DATABASES["default"]["OPTIONS"]["pragmas"]["cache_size"],
+        },
+    },
+    "TEST": {"MIRROR": "default"},
+}
+
+DATABASE_ROUTERS = [
+    "bowlpool_app.routers.ReplicaRouter",
+    "bowlpool_app.routers.PoolRouter",
+]
+
+# Times bowlpool.db.retry_on_locked tries a write that outlasts the busy timeout
+BOWLPOOL_DB_LOCK_ATTEMPTS = int(os.environ.get("BOWLPOOL_DB_LOCK_ATTEMPTS", 3))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# BOWLPOOL_CACHE_BACKEND is "locmem" (per process), "file" (shared by the workers on
+# one machine) or "redis" (any Redis-compatible server). Cached pages are keyed by
+# per-year versions stored in the database, so every backend stays consistent.
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+}
+
+CACHE_BACKEND = os.environ.get("BOWLPOOL_CACHE_BACKEND", "locmem")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND],
+        "LOCATION": os.environ.get(
+            "BOWLPOOL_CACHE_LOCATION",
+            {
+                "locmem": "bowlpool",
+                "file": BASE_DIR / "cache",
+                "redis": "redis://127.0.0.1:6379",
+            }[CACHE_BACKEND],
+        ),
+        "TIMEOUT": int(os.environ.get("BOWLPOOL_CACHE_TIMEOUT", 24 * 60 * 60)),
     }
 }
 
+if CACHE_BACKEND != "redis":
+    # bound the size; Redis is bounded by its own maxmemory policy instead
+    CACHES["default"]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.environ.get("BOWLPOOL_CACHE_MAX_ENTRIES", 2000)),
+    }
+
+
+# Metrics
+# Each worker keeps its own request metrics. With BOWLPOOL_METRICS_DIR set, workers
+# save them there at most every BOWLPOOL_METRICS_SAVE_INTERVAL seconds, and /metrics
+# reports the sum over all workers, removing the files of workers that are no longer
+# running.
+
+BOWLPOOL_METRICS_DIR = os.environ.get("BOWLPOOL_METRICS_DIR")
+BOWLPOOL_METRICS_SAVE_INTERVAL = float(
+    os.environ.get("BOWLPOOL_METRICS_SAVE_INTERVAL", 10)
+)
+
+
+# Pick queue
+# With BOWLPOOL_PICK_QUEUE_PATH set, validated pick submissions are appended to a
+# SQLite file there instead of being saved right away, and "manage.py
+# drain_pick_queue" must be running to save them; see bowlpool_app.pick_queue.
+
+BOWLPOOL_PICK_QUEUE_PATH = os.environ.get("BOWLPOOL_PICK_QUEUE_PATH")
+
+
+# Warmup
+# Unless BOWLPOOL_WARMUP is "0", the WSGI entry points run bowlpool.warmup as the
+# application loads, so a new worker's first request isn't slower than the rest.
+
+BOWLPOOL_WARMUP = os.environ.get("BOWLPOOL_WARMUP", "1") != "0"
+
+
+# Live updates
+# Under ASGI, pages stream a year's updates: the stream checks for them every
+# BOWLPOOL_EVENTS_POLL_INTERVAL seconds and ends after BOWLPOOL_EVENTS_STREAM_SECONDS,
+# when the browser reconnects where it left off. Under WSGI, where each open stream
+# would hold a worker, pages poll for them every BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS
+# instead, and the stream's URL sends a single batch. Updates are kept for BOWLPOOL_EVENTS_KEEP_SECONDS for clients to catch up.
+
+BOWLPOOL_EVENTS_POLL_INTERVAL = float(
+    os.environ.get("BOWLPOOL_EVENTS_POLL_INTERVAL", 2)
+)
+BOWLPOOL_EVENTS_STREAM_SECONDS = float(
+    os.environ.get("BOWLPOOL_EVENTS_STREAM_SECONDS", 55)
+)
+BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS = float(
+    os.environ.get("BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS", 30)
+)
+BOWLPOOL_EVENTS_KEEP_SECONDS = float(
+    os.environ.get("BOWLPOOL_EVENTS_KEEP_SECONDS", 3600)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -107,6 +287,15 @@ STATICFILES_DIRS = [
 if Path("/home/peteraar/").exists():
     STATICFILES_DIRS.append("/home/peteraar/bowlpool.peter-aarestad.com/static")
 
+# collectstatic writes content-hashed copies of every file here, with precompressed
+# variants, for bowlpool.static to serve in front of Django
+STATIC_ROOT = os.environ.get("BOWLPOOL_STATIC_ROOT", BASE_DIR / "static_collected")
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "bowlpool.storage.CompressedManifestStaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,40 @@
+"""
+SQLite backend tuned for many readers and short bursts of writers.
+
+On top of the stock sqlite3 backend it accepts two extra OPTIONS:
+
+- "pragmas": a dict of PRAGMAs, such as journal_mode and synchronous, run on
+  every new connection
+- "transaction_mode": "IMMEDIATE" to take the write lock as soon as any
+  transaction begins, rather than only inside bowlpool.db.immediate_atomic
+"""
+
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # set by bowlpool.db.immediate_atomic for the transaction it's about to begin
+    begin_immediate = False
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pragmas", None)
+        conn_params.pop("transaction_mode", None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+
+        for pragma, value in self.settings_dict["OPTIONS"].get("pragmas", {}).items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if (
+            self.begin_immediate
+            or self.settings_dict["OPTIONS"].get("transaction_mode") == "IMMEDIATE"
+        ):
+            self.cursor().execute("BEGIN IMMEDIATE")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,192 @@
+"""
+A WSGI layer that serves collected static files before a request reaches Django.
+
+Files are indexed once, when the application starts, from STATIC_ROOT as written by
+collectstatic with bowlpool.storage.CompressedManifestStaticFilesStorage. Hashed
+names never change content, so they are served with a year-long immutable
+Cache-Control; anything else gets a short one. Browsers that accept them get the
+precompressed brotli or gzip variant.
+"""
+
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+from django.conf import settings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SHORT_CACHE_CONTROL = "public, max-age=300"
+
+# preferred first
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+class StaticFile:
+    __slots__ = ["path", "size", "headers", "etag", "variants"]
+
+    def __init__(self, path, size, headers, etag, variants):
+        self.path = path
+        self.size = size
+        self.headers = headers
+        self.etag = etag
+        # encoding to (path, size)
+        self.variants = variants
+
+
+def _read_chunks(f, chunk_size=64 * 1024):
+    with f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def _index_static_root(static_root, static_url):
+    manifest_path = static_root / "staticfiles.json"
+    hashed_names = set()
+
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            hashed_names.update(json.load(f)["paths"].values())
+
+    files = {}
+
+    for dirpath, _, filenames in os.walk(static_root):
+        for filename in filenames:
+            if filename.endswith((".gz", ".br")):
+                continue
+
+            path = Path(dirpath) / filename
+            name = path.relative_to(static_root).as_posix()
+            stat = path.stat()
+
+            content_type, _ = mimetypes.guess_type(filename)
+
+            if content_type is None:
+                content_type = "application/octet-stream"
+            elif content_type.startswith("text/") or content_type in (
+                "application/javascript",
+                "application/json",
+                "image/svg+xml",
+            ):
+                content_type += "; charset=utf-8"
+
+            variants = {
+                encoding: (variant_path, variant_path.stat().st_size)
+                for encoding, extension in ENCODINGS
+                for variant_path in [path.with_name(filename + extension)]
+                if variant_path.exists()
+            }
+
+            # weak, since the compressed variants share it
+            etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+            headers = [
+                ("Content-Type", content_type),
+                ("Last-Modified", formatdate(stat.st_mtime, usegmt=True)),
+                ("ETag", etag),
+                (
+                    "Cache-Control",
+                    (
+                        IMMUTABLE_CACHE_CONTROL
+                        if name in hashed_names
+                        else SHORT_CACHE_CONTROL
+                    ),
+                ),
+            ]
+
+            if variants:
+                headers.append(("Vary", "Accept-Encoding"))
+
+            files[static_url + name] = StaticFile(
+                path, stat.st_size, headers, etag, variants
+            )
+
+    return files
+
+
+def _accepted_encodings(accept_encoding):
+    """The ENCODINGS an Accept-Encoding header allows: those listed, or covered by
+    "*", with a quality above zero"""
+
+    qualities = {}
+
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+
+        if not coding:
+            continue
+
+        quality = 1.0
+
+        for param in params:
+            name, _, value = param.partition("=")
+
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[coding.lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+
+    return {
+        encoding for encoding, _ in ENCODINGS if qualities.get(encoding, wildcard) > 0
+    }
+
+
+class StaticFilesMiddleware:
+    """Serve GET and HEAD requests for files in STATIC_ROOT, passing every other
+    request on to the wrapped application"""
+
+    def __init__(self, application, static_root=None, static_url=None):
+        self.application = application
+
+        static_root = static_root or settings.STATIC_ROOT
+        static_url = static_url or settings.STATIC_URL
+
+        # the index is empty until collectstatic has run, so everything falls
+        # through to Django as before
+        self.files = (
+            _index_static_root(Path(static_root), "/" + static_url.strip("/") + "/")
+            if static_root and Path(static_root).is_dir()
+            else {}
+        )
+
+    def __call__(self, environ, start_response):
+        static_file = self.files.get(environ.get("PATH_INFO", ""))
+
+        if static_file is None or environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return self.application(environ, start_response)
+
+        headers = list(static_file.headers)
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH", "")
+
+        if static_file.etag in [e.strip() for e in if_none_match.split(",")]:
+            start_response("304 Not Modified", headers)
+            return []
+
+        path, size = static_file.path, static_file.size
+        accepted = _accepted_encodings(environ.get("HTTP_ACCEPT_ENCODING", ""))
+
+        for encoding, _ in ENCODINGS:
+            if encoding in static_file.variants and encoding in accepted:
+                path, size = static_file.variants[encoding]
+                headers.append(("Content-Encoding", encoding))
+                break
+
+        headers.append(("Content-Length", str(size)))
+        start_response("200 OK", headers)
+
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+
+        f = open(path, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper")
+
+        if file_wrapper is not None:
+            return file_wrapper(f)
+
+        return _read_chunks(f)
@@ -0,0 +1,61 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".json", ".map", ".svg", ".txt", ".html")
+
+# variants smaller than this fraction of the original aren't worth serving
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def _compressors():
+    yield ".gz", lambda content: gzip.compress(content, compresslevel=9, mtime=0)
+
+    if brotli is not None:
+        yield ".br", lambda content: brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz (and, with brotli installed,
+    .br) variants of each hashed text file for bowlpool.static to serve.
+
+    Until collectstatic has written a manifest, as in development and tests, files are
+    referred to by their plain names instead of raising for missing manifest entries.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+
+        if dry_run:
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._compress(hashed_name)
+
+    def _compress(self, name):
+        with self.open(name) as f:
+            content = f.read()
+
+        for extension, compress in _compressors():
+            compressed = compress(content)
+
+            if len(compressed) >= len(content) * MIN_COMPRESSION_RATIO:
+                continue
+
+            if self.exists(name + extension):
+                self.delete(name + extension)
+
+            self._save(name + extension, ContentFile(compressed))
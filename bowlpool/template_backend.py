@@ -0,0 +1,34 @@
+"""
+Django template backend that adds the time spent rendering to the current
+request's bowlpool.metrics.RequestMetrics.
+"""
+
+import time
+
+from django.template.backends import django
+
+from . import metrics
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        request_metrics = metrics.current_request.get()
+
+        if request_metrics is None:
+            return super().render(context, request)
+
+        start = time.perf_counter()
+
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, template.backend)
@@ -4,13 +4,12 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
 
-urlpatterns = (
-    [
-        path("admin/", admin.site.urls),
-        path("bowl-pool/", include("bowlpool_app.urls")),
-        path("accounts/", include("django.contrib.auth.urls")),
-        path("", RedirectView.as_view(url="bowl-pool/")),
-    ]
-    + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-)
+from .metrics import metrics
+
+urlpatterns = [
+    path("admin/", admin.site.urls),
+    path("bowl-pool/", include("bowlpool_app.urls")),
+    path("accounts/", include("django.contrib.auth.urls")),
+    path("metrics", metrics, name="metrics"),
+    path("", RedirectView.as_view(url="bowl-pool/")),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
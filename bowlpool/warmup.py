@@ -0,0 +1,85 @@
+"""
+Work a new worker process would otherwise do on its first request, done instead
+when the application is loaded.
+
+Passenger starts workers as traffic grows, so without this the first requests to
+each new worker pay for compiling templates, populating the URL resolver and
+importing the session engine and auth backends.
+
+It doesn't open the database: Passenger may load the application once and fork its
+workers from that process, and a forked worker mustn't share its parent's SQLite
+connections.
+"""
+
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_backends, get_user_model
+from django.contrib.auth.hashers import get_hashers
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+
+def _app_templates():
+    templates_dir = Path(apps.get_app_config("bowlpool_app").path) / "templates"
+
+    return sorted(
+        path.relative_to(templates_dir).as_posix()
+        for path in templates_dir.rglob("*.html")
+    )
+
+
+def load_templates():
+    """Compile every bowlpool_app template into the engine's cached loader, which
+    also imports the template tag libraries they load"""
+
+    for template_name in _app_templates():
+        get_template(template_name)
+
+
+def load_urls():
+    resolver = get_resolver()
+    # reverse_dict populates the resolver, and every resolver it includes
+    resolver.reverse_dict
+
+
+def load_auth():
+    import_module(settings.SESSION_ENGINE)
+    get_user_model()
+    get_backends()
+    get_hashers()
+
+
+STEPS = [
+    ("templates", load_templates),
+    ("urls", load_urls),
+    ("auth", load_auth),
+]
+
+
+def warmup():
+    """Run every warmup step
+    :return: Each step's name and time taken, in seconds
+    """
+
+    timings = {}
+
+    for name, step in STEPS:
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+
+    return timings
+
+
+def warmup_application(application):
+    """Warm up, if settings.BOWLPOOL_WARMUP is set, then return the application
+    unchanged, so it can wrap get_wsgi_application() in a WSGI entry point"""
+
+    if settings.BOWLPOOL_WARMUP:
+        warmup()
+
+    return application
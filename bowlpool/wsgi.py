@@ -11,6 +11,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from bowlpool.static import StaticFilesMiddleware
+from bowlpool.warmup import warmup_application
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bowlpool.settings')
 
-application = get_wsgi_application()
+application = StaticFilesMiddleware(warmup_application(get_wsgi_application()))
@@ -1,8 +1,213 @@
-from django.contrib import admin
-from .models import User, Team, BowlGame, BowlMatchup, BowlMatchupPick
-
-admin.site.register(Team)
-admin.site.register(BowlGame)
-admin.site.register(BowlMatchup)
-admin.site.register(BowlMatchupPick)
-admin.site.register(User)
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from .forms import SeasonImportForm
+from .models import (
+    User,
+    Pool,
+    PoolMembership,
+    Team,
+    BowlGame,
+    BowlMatchup,
+    BowlMatchupPick,
+)
+from .pools import select_shared
+from .season_import import import_season
+
+
+class BowlMatchupFilter(admin.SimpleListFilter):
+    """Filter by matchup, offering only the selected year's matchups once a year is
+    chosen. The stock related-field filter lists every matchup by its __str__, a
+    query or more for each one."""
+
+    title = "matchup"
+    parameter_name = "bowl_matchup"
+    year_parameter_name = "bowl_matchup__bowl_year"
+
+    def lookups(self, request, model_admin):
+        matchups = BowlMatchup.objects.select_related("bowl_game").order_by(
+            "-bowl_year", "start_time"
+        )
+        bowl_year = request.GET.get(self.year_parameter_name)
+
+        if bowl_year and bowl_year.isdigit():
+            matchups = matchups.filter(bowl_year=bowl_year)
+
+        return [(m.id, f"[{m.bowl_year}] {m.bowl_game}") for m in matchups]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(bowl_matchup=self.value())
+
+        return queryset
+
+
+class TeamAdmin(admin.ModelAdmin):
+    list_display = ["name", "abbreviation"]
+    search_fields = ["name", "abbreviation"]
+
+
+class BowlGameAdmin(admin.ModelAdmin):
+    search_fields = ["name"]
+
+
+class UserAdmin(admin.ModelAdmin):
+    list_display = ["email", "first_name", "last_name", "is_staff", "is_active"]
+    list_filter = ["is_staff", "is_active"]
+    search_fields = ["email", "first_name", "last_name"]
+
+
+class BowlMatchupAdmin(admin.ModelAdmin):
+    list_display = [
+        "bowl_game",
+        "bowl_year",
+        "start_time",
+        "away_team",
+        "home_team",
+        "home_team_point_spread",
+        "point_spread_extra_half",
+        "away_team_final_score",
+        "home_team_final_score",
+    ]
+    # score entry for a whole night of games in one save
+    list_editable = [
+        "home_team_point_spread",
+        "point_spread_extra_half",
+        "away_team_final_score",
+        "home_team_final_score",
+    ]
+    list_filter = ["bowl_year", "cfp_playoff_game"]
+    search_fields = ["bowl_game__name", "away_team__name", "home_team__name"]
+    autocomplete_fields = ["bowl_game", "away_team", "home_team"]
+
+    def get_queryset(self, request):
+        # __str__ shows the bowl game and both teams, in the changelist and in
+        # autocomplete results for picks
+        return select_shared(
+            super().get_queryset(request).select_related("bowl_game"),
+            "away_team",
+            "home_team",
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if queryset.db == DEFAULT_DB_ALIAS:
+            return super().get_search_results(request, queryset, search_term)
+
+        # another pool's matchups can't be joined to teams, so search the teams first
+        teams, _ = TeamAdmin(Team, self.admin_site).get_search_results(
+            request, Team.objects.all(), search_term
+        )
+        team_ids = list(teams.values_list("id", flat=True))
+
+        return (
+            queryset.filter(
+                Q(bowl_game__name__icontains=search_term)
+                | Q(away_team__in=team_ids)
+                | Q(home_team__in=team_ids)
+            ),
+            False,
+        )
+
+    def get_urls(self):
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_season_view),
+                name="bowlpool_app_bowlmatchup_import",
+            )
+        ] + super().get_urls()
+
+    def import_season_view(self, request):
+        """Upload a season file to create or update a year's matchups at once"""
+
+        if not self.has_add_permission(request) or not self.has_change_permission(
+            request
+        ):
+            raise PermissionDenied
+
+        form = SeasonImportForm(request.POST or None, request.FILES or None)
+
+        if request.method == "POST" and form.is_valid():
+            report = import_season(
+                form.cleaned_data["bowl_year"],
+                form.cleaned_data["season_file"],
+                form.cleaned_data["dry_run"],
+            )
+
+            level = messages.ERROR if report.errors else messages.SUCCESS
+
+            for line in report.lines():
+                self.message_user(request, line, level)
+
+            if not report.errors and not form.cleaned_data["dry_run"]:
+                return HttpResponseRedirect(
+                    reverse("admin:bowlpool_app_bowlmatchup_changelist")
+                )
+
+        return TemplateResponse(
+            request,
+            "admin/bowlpool_app/bowlmatchup/import_season.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": "Import season",
+                "form": form,
+            },
+        )
+
+
+class BowlMatchupPickAdmin(admin.ModelAdmin):
+    list_display = ["user", "bowl_matchup", "winner", "margin"]
+    list_filter = ["bowl_matchup__bowl_year", BowlMatchupFilter]
+    search_fields = ["user__email", "user__first_name", "user__last_name"]
+    autocomplete_fields = ["user", "bowl_matchup", "winner"]
+
+    def get_queryset(self, request):
+        return select_shared(
+            super().get_queryset(request).select_related("bowl_matchup__bowl_game"),
+            "user",
+            "winner",
+            "bowl_matchup__away_team",
+            "bowl_matchup__home_team",
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if queryset.db == DEFAULT_DB_ALIAS:
+            return super().get_search_results(request, queryset, search_term)
+
+        # another pool's picks can't be joined to users, so search the users first
+        users, _ = UserAdmin(User, self.admin_site).get_search_results(
+            request, User.objects.all(), search_term
+        )
+
+        return (
+            queryset.filter(user_id__in=list(users.values_list("id", flat=True))),
+            False,
+        )
+
+
+class PoolMembershipInline(admin.TabularInline):
+    model = PoolMembership
+    autocomplete_fields = ["user"]
+    extra = 0
+
+
+class PoolAdmin(admin.ModelAdmin):
+    """A new pool's database is created by manage.py migrate_pools"""
+
+    list_display = ["name", "slug"]
+    prepopulated_fields = {"slug": ["name"]}
+    inlines = [PoolMembershipInline]
+
+
+admin.site.register(Pool, PoolAdmin)
+admin.site.register(Team, TeamAdmin)
+admin.site.register(BowlGame, BowlGameAdmin)
+admin.site.register(BowlMatchup, BowlMatchupAdmin)
+admin.site.register(BowlMatchupPick, BowlMatchupPickAdmin)
+admin.site.register(User, UserAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BowlpoolAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bowlpool_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,169 @@
+"""
+Async versions of the views that take the most traffic. Under ASGI, bowlpool.asgi
+serves them in place of their counterparts in views.py, so a request waiting on
+SQLite or the cache doesn't hold up a worker. Under WSGI the sync views still run.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+
+from . import events, pick_queue, views
+from .cache import (
+    acache_chunks,
+    aget_or_set_for_year,
+    ayear_version,
+    matchup_picks_fragment_key,
+    year_cache_key,
+)
+from .pools import current_db
+from .replicas import replica_reads
+from .snapshot import aget_snapshot, aget_year_picks
+from .submissions import parse_posted_picks, submit_picks
+
+# Rendering runs the context processors, which read the session and messages from
+# the database, so it has to happen off the event loop
+_render = sync_to_async(render)
+
+
+async def _load_user(request):
+    """Load request.user from the session without blocking the event loop"""
+
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+def _login_required(view):
+    """login_required for async views"""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await _load_user(request)
+
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@_login_required
+async def view_my_picks_for_year(request, bowl_year):
+    snapshot = await aget_snapshot(bowl_year)
+
+    return await _render(
+        request,
+        "user_picks_for_year.html",
+        {
+            **views._my_picks_for_year_context(
+                request.user,
+                snapshot,
+                await snapshot.apicks_for_user(request.user.id),
+                await sync_to_async(pick_queue.pending_picks)(
+                    current_db.get(), request.user.id, bowl_year
+                ),
+            ),
+            **views._live_updates_context(bowl_year, stream=True),
+        },
+    )
+
+
+async def _all_picks_for_year_fragments(bowl_year):
+    """Async version of views._all_picks_for_year_fragments"""
+
+    matchups_for_year = [m async for m in views._matchups_for_year(bowl_year)]
+
+    fragment_keys = {m.id: matchup_picks_fragment_key(m) for m in matchups_for_year}
+    fragments = await cache.aget_many(fragment_keys.values())
+    stale_matchups = [
+        m for m in matchups_for_year if fragment_keys[m.id] not in fragments
+    ]
+
+    if stale_matchups:
+        picks = [p async for p in views._stale_fragment_picks(stale_matchups)]
+        new_fragments = views._render_fragments(stale_matchups, fragment_keys, picks)
+
+        await cache.aset_many(new_fragments)
+        fragments.update(new_fragments)
+
+    return [
+        fragments[fragment_keys[m.id]]
+        for m in matchups_for_year
+        if fragments[fragment_keys[m.id]]
+    ]
+
+
+@replica_reads
+async def view_all_picks_for_year(request, bowl_year):
+    if not views._picks_revealed():
+        return await _render(
+            request,
+            "all_picks_for_year.html",
+            {"bowl_year": bowl_year, "message": "No peeking until December 26!"},
+        )
+
+    return await _render(
+        request,
+        "all_picks_for_year.html",
+        {
+            "bowl_year": bowl_year,
+            "picks_for_year": await aget_or_set_for_year(
+                "all_picks",
+                bowl_year,
+                lambda: _all_picks_for_year_fragments(bowl_year),
+            ),
+            **views._live_updates_context(bowl_year, stream=True),
+        },
+    )
+
+
+async def _json_picks_for_year_chunks(year_picks):
+    """views._json_picks_for_year_chunks as an async iterator. The picks are
+    already in memory, so producing the chunks never blocks."""
+
+    for chunk in views._json_picks_for_year_chunks(year_picks):
+        yield chunk
+
+
+@replica_reads
+async def json_picks_for_year(request, bowl_year):
+    version = await ayear_version(bowl_year)
+    key = year_cache_key("json_picks", bowl_year, version)
+    cached_json = await cache.aget(key)
+
+    if cached_json is not None:
+        return HttpResponse(cached_json, content_type="application/json")
+
+    return StreamingHttpResponse(
+        acache_chunks(
+            key,
+            _json_picks_for_year_chunks(await aget_year_picks(bowl_year, version)),
+        ),
+        content_type="application/json",
+    )
+
+
+async def year_events(request, bowl_year):
+    return views._events_response(
+        events.astream(bowl_year, views._events_cursor(request))
+    )
+
+
+@_login_required
+async def submit_my_picks_for_year(request, bowl_year):
+    picks_for_matchups = parse_posted_picks(request.POST)
+
+    # submit_picks writes in a transaction, which the async ORM can't do yet
+    for error in await sync_to_async(submit_picks)(
+        request.user, bowl_year, picks_for_matchups
+    ):
+        messages.error(request, error)
+
+    return HttpResponseRedirect(reverse("view_my_picks_for_year", args=(bowl_year,)))
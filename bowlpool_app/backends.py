@@ -0,0 +1,58 @@
+"""
+An authentication backend that keeps recently loaded users in memory.
+
+Every authenticated request loads its user from the session, so by default each
+one pays a query for the User row. CachedModelBackend keeps users for
+settings.BOWLPOOL_USER_CACHE_SECONDS in each worker process. Saving or deleting a
+user forgets them in the process that did it. Other processes may go on using the
+old row until it expires, so a password change or deactivation takes up to that
+long to end the user's other sessions there.
+"""
+
+import copy
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+# user id: (monotonic time it expires, user)
+_users = {}
+
+
+def forget_user(user_id):
+    _users.pop(user_id, None)
+
+
+def clear():
+    _users.clear()
+
+
+class CachedModelBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username, password, **kwargs)
+
+        if user is None:
+            # stop here, rather than have the ModelBackend that's still configured
+            # for older sessions hash the password all over again
+            raise PermissionDenied
+
+        return user
+
+    def get_user(self, user_id):
+        if not settings.BOWLPOOL_USER_CACHE_SECONDS:
+            return super().get_user(user_id)
+
+        now = time.monotonic()
+        expires, user = _users.get(user_id, (0, None))
+
+        if expires <= now:
+            user = super().get_user(user_id)
+
+            if user is None:
+                return None
+
+            _users[user_id] = (now + settings.BOWLPOOL_USER_CACHE_SECONDS, user)
+
+        # every request gets its own copy to change, such as login's last_login
+        return copy.copy(user)
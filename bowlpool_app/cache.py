@@ -0,0 +1,169 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import BowlMatchup, YearVersion
+from .pools import current_db
+
+
+def matchup_picks_fragment_key(bowl_matchup):
+    """Cache key for the rendered picks of one matchup on the all-picks page.
+
+    The key changes whenever a pick for the matchup, its final score or the names
+    of its bowl game and teams change, and renaming a user bumps the picks_version
+    of every matchup they picked, so stale fragments are never served and simply
+    age out of the cache. Matchup ids are only unique within a pool, so the key
+    includes the current one.
+    """
+
+    # the names go in as a digest, which keeps the key short enough for memcached
+    names = hashlib.md5(
+        f"{bowl_matchup.display_name}:{bowl_matchup.bowl_favorite()}".encode()
+    ).hexdigest()
+
+    return (
+        f"matchup_picks:{current_db.get()}:{bowl_matchup.id}:{bowl_matchup.picks_version}:"
+        f"{bowl_matchup.away_team_final_score}:{bowl_matchup.home_team_final_score}:"
+        f"{names}"
+    )
+
+
+def bump_picks_version(matchup_ids):
+    BowlMatchup.objects.filter(id__in=matchup_ids).update(
+        picks_version=F("picks_version") + 1
+    )
+
+
+def year_version(bowl_year):
+    """The current version of a year's data, read with a single indexed query"""
+
+    return (
+        YearVersion.objects.filter(bowl_year=bowl_year)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+async def ayear_version(bowl_year):
+    """Async version of year_version"""
+
+    version = (
+        await YearVersion.objects.filter(bowl_year=bowl_year)
+        .values_list("version", flat=True)
+        .afirst()
+    )
+
+    return version or 0
+
+
+def matchups_version(bowl_year):
+    """The current version of a year's matchups, teams and winners, which unlike its
+    year_version stays the same while picks are submitted"""
+
+    return (
+        YearVersion.objects.filter(bowl_year=bowl_year)
+        .values_list("matchups_version", flat=True)
+        .first()
+        or 0
+    )
+
+
+async def amatchups_version(bowl_year):
+    """Async version of matchups_version"""
+
+    version = (
+        await YearVersion.objects.filter(bowl_year=bowl_year)
+        .values_list("matchups_version", flat=True)
+        .afirst()
+    )
+
+    return version or 0
+
+
+def bump_year_versions(bowl_years, picks_only=False):
+    """Invalidate everything cached for the given years
+    :param picks_only: Whether only picks changed, leaving the years' matchups,
+        teams and winners as they were
+    """
+
+    bowl_years = set(bowl_years)
+    versions = {"version": F("version") + 1}
+
+    if not picks_only:
+        versions["matchups_version"] = F("matchups_version") + 1
+
+    YearVersion.objects.bulk_create(
+        [YearVersion(bowl_year=bowl_year) for bowl_year in bowl_years],
+        ignore_conflicts=True,
+    )
+    YearVersion.objects.filter(bowl_year__in=bowl_years).update(**versions)
+
+
+def bump_year_versions_for_teams(team_ids):
+    bump_year_versions(
+        BowlMatchup.objects.filter(
+            Q(away_team__in=team_ids) | Q(home_team__in=team_ids)
+        ).values_list("bowl_year", flat=True)
+    )
+
+
+def bump_year_versions_for_bowl_games(bowl_game_ids):
+    bump_year_versions(
+        BowlMatchup.objects.filter(bowl_game__in=bowl_game_ids).values_list(
+            "bowl_year", flat=True
+        )
+    )
+
+
+def year_cache_key(name, bowl_year, version):
+    return f"{name}:{current_db.get()}:{bowl_year}:{version}"
+
+
+def get_or_set_for_year(name, bowl_year, default):
+    """Fetch a cached value for the current version of a year, computing and caching
+    it with default() on a miss"""
+
+    return cache.get_or_set(
+        year_cache_key(name, bowl_year, year_version(bowl_year)), default
+    )
+
+
+async def aget_or_set_for_year(name, bowl_year, default):
+    """Async version of get_or_set_for_year, computing the value with
+    await default() on a miss"""
+
+    key = year_cache_key(name, bowl_year, await ayear_version(bowl_year))
+    value = await cache.aget(key)
+
+    if value is None:
+        value = await default()
+        await cache.aset(key, value)
+
+    return value
+
+
+def cache_chunks(key, chunks):
+    """Pass a streamed response's chunks through, caching their concatenation once
+    the stream is complete"""
+
+    cached_chunks = []
+
+    for chunk in chunks:
+        cached_chunks.append(chunk)
+        yield chunk
+
+    cache.set(key, "".join(cached_chunks))
+
+
+async def acache_chunks(key, chunks):
+    """Async version of cache_chunks, for async iterators of chunks"""
+
+    cached_chunks = []
+
+    async for chunk in chunks:
+        cached_chunks.append(chunk)
+        yield chunk
+
+    await cache.aset(key, "".join(cached_chunks))
@@ -0,0 +1,229 @@
+"""
+Live updates for a year, streamed to browsers as Server-Sent Events under ASGI and
+polled for under WSGI, where an open stream would hold a worker.
+
+Score and winner changes are stored as YearEvent rows so that every worker process
+can send them, and a reconnecting client resumes after the last event it saw. Rows
+are kept for settings.BOWLPOOL_EVENTS_KEEP_SECONDS. Picks locking at a matchup's
+start time needs no row; the updates announce it once the time has passed.
+"""
+
+import asyncio
+import datetime
+import json
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import BowlMatchup, User, YearEvent
+
+# how long browsers wait before reconnecting once an async stream ends
+RECONNECT_MILLISECONDS = 1000
+
+
+class Cursor:
+    """A client's position in a year's updates: the last event it was sent, and the
+    time up to which it has been told about picks locking.
+
+    Serialized as "<event id>:<unix time>" in every message's id, which browsers send
+    back as Last-Event-ID when they reconnect. Pages start their stream from a
+    cursor with no event id, which picks up every event created since the page was
+    rendered.
+    """
+
+    def __init__(self, event_id, locked_until):
+        self.event_id = event_id
+        self.locked_until = locked_until
+
+    @classmethod
+    def parse(cls, value, now):
+        try:
+            event_id, timestamp = value.split(":")
+
+            return cls(
+                int(event_id) if event_id else None,
+                datetime.datetime.fromtimestamp(
+                    float(timestamp), tz=datetime.timezone.utc
+                ),
+            )
+        except (AttributeError, OverflowError, ValueError):
+            return cls(None, now)
+
+    def __str__(self):
+        event_id = "" if self.event_id is None else self.event_id
+        return f"{event_id}:{self.locked_until.timestamp():.3f}"
+
+
+def page_cursor():
+    """The cursor a page rendered now should start its stream from"""
+
+    return str(Cursor(None, timezone.now()))
+
+
+def _prune():
+    """Delete the events too old for any client to resume from"""
+
+    YearEvent.objects.filter(
+        created__lt=timezone.now()
+        - datetime.timedelta(seconds=settings.BOWLPOOL_EVENTS_KEEP_SECONDS)
+    ).delete()
+
+
+def publish_score(bowl_matchup):
+    _prune()
+    YearEvent.objects.create(
+        bowl_year=bowl_matchup.bowl_year,
+        kind=YearEvent.SCORE,
+        data={
+            "matchup": bowl_matchup.id,
+            "away_team_score": bowl_matchup.away_team_final_score,
+            "home_team_score": bowl_matchup.home_team_final_score,
+        },
+    )
+
+
+def publish_winners(bowl_matchup, user_ids):
+    _prune()
+    YearEvent.objects.create(
+        bowl_year=bowl_matchup.bowl_year,
+        kind=YearEvent.WINNERS,
+        data={
+            "matchup": bowl_matchup.id,
+            "winners": [
+                {"user_id": user_id, "name": " ".join((first_name, last_name))}
+                for user_id, first_name, last_name in User.objects.filter(
+                    id__in=user_ids
+                )
+                .order_by("first_name", "last_name")
+                .values_list("id", "first_name", "last_name")
+            ],
+        },
+    )
+
+
+def _newest_event_ids(bowl_year):
+    return (
+        YearEvent.objects.filter(bowl_year=bowl_year)
+        .order_by("-id")
+        .values_list("id", flat=True)
+    )
+
+
+def _events_after(bowl_year, cursor, latest_event_id):
+    events = YearEvent.objects.filter(bowl_year=bowl_year).order_by("id")
+
+    if cursor.event_id is None:
+        # everything since the page was rendered, up to a known id to resume from
+        return events.filter(created__gte=cursor.locked_until, id__lte=latest_event_id)
+
+    return events.filter(id__gt=cursor.event_id)
+
+
+def _start_times(bowl_year):
+    return BowlMatchup.objects.filter(bowl_year=bowl_year).values_list(
+        "id", "start_time"
+    )
+
+
+def _message(cursor, kind=None, data=None):
+    if kind is None:
+        # no event, but a new id for the browser to reconnect with
+        return f"id: {cursor}\n\n"
+
+    return f"id: {cursor}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+def _updates(events, latest_event_id, start_times, cursor, now):
+    """Yield new events and newly locked matchups as (kind, data), advancing the
+    cursor past each one"""
+
+    for event in events:
+        cursor.event_id = event.id
+        yield event.kind, event.data
+
+    if cursor.event_id is None or cursor.event_id < latest_event_id:
+        cursor.event_id = latest_event_id
+
+    locked_since = cursor.locked_until
+    cursor.locked_until = now
+
+    for matchup_id, start_time in start_times:
+        if locked_since < start_time <= now:
+            yield "lock", {"matchup": matchup_id}
+
+
+def _messages(events, latest_event_id, start_times, cursor, now):
+    """Format the updates as Server-Sent Events, each with the cursor past it"""
+
+    messages = [
+        _message(cursor, kind, data)
+        for kind, data in _updates(events, latest_event_id, start_times, cursor, now)
+    ]
+
+    return "".join(messages) or _message(cursor)
+
+
+def _new_events(bowl_year, cursor):
+    """The events after cursor, and the latest event id to resume from when it has
+    none"""
+
+    latest_event_id = (
+        _newest_event_ids(bowl_year).first() or 0 if cursor.event_id is None else 0
+    )
+
+    return list(_events_after(bowl_year, cursor, latest_event_id)), latest_event_id
+
+
+def poll(bowl_year, cursor):
+    """A year's updates after cursor, and the cursor to poll from next"""
+
+    events, latest_event_id = _new_events(bowl_year, cursor)
+
+    updates = [
+        {"kind": kind, "data": data}
+        for kind, data in _updates(
+            events, latest_event_id, _start_times(bowl_year), cursor, timezone.now()
+        )
+    ]
+
+    return {"since": str(cursor), "updates": updates}
+
+
+def batch(bowl_year, cursor):
+    """Yield a year's updates after cursor as Server-Sent Events, checking once. Under
+    WSGI a stream that waited for more would hold a worker, so the browser reconnects
+    for the next batch after BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS instead."""
+
+    yield f"retry: {settings.BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS * 1000:.0f}\n\n"
+
+    events, latest_event_id = _new_events(bowl_year, cursor)
+
+    yield _messages(
+        events, latest_event_id, _start_times(bowl_year), cursor, timezone.now()
+    )
+
+
+async def astream(bowl_year, cursor):
+    """Yield a year's updates after cursor for BOWLPOOL_EVENTS_STREAM_SECONDS, checking
+    for new ones every BOWLPOOL_EVENTS_POLL_INTERVAL seconds"""
+
+    yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+
+    start_times = [s async for s in _start_times(bowl_year)]
+    deadline = time.monotonic() + settings.BOWLPOOL_EVENTS_STREAM_SECONDS
+
+    while True:
+        latest_event_id = (
+            await _newest_event_ids(bowl_year).afirst() or 0
+            if cursor.event_id is None
+            else 0
+        )
+        events = [e async for e in _events_after(bowl_year, cursor, latest_event_id)]
+
+        yield _messages(events, latest_event_id, start_times, cursor, timezone.now())
+
+        if time.monotonic() >= deadline:
+            return
+
+        await asyncio.sleep(settings.BOWLPOOL_EVENTS_POLL_INTERVAL)
@@ -1,8 +1,35 @@
+from django import forms
 from django.contrib.auth.forms import BaseUserCreationForm
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+from .season_import import read_season_file
 
 
 class BowlPoolUserCreationForm(BaseUserCreationForm):
     class Meta:
         model = get_user_model()
         fields = ("email", "first_name", "last_name")
+
+
+class SeasonImportForm(forms.Form):
+    bowl_year = forms.IntegerField()
+    season_file = forms.FileField(
+        help_text=_("CSV or JSON, with a bowl_game column and any fields to set")
+    )
+    dry_run = forms.BooleanField(
+        required=False, help_text=_("Report the changes without saving them")
+    )
+
+    def clean_season_file(self):
+        season_file = self.cleaned_data["season_file"]
+        file_format = season_file.name.rsplit(".", 1)[-1].lower()
+
+        if file_format not in ("csv", "json"):
+            raise ValidationError(_("Upload a .csv or .json file"))
+
+        try:
+            return read_season_file(season_file, file_format)
+        except (UnicodeDecodeError, ValueError) as e:
+            raise ValidationError(str(e))
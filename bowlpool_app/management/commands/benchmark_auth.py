@@ -0,0 +1,118 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bowlpool_app import backends
+from bowlpool_app.models import User
+
+# session engine and user cache seconds to compare
+AUTH_STACKS = [
+    ("db", 0),
+    ("cached_db", 0),
+    ("cached_db", 30),
+]
+
+
+def _is_auth_query(sql):
+    return '"django_session"' in sql or 'FROM "bowlpool_app_user" WHERE' in sql
+
+
+class Command(BaseCommand):
+    help = (
+        "Time hashing a password with a few PBKDF2 iteration counts, then time "
+        "requests by a logged-in user with each session engine, with and without "
+        "the user cache, and count the queries spent loading the session and user. "
+        "Generate users first with generate_pool_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            nargs="+",
+            default=[100000, 300000, 600000, 1000000],
+            help="PBKDF2 iteration counts to time",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'iterations':>10} {'hash ms':>8}")
+
+        for iterations in options["iterations"]:
+            with override_settings(BOWLPOOL_PASSWORD_ITERATIONS=iterations):
+                timings = []
+
+                for _ in range(3):
+                    start = time.perf_counter()
+                    make_password("correct horse battery staple")
+                    timings.append((time.perf_counter() - start) * 1000)
+
+            current = (
+                "  (current)"
+                if iterations == settings.BOWLPOOL_PASSWORD_ITERATIONS
+                else ""
+            )
+            self.stdout.write(
+                f"{iterations:10} {statistics.median(timings):8.1f}{current}"
+            )
+
+        user = User.objects.filter(is_active=True).first()
+
+        if user is None:
+            raise CommandError("No users; run generate_pool_data")
+
+        self.stdout.write(
+            f"\n{options['requests']} requests to the year index\n"
+            f"{'session':10} {'user cache':>10} {'p50 ms':>8} {'auth queries':>13} "
+            f"{'queries':>8}"
+        )
+
+        for engine, user_cache_seconds in AUTH_STACKS:
+            with override_settings(
+                SESSION_ENGINE=f"django.contrib.sessions.backends.{engine}",
+                BOWLPOOL_USER_CACHE_SECONDS=user_cache_seconds,
+            ):
+                self.report(
+                    engine, user_cache_seconds, *self.run(user, options["requests"])
+                )
+
+    def run(self, user, requests):
+        backends.clear()
+
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+        url = reverse("year_index")
+
+        # the first request loads the user into the cache, if it's on
+        client.get(url)
+
+        timings = []
+        auth_queries = []
+        queries = []
+
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            auth_queries.append(sum(_is_auth_query(q["sql"]) for q in captured))
+            queries.append(len(captured))
+
+        client.logout()
+
+        return statistics.median(timings), max(auth_queries), max(queries)
+
+    def report(self, engine, user_cache_seconds, p50, auth_queries, queries):
+        user_cache = f"{user_cache_seconds} s" if user_cache_seconds else "off"
+
+        self.stdout.write(
+            f"{engine:10} {user_cache:>10} {p50:8.2f} {auth_queries:13} {queries:8}"
+        )
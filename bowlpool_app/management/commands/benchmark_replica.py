@@ -0,0 +1,142 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from bowlpool_app.models import BowlMatchupPick
+from bowlpool_app.submissions import submit_picks
+
+# the views that read from the replica
+READ_VIEWS = ["year_index", "view_all_picks_for_year", "json_picks_for_year"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the latency (ms) of the read-only views while users of a year "
+        "resubmit their picks as fast as they can, reading from the primary and "
+        "from the replica. Each submission changes the year's version, so most "
+        "reads miss the cache. Generate a year first with generate_pool_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument(
+            "--seconds", type=float, default=5, help="How long to run each mode"
+        )
+
+    def handle(self, *args, **options):
+        bowl_year = options["bowl_year"]
+        submissions = {}
+
+        for p in BowlMatchupPick.objects.filter(
+            bowl_matchup__bowl_year=bowl_year
+        ).select_related("user"):
+            submissions.setdefault(p.user, {})[p.bowl_matchup_id] = {
+                "winner": str(p.winner_id),
+                "margin": str(p.margin),
+            }
+
+        if len(submissions) < options["writers"]:
+            raise CommandError(
+                f"{len(submissions)} users have picks for {bowl_year}; "
+                "run generate_pool_data or use fewer writers"
+            )
+
+        writers = list(submissions.items())[: options["writers"]]
+        urls = [
+            reverse(name, args=() if name == "year_index" else (bowl_year,))
+            for name in READ_VIEWS
+        ]
+
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, "
+            f"{options['seconds']:g} s each"
+        )
+        self.stdout.write(
+            f"{'reads from':12} {'writes/s':>9} {'reads/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8}"
+        )
+
+        for mode, replica_reads, mode_writers in [
+            ("idle", False, []),
+            ("primary", False, writers),
+            ("replica", True, writers),
+        ]:
+            with override_settings(BOWLPOOL_DB_REPLICA_READS=replica_reads):
+                self.report(mode, *self.run(bowl_year, urls, mode_writers, options))
+
+    def run(self, bowl_year, urls, writers, options):
+        stop = threading.Event()
+        latencies = []
+        writes = []
+        errors = []
+
+        def writer(user, picks):
+            try:
+                while not stop.is_set():
+                    errors.extend(submit_picks(user, bowl_year, picks))
+                    writes.append(1)
+            finally:
+                connections.close_all()
+
+        def reader(index):
+            client = Client(SERVER_NAME="localhost")
+
+            try:
+                while not stop.is_set():
+                    url = urls[index % len(urls)]
+                    index += 1
+
+                    start = time.perf_counter()
+                    response = client.get(url)
+
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+
+                    latencies.append(time.perf_counter() - start)
+
+                    if response.status_code != 200:
+                        errors.append(f"{response.status_code} from {url}")
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=writer, args=writer_submissions)
+            for writer_submissions in writers
+        ] + [
+            threading.Thread(target=reader, args=(i,))
+            for i in range(options["readers"])
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        time.sleep(options["seconds"])
+        stop.set()
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise CommandError(errors[0])
+
+        return (
+            len(writes) / options["seconds"],
+            len(latencies) / options["seconds"],
+            latencies,
+        )
+
+    def report(self, mode, write_rate, read_rate, latencies):
+        cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+
+        self.stdout.write(
+            f"{mode:12} {write_rate:9.1f} {read_rate:8.1f} "
+            f"{cut_points[49] * 1000:8.2f} {cut_points[94] * 1000:8.2f} "
+            f"{cut_points[98] * 1000:8.2f}"
+        )
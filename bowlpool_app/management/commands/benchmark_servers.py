@@ -0,0 +1,200 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from bowlpool.handlers import ASGIHandler
+from bowlpool_app.models import BowlMatchupPick
+
+# any 32 characters make a valid unmasked CSRF token, as long as the cookie matches
+CSRF_TOKEN = "b" * 32
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the views with async versions under the WSGI "
+        "and ASGI handlers, with many clients requesting at once. WSGI requests "
+        "share a fixed pool of workers, like Passenger's processes; ASGI requests "
+        "all run on one event loop. Generate a year first with generate_pool_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("--clients", type=int, default=100)
+        parser.add_argument(
+            "--requests", type=int, default=5, help="Requests per client per view"
+        )
+        parser.add_argument("--wsgi-workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        bowl_year = options["bowl_year"]
+
+        pick = (
+            BowlMatchupPick.objects.filter(bowl_matchup__bowl_year=bowl_year)
+            .select_related("user")
+            .first()
+        )
+
+        if pick is None:
+            raise CommandError(f"No picks for {bowl_year}; run generate_pool_data")
+
+        client = Client()
+        client.force_login(pick.user)
+        cookie = (
+            f"{settings.SESSION_COOKIE_NAME}="
+            f"{client.cookies[settings.SESSION_COOKIE_NAME].value}; "
+            f"{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}"
+        )
+
+        resubmitted_picks = {"csrfmiddlewaretoken": CSRF_TOKEN}
+
+        for p in BowlMatchupPick.objects.filter(
+            user=pick.user, bowl_matchup__bowl_year=bowl_year
+        ):
+            resubmitted_picks[f"{p.bowl_matchup_id}-winner"] = p.winner_id
+            resubmitted_picks[f"{p.bowl_matchup_id}-margin"] = p.margin
+
+        requests = [
+            ("json_picks_for_year", "GET", b""),
+            ("view_all_picks_for_year", "GET", b""),
+            ("view_my_picks_for_year", "GET", b""),
+            (
+                "submit_my_picks_for_year",
+                "POST",
+                urlencode(resubmitted_picks).encode(),
+            ),
+        ]
+
+        total = options["clients"] * options["requests"]
+
+        self.stdout.write(
+            f"{options['clients']} clients, {total} requests per view, "
+            f"{options['wsgi_workers']} WSGI workers"
+        )
+        self.stdout.write(
+            f"{'view':28} {'server':6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+
+        for name, method, body in requests:
+            path = reverse(name, args=(bowl_year,))
+
+            for server, run in [("wsgi", self.run_wsgi), ("asgi", self.run_asgi)]:
+                elapsed, latencies = run(
+                    path, method, body, cookie, options["clients"], options
+                )
+                cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+
+                self.stdout.write(
+                    f"{name:28} {server:6} {total / elapsed:8.1f} "
+                    f"{cut_points[49] * 1000:8.2f} {cut_points[94] * 1000:8.2f}"
+                )
+
+    @staticmethod
+    def check_status(status, path):
+        if status >= 400:
+            raise CommandError(f"{status} from {path}")
+
+    def run_wsgi(self, path, method, body, cookie, clients, options):
+        application = WSGIHandler()
+
+        def request():
+            environ = {
+                "REQUEST_METHOD": method,
+                "PATH_INFO": path,
+                "SCRIPT_NAME": "",
+                "QUERY_STRING": "",
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "HTTP_HOST": "localhost",
+                "HTTP_COOKIE": cookie,
+                "CONTENT_TYPE": "application/x-www-form-urlencoded",
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": io.BytesIO(body),
+                "wsgi.url_scheme": "http",
+                "wsgi.errors": io.StringIO(),
+            }
+            statuses = []
+
+            start = time.perf_counter()
+            response = application(
+                environ, lambda status, headers: statuses.append(status)
+            )
+
+            for _ in response:
+                pass
+
+            response.close()
+            latency = time.perf_counter() - start
+
+            self.check_status(int(statuses[0].split()[0]), path)
+            return latency
+
+        # clients queue up for the workers, the way they queue for Passenger's
+        with ThreadPoolExecutor(max_workers=options["wsgi_workers"]) as executor:
+            start = time.perf_counter()
+            latencies = list(
+                executor.map(lambda _: request(), range(clients * options["requests"]))
+            )
+
+        return time.perf_counter() - start, latencies
+
+    def run_asgi(self, path, method, body, cookie, clients, options):
+        application = ASGIHandler()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"cookie", cookie.encode()),
+                (b"content-type", b"application/x-www-form-urlencoded"),
+            ],
+            "server": ("localhost", 80),
+        }
+
+        async def request():
+            messages = [{"type": "http.request", "body": body, "more_body": False}]
+            statuses = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+
+                # never disconnect
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+
+            start = time.perf_counter()
+            await application(dict(scope), receive, send)
+            latency = time.perf_counter() - start
+
+            self.check_status(statuses[0], path)
+            return latency
+
+        async def client():
+            return [await request() for _ in range(options["requests"])]
+
+        async def run():
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(client() for _ in range(clients)))
+            return time.perf_counter() - start, [t for ts in latencies for t in ts]
+
+        return asyncio.run(run())
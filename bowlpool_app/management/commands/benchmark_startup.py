@@ -0,0 +1,129 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# run in a new interpreter: load the WSGI application as a new worker would, then
+# time its first two responses
+STARTUP_SCRIPT = """
+import json
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+from bowlpool.wsgi import application
+loaded = time.perf_counter()
+
+timings = {"load": (loaded - start) * 1000}
+
+for request in ["first", "second"]:
+    environ = {"PATH_INFO": sys.argv[1]}
+    setup_testing_defaults(environ)
+    status = []
+
+    start = time.perf_counter()
+    b"".join(application(environ, lambda s, h: status.append(s)))
+    timings[request] = (time.perf_counter() - start) * 1000
+
+    if not status[0].startswith("200"):
+        sys.exit(f"{status[0]} from {sys.argv[1]}")
+
+print(json.dumps(timings))
+"""
+
+
+def _parse_importtime(stderr):
+    """Self and cumulative import times, in microseconds, by module, from the output
+    of python -X importtime"""
+
+    imports = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        imports[module.strip()] = (int(self_us), int(cumulative_us))
+
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Start new worker processes, with and without bowlpool.warmup, and report "
+        "how long each takes to load the WSGI application and to serve its first "
+        "and second requests (ms), with the slowest imports"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default="/bowl-pool/", help="Path to request"
+        )
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--top", type=int, default=15, help="Slowest imports to list"
+        )
+
+    def start_worker(self, path, warmup):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "bowlpool.settings",
+            "BOWLPOOL_WARMUP": "1" if warmup else "0",
+        }
+
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT, path],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        return json.loads(result.stdout), _parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['runs']} workers each, requesting {options['path']}\n"
+        )
+        self.stdout.write(
+            f"{'warmup':8} {'load':>8} {'first':>8} {'second':>8} "
+            f"{'to first response':>18}"
+        )
+
+        imports = None
+
+        for warmup in [False, True]:
+            runs = []
+
+            for _ in range(options["runs"]):
+                timings, imports = self.start_worker(options["path"], warmup)
+                runs.append(timings)
+
+            load, first, second = (
+                statistics.median(r[request] for r in runs)
+                for request in ["load", "first", "second"]
+            )
+            to_first_response = statistics.median(r["load"] + r["first"] for r in runs)
+
+            self.stdout.write(
+                f"{'on' if warmup else 'off':8} {load:8.1f} {first:8.1f} "
+                f"{second:8.1f} {to_first_response:18.1f}"
+            )
+
+        self.stdout.write("\nSlowest imports (ms) in the last worker:")
+        self.stdout.write(f"{'self':>8} {'cumulative':>11}  module")
+
+        for module, (self_us, cumulative_us) in sorted(
+            imports.items(), key=lambda i: i[1][0], reverse=True
+        )[: options["top"]]:
+            self.stdout.write(
+                f"{self_us / 1000:8.1f} {cumulative_us / 1000:11.1f}  {module}"
+            )
@@ -0,0 +1,117 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from bowlpool_app import pick_queue
+from bowlpool_app.models import BowlMatchupPick
+from bowlpool_app.submissions import drain_pick_queue, submit_picks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many pick submissions per second the users of a year can make "
+        "at once with direct writes and with the pick queue, and how quickly the "
+        "queue drains. Each user resubmits their picks, so the year is unchanged. "
+        "Generate a year first with generate_pool_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("--clients", type=int, default=16)
+        parser.add_argument(
+            "--submissions", type=int, default=10, help="Submissions per client"
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        bowl_year = options["bowl_year"]
+        submissions = {}
+
+        for p in BowlMatchupPick.objects.filter(
+            bowl_matchup__bowl_year=bowl_year
+        ).select_related("user"):
+            submissions.setdefault(p.user, {})[p.bowl_matchup_id] = {
+                "winner": str(p.winner_id),
+                "margin": str(p.margin),
+            }
+
+        if len(submissions) < options["clients"]:
+            raise CommandError(
+                f"{len(submissions)} users have picks for {bowl_year}; "
+                "run generate_pool_data or use fewer clients"
+            )
+
+        clients = list(submissions.items())[: options["clients"]]
+        total = options["clients"] * options["submissions"]
+
+        self.stdout.write(f"{options['clients']} clients, {total} submissions")
+        self.stdout.write(f"{'mode':8} {'subs/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+
+        self.report("direct", *self.run(bowl_year, clients, options))
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                BOWLPOOL_PICK_QUEUE_PATH=os.path.join(directory, "queue.sqlite3")
+            ):
+                self.report("queued", *self.run(bowl_year, clients, options))
+
+                start = time.perf_counter()
+
+                while drain_pick_queue(options["batch_size"]):
+                    pass
+
+                elapsed = time.perf_counter() - start
+                pick_queue.close()
+
+        self.stdout.write(
+            f"\nDrained {total} queued submissions in {elapsed * 1000:.0f} ms "
+            f"({total / elapsed:.1f}/s)"
+        )
+
+    def run(self, bowl_year, clients, options):
+        latencies = []
+        errors = []
+
+        def client(user, picks):
+            try:
+                for _ in range(options["submissions"]):
+                    start = time.perf_counter()
+                    errors.extend(submit_picks(user, bowl_year, picks))
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+                pick_queue.close()
+
+        threads = [
+            threading.Thread(target=client, args=client_submissions)
+            for client_submissions in clients
+        ]
+
+        start = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+
+        if errors:
+            raise CommandError(errors[0])
+
+        return len(latencies) / elapsed, latencies
+
+    def report(self, mode, rate, latencies):
+        cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+
+        self.stdout.write(
+            f"{mode:8} {rate:8.1f} {cut_points[49] * 1000:8.2f} "
+            f"{cut_points[94] * 1000:8.2f}"
+        )
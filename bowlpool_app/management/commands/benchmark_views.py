@@ -0,0 +1,232 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from bowlpool_app.models import BowlMatchupPick
+
+
+def _percentiles(timings):
+    if len(timings) < 2:
+        return {"p50": timings[0], "p95": timings[0], "p99": timings[0]}
+
+    cut_points = statistics.quantiles(timings, n=100, method="inclusive")
+
+    return {"p50": cut_points[49], "p95": cut_points[94], "p99": cut_points[98]}
+
+
+class QueryCounter:
+    """Count the queries run on every database connection, including the replica
+    and the pool databases a request registers and connects to part way through"""
+
+    def __init__(self):
+        self.count = 0
+        self.wrapped = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def wrap(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            self.wrapped.append(connection)
+
+    def __enter__(self):
+        for c in connections.all():
+            self.wrap(c)
+
+        connection_created.connect(self.wrap)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.wrap)
+
+        for c in self.wrapped:
+            c.execute_wrappers.remove(self)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every bowlpool_app view for a year through the test client and report "
+        "p50/p95/p99 latency (ms), query count and peak memory. Generate a year "
+        "first with generate_pool_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear the cache before every request",
+        )
+        parser.add_argument(
+            "--simulations",
+            type=int,
+            default=1000,
+            help="Simulations per request to the simulate view",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument(
+            "--compare", help="Compare against results saved earlier with --output"
+        )
+
+    def handle(self, *args, **options):
+        bowl_year = options["bowl_year"]
+
+        pick = (
+            BowlMatchupPick.objects.filter(bowl_matchup__bowl_year=bowl_year)
+            .select_related("user")
+            .first()
+        )
+
+        if pick is None:
+            raise CommandError(f"No picks for {bowl_year}; run generate_pool_data")
+
+        user = pick.user
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+
+        results = {}
+
+        for name, request in self.requests(bowl_year, user, options["simulations"]):
+            results[name] = self.benchmark(
+                request, client, options["iterations"], options["cold"]
+            )
+
+        self.report(results)
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self.compare(json.load(f)["views"], results)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(
+                    {
+                        "bowl_year": bowl_year,
+                        "iterations": options["iterations"],
+                        "cold": options["cold"],
+                        "views": results,
+                    },
+                    f,
+                    indent=2,
+                )
+
+    def requests(self, bowl_year, user, simulations):
+        """One (name, request function) pair for every URL in bowlpool_app.urls"""
+
+        anonymous_client = Client(SERVER_NAME="localhost")
+
+        def get(name, *args, data=None, logged_in=True):
+            url = reverse(name, args=args)
+
+            def request(client):
+                return (client if logged_in else anonymous_client).get(url, data)
+
+            return name, request
+
+        resubmitted_picks = {}
+
+        for p in BowlMatchupPick.objects.filter(
+            user=user, bowl_matchup__bowl_year=bowl_year
+        ):
+            resubmitted_picks[f"{p.bowl_matchup_id}-winner"] = p.winner_id
+            resubmitted_picks[f"{p.bowl_matchup_id}-margin"] = p.margin
+
+        submit_url = reverse("submit_my_picks_for_year", args=[bowl_year])
+
+        return [
+            get("year_index"),
+            get("view_all_picks_for_year", bowl_year),
+            get("json_picks_for_year", bowl_year),
+            get("view_standings_for_year", bowl_year),
+            get("json_standings_for_year", bowl_year),
+            get("json_simulate_year", bowl_year, data={"simulations": simulations}),
+            get("year_events", bowl_year),
+            get("json_year_events", bowl_year),
+            get("view_my_picks_for_year", bowl_year),
+            get("select_pool"),
+            (
+                "submit_my_picks_for_year",
+                lambda client: client.post(submit_url, resubmitted_picks),
+            ),
+            get("register", logged_in=False),
+        ]
+
+    def benchmark(self, request, client, iterations, cold):
+        def run():
+            if cold:
+                cache.clear()
+
+            response = request(client)
+
+            # drain streaming responses so their generators actually run
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{response.status_code} from {response.request['PATH_INFO']}"
+                )
+
+        timings = []
+        query_counts = []
+
+        for _ in range(iterations):
+            with QueryCounter() as queries:
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+
+            query_counts.append(queries.count)
+
+        # tracing slows everything down, so measure memory in a separate pass
+        tracemalloc.start()
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            **_percentiles(timings),
+            "queries": max(query_counts),
+            "peak_memory_kb": peak_memory // 1024,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'view':30} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} "
+            f"{'peak KiB':>9}"
+        )
+
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:30} {r['p50']:8.2f} {r['p95']:8.2f} {r['p99']:8.2f} "
+                f"{r['queries']:8} {r['peak_memory_kb']:9}"
+            )
+
+    def compare(self, baseline, results):
+        self.stdout.write("\nChange from baseline:")
+
+        for name, r in results.items():
+            if name not in baseline:
+                self.stdout.write(f"{name:30} (not in baseline)")
+                continue
+
+            b = baseline[name]
+            p50_change = (r["p50"] - b["p50"]) / b["p50"] if b["p50"] else 0
+            p95_change = (r["p95"] - b["p95"]) / b["p95"] if b["p95"] else 0
+
+            self.stdout.write(
+                f"{name:30} p50 {p50_change:+8.1%} p95 {p95_change:+8.1%} "
+                f"queries {r['queries'] - b['queries']:+d} "
+                f"peak {r['peak_memory_kb'] - b['peak_memory_kb']:+d} KiB"
+            )
@@ -0,0 +1,53 @@
+import base64
+import mimetypes
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ICONS_DIR = Path(settings.BASE_DIR) / "static_files" / "bowlpool_app" / "team-icons"
+BUNDLE_PATH = (
+    Path(settings.BASE_DIR) / "static_files" / "bowlpool_app" / "css" / "team-icons.css"
+)
+
+BUNDLE_HEADER = """\
+/* Generated by "manage.py bundle_team_icons" from bowlpool_app/team-icons; don't edit */
+
+.team-icon {
+    display: inline-block;
+    width: 1.5em;
+    height: 1em;
+    vertical-align: middle;
+    background-position: center;
+    background-repeat: no-repeat;
+    background-size: contain;
+}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Bundle the team icons into one stylesheet of data URIs, one "
+        ".team-icon-<abbreviation> class per team, so a page loads them in one request"
+    )
+
+    def handle(self, *args, **options):
+        rules = [BUNDLE_HEADER]
+
+        for path in sorted(ICONS_DIR.iterdir()):
+            content_type, _ = mimetypes.guess_type(path.name)
+
+            if content_type is None or not content_type.startswith("image/"):
+                continue
+
+            data = base64.b64encode(path.read_bytes()).decode("ascii")
+
+            rules.append(
+                f".team-icon-{path.stem} {{\n"
+                f"    background-image: url(data:{content_type};base64,{data});\n"
+                "}\n"
+            )
+
+        BUNDLE_PATH.write_text("\n".join(rules))
+
+        self.stdout.write(f"Bundled {len(rules) - 1} team icons into {BUNDLE_PATH}")
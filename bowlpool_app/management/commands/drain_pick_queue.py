@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bowlpool_app import pick_queue
+from bowlpool_app.submissions import drain_pick_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Save the pick submissions queued in BOWLPOOL_PICK_QUEUE_PATH, in batches. "
+        "With --interval, keep checking for new ones until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Seconds to wait when the queue is empty before checking again",
+        )
+
+    def handle(self, *args, **options):
+        if not pick_queue.enabled():
+            raise CommandError("BOWLPOOL_PICK_QUEUE_PATH isn't set")
+
+        while True:
+            saved = drain_pick_queue(options["batch_size"])
+
+            if saved:
+                self.stdout.write(f"Saved {saved} submissions")
+            elif options["interval"] is None:
+                return
+            else:
+                time.sleep(options["interval"])
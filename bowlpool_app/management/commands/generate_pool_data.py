@@ -0,0 +1,212 @@
+import csv
+import datetime
+import random
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bowlpool_app.models import BowlGame, BowlMatchup, BowlMatchupPick, Team, User
+from bowlpool_app.simulation import MARGIN_STDDEV
+from bowlpool_app.standings import rebuild_standings
+from bowlpool_app.submissions import CFP_CHAMPIONSHIP_NAME
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "fixtures"
+
+FIRST_NAMES = ["Alex", "Casey", "Jordan", "Morgan", "Riley", "Sam", "Taylor", "Quinn"]
+LAST_NAMES = ["Aarestad", "Baker", "Chen", "Diaz", "Evans", "Fischer", "Garcia"]
+
+
+def _fixture_names(filename):
+    with open(FIXTURES_DIR / filename, newline="") as f:
+        return [row["name"] for row in csv.DictReader(f)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic year of bowls, CFP games, users and picks for load "
+        "testing. Users get unusable passwords; log in with force_login."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument(
+            "--bowls",
+            type=int,
+            default=40,
+            help="Regular bowls, not counting the CFP semifinals and championship",
+        )
+        parser.add_argument(
+            "--scored",
+            type=int,
+            default=0,
+            help="How many of the earliest bowls get final scores",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the year's existing matchups and picks first",
+        )
+
+    def handle(self, *args, **options):
+        bowl_year = options["bowl_year"]
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            if options["clear"]:
+                BowlMatchup.objects.filter(bowl_year=bowl_year).delete()
+
+            matchups = self.create_matchups(rng, bowl_year, options["bowls"])
+            users = self.create_users(bowl_year, options["users"])
+            picks = self.create_picks(rng, matchups, users)
+            # the championship has no teams yet, so it is never scored
+            self.score_matchups(rng, matchups[:-1][: options["scored"]])
+
+            rebuild_standings(bowl_year)
+
+        self.stdout.write(
+            f"Generated {len(matchups)} matchups, {len(users)} users and "
+            f"{len(picks)} picks for {bowl_year}"
+        )
+
+    def create_matchups(self, rng, bowl_year, bowl_count):
+        team_names = _fixture_names("teams.csv")
+        team_names += [
+            f"Synthetic Team {i}"
+            for i in range(max(0, 2 * (bowl_count + 2) - len(team_names)))
+        ]
+        rng.shuffle(team_names)
+
+        Team.objects.bulk_create(
+            [Team(name=name, abbreviation=name[:4].upper()) for name in team_names],
+            ignore_conflicts=True,
+        )
+        teams = list(Team.objects.filter(name__in=team_names))
+        rng.shuffle(teams)
+
+        bowl_names = [
+            n for n in _fixture_names("bowl-games.csv") if n != CFP_CHAMPIONSHIP_NAME
+        ]
+        bowl_names += [
+            f"Synthetic Bowl {i}" for i in range(max(0, bowl_count - len(bowl_names)))
+        ]
+        bowl_names = bowl_names[:bowl_count]
+        semifinal_names = ["CFP Semifinal A", "CFP Semifinal B"]
+
+        all_names = bowl_names + semifinal_names + [CFP_CHAMPIONSHIP_NAME]
+        existing_games = set(
+            BowlGame.objects.filter(name__in=all_names).values_list("name", flat=True)
+        )
+        BowlGame.objects.bulk_create(
+            [BowlGame(name=name) for name in all_names if name not in existing_games]
+        )
+        bowl_games = {g.name: g for g in BowlGame.objects.filter(name__in=all_names)}
+
+        # bowl season runs from mid-December to the championship in early January
+        first_start = datetime.datetime(
+            bowl_year, 12, 16, 17, tzinfo=datetime.timezone.utc
+        )
+        season_hours = 21 * 24
+
+        def matchup(name, index, **kwargs):
+            spread = round(rng.gauss(0, 7))
+
+            return BowlMatchup(
+                bowl_game=bowl_games[name],
+                bowl_year=bowl_year,
+                start_time=first_start
+                + datetime.timedelta(hours=season_hours * index // len(all_names)),
+                home_team_point_spread=spread,
+                point_spread_extra_half=rng.random() < 0.5,
+                **kwargs,
+            )
+
+        matchups = [
+            matchup(
+                name,
+                i,
+                cfp_playoff_game=name in semifinal_names,
+                away_team=teams[2 * i],
+                home_team=teams[2 * i + 1],
+            )
+            for i, name in enumerate(bowl_names + semifinal_names)
+        ]
+        matchups.append(matchup(CFP_CHAMPIONSHIP_NAME, len(all_names) - 1))
+
+        return BowlMatchup.objects.bulk_create(matchups)
+
+    def create_users(self, bowl_year, user_count):
+        emails = [f"synthetic-{bowl_year}-{i}@example.com" for i in range(user_count)]
+
+        users = [
+            User(
+                email=email,
+                first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+                last_name=f"{LAST_NAMES[i % len(LAST_NAMES)]} {i}",
+            )
+            for i, email in enumerate(emails)
+        ]
+
+        for user in users:
+            user.set_unusable_password()
+
+        User.objects.bulk_create(users, ignore_conflicts=True)
+
+        return list(User.objects.filter(email__in=emails))
+
+    def create_picks(self, rng, matchups, users):
+        """Most people take the favorite by about the spread, with a long tail of
+        upset picks and blowout guesses"""
+
+        *games, championship = matchups
+        picks = []
+
+        for user in users:
+            semifinal_winners = []
+
+            for m in games:
+                favorite, underdog = (
+                    (m.home_team, m.away_team)
+                    if m.home_team_point_spread < 0
+                    else (m.away_team, m.home_team)
+                )
+                winner = favorite if rng.random() < 0.65 else underdog
+                margin = max(1, round(abs(rng.gauss(abs(m.home_team_point_spread), 7))))
+
+                picks.append(
+                    BowlMatchupPick(
+                        user=user, bowl_matchup=m, winner=winner, margin=margin
+                    )
+                )
+
+                if m.cfp_playoff_game:
+                    semifinal_winners.append(winner)
+
+            picks.append(
+                BowlMatchupPick(
+                    user=user,
+                    bowl_matchup=championship,
+                    winner=rng.choice(semifinal_winners),
+                    margin=max(1, round(abs(rng.gauss(7, 7)))),
+                )
+            )
+
+        return BowlMatchupPick.objects.bulk_create(picks)
+
+    def score_matchups(self, rng, matchups):
+        for m in matchups:
+            home_score = max(0, round(rng.gauss(27, 10)))
+            margin = round(rng.gauss(m.home_team_point_spread, MARGIN_STDDEV)) or 1
+
+            m.home_team_final_score = home_score
+            m.away_team_final_score = home_score + margin
+
+            if m.away_team_final_score < 0:
+                m.home_team_final_score -= m.away_team_final_score
+                m.away_team_final_score = 0
+
+        BowlMatchup.objects.bulk_update(
+            matchups, ["away_team_final_score", "home_team_final_score"]
+        )
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bowlpool_app.season_import import IMPORT_FIELDS, import_season, read_season_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update a year's matchups from a CSV or JSON season file, in one "
+        "transaction. Each row needs a bowl_game and may set any of: "
+        + ", ".join(IMPORT_FIELDS)
+        + ". Fields a row leaves out are unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--format",
+            choices=["csv", "json"],
+            help="Defaults to the file's extension",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the changes without saving them",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+
+        if file_format not in ("csv", "json"):
+            raise CommandError(f"Can't tell the format of {path}; use --format")
+
+        try:
+            with open(path, newline="") as f:
+                rows = read_season_file(f, file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Couldn't read {path}: {e}")
+
+        report = import_season(options["bowl_year"], rows, options["dry_run"])
+
+        for line in report.lines():
+            self.stdout.write(line)
+
+        if report.errors:
+            raise CommandError("Nothing was imported")
+
+        if options["dry_run"]:
+            self.stdout.write("Dry run; nothing was saved")
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from bowlpool_app import pools
+from bowlpool_app.models import Pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or migrate the databases of pools other than the default one, in "
+        "BOWLPOOL_POOL_DB_DIR. Run it after adding a pool and after every migrate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "slugs", nargs="*", help="Pools to migrate; defaults to every pool"
+        )
+
+    def handle(self, *args, **options):
+        pools_to_migrate = Pool.objects.all()
+
+        if options["slugs"]:
+            pools_to_migrate = pools_to_migrate.filter(slug__in=options["slugs"])
+
+            missing = set(options["slugs"]) - {p.slug for p in pools_to_migrate}
+
+            if missing:
+                raise CommandError(f"No such pools: {', '.join(sorted(missing))}")
+
+        Path(settings.BOWLPOOL_POOL_DB_DIR).mkdir(parents=True, exist_ok=True)
+
+        for pool in pools_to_migrate:
+            call_command(
+                "migrate",
+                database=pools.register_database(pool.database),
+                interactive=False,
+                verbosity=options["verbosity"] - 1,
+            )
+            self.stdout.write(f"Migrated {pool.slug}")
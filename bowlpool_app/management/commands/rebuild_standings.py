@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bowlpool_app.models import BowlMatchup, Pool
+from bowlpool_app.pools import using_pool
+from bowlpool_app.standings import rebuild_standings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute matchup winners and standings from the picks and final scores, in "
+        "the default pool and every other pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "bowl_years",
+            nargs="*",
+            type=int,
+            help="Years to rebuild; defaults to every year with matchups",
+        )
+        parser.add_argument(
+            "--pool",
+            action="append",
+            dest="slugs",
+            help="A pool to rebuild, by slug; repeat for more. Defaults to every pool, "
+            "including the default one",
+        )
+
+    def handle(self, *args, **options):
+        if options["slugs"]:
+            pools_to_rebuild = list(Pool.objects.filter(slug__in=options["slugs"]))
+
+            missing = set(options["slugs"]) - {p.slug for p in pools_to_rebuild}
+
+            if missing:
+                raise CommandError(f"No such pools: {', '.join(sorted(missing))}")
+        else:
+            pools_to_rebuild = [None, *Pool.objects.all()]
+
+        for pool in pools_to_rebuild:
+            with using_pool(pool):
+                self.rebuild(pool.slug if pool else "the default pool", options)
+
+    def rebuild(self, pool_name, options):
+        bowl_years = options["bowl_years"] or (
+            BowlMatchup.objects.order_by("bowl_year")
+            .values_list("bowl_year", flat=True)
+            .distinct()
+        )
+
+        for bowl_year in bowl_years:
+            rebuild_standings(bowl_year)
+            self.stdout.write(f"Rebuilt standings for {bowl_year} in {pool_name}")
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bowlpool_app.simulation import simulate_year
+
+
+class Command(BaseCommand):
+    help = "Simulate the remaining bowl games to estimate everyone's chances"
+
+    def add_arguments(self, parser):
+        parser.add_argument("bowl_year", type=int)
+        parser.add_argument("--simulations", type=int, default=100000)
+        parser.add_argument("--seed", type=int, help="Seed for repeatable results")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        results = simulate_year(
+            options["bowl_year"], options["simulations"], options["seed"]
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{results['simulations']} simulations of "
+            f"{len(results['remaining_matchups'])} remaining games "
+            f"in {elapsed:.2f}s"
+        )
+
+        for user in results["users"]:
+            self.stdout.write(
+                f"{user['name']:30} {user['wins']:3} wins "
+                f"{user['pool_win_probability']:8.2%} to win the pool"
+            )
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bowlpool_app.replicas import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the default database to BOWLPOOL_DB_REPLICA_PATH for read-only views "
+        "to read. With --interval, keep copying until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Seconds between copies; keep it under "
+            "BOWLPOOL_DB_REPLICA_STICKY_SECONDS",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.BOWLPOOL_DB_REPLICA_PATH:
+            raise CommandError(
+                "BOWLPOOL_DB_REPLICA_PATH isn't set, so the replica reads the "
+                "default database's file"
+            )
+
+        while True:
+            start = time.perf_counter()
+            sync_replica()
+
+            self.stdout.write(
+                f"Copied to {settings.BOWLPOOL_DB_REPLICA_PATH} in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+
+            if options["interval"] is None:
+                return
+
+            time.sleep(options["interval"])
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0005_bowlmatchup_point_spread_extra_half_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bowlmatchup",
+            name="picks_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Incremented whenever a pick for this matchup changes",
+            ),
+        ),
+    ]
@@ -0,0 +1,152 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def closest_margin_winners(final_margin, away_team_id, home_team_id, picks):
+    # a copy of bowlpool_app.standings.closest_margin_winners as of this migration
+    winning_team_id = away_team_id if final_margin > 0 else home_team_id
+
+    closest_distance = None
+    key_distances = {}
+
+    for key, winner_id, margin in picks:
+        if winner_id != winning_team_id:
+            continue
+
+        picked_margin = -margin if winner_id == home_team_id else margin
+        distance = abs(picked_margin - final_margin)
+
+        if closest_distance is None or distance < closest_distance:
+            closest_distance = distance
+
+        key_distances[key] = distance
+
+    return [
+        key for key, distance in key_distances.items() if distance == closest_distance
+    ]
+
+
+def backfill_standings(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    BowlMatchup = apps.get_model("bowlpool_app", "BowlMatchup")
+    BowlMatchupPick = apps.get_model("bowlpool_app", "BowlMatchupPick")
+    MatchupWinner = apps.get_model("bowlpool_app", "MatchupWinner")
+    Standing = apps.get_model("bowlpool_app", "Standing")
+
+    wins = {
+        key: 0
+        for key in BowlMatchupPick.objects.using(db_alias)
+        .values_list("bowl_matchup__bowl_year", "user_id")
+        .distinct()
+    }
+
+    for bowl_matchup in BowlMatchup.objects.using(db_alias).filter(
+        away_team_final_score__isnull=False, home_team_final_score__isnull=False
+    ):
+        winners = closest_margin_winners(
+            bowl_matchup.away_team_final_score - bowl_matchup.home_team_final_score,
+            bowl_matchup.away_team_id,
+            bowl_matchup.home_team_id,
+            BowlMatchupPick.objects.using(db_alias)
+            .filter(bowl_matchup=bowl_matchup)
+            .values_list("user_id", "winner_id", "margin"),
+        )
+
+        MatchupWinner.objects.using(db_alias).bulk_create(
+            [MatchupWinner(bowl_matchup=bowl_matchup, user_id=u) for u in winners]
+        )
+
+        for user_id in winners:
+            wins[bowl_matchup.bowl_year, user_id] += 1
+
+    Standing.objects.using(db_alias).bulk_create(
+        [
+            Standing(bowl_year=bowl_year, user_id=user_id, wins=w)
+            for (bowl_year, user_id), w in wins.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0006_bowlmatchup_picks_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MatchupWinner",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bowl_matchup",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="bowlpool_app.bowlmatchup",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Standing",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bowl_year", models.IntegerField()),
+                ("wins", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-wins"],
+                "indexes": [
+                    models.Index(
+                        fields=["bowl_year", "-wins"],
+                        name="bowlpool_ap_bowl_ye_d823b8_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="standing",
+            constraint=models.UniqueConstraint(
+                fields=("bowl_year", "user"), name="unique_standings_for_year"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="matchupwinner",
+            constraint=models.UniqueConstraint(
+                fields=("bowl_matchup", "user"), name="unique_winners_for_matchup"
+            ),
+        ),
+        migrations.RunPython(backfill_standings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0007_matchupwinner_standing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="YearVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bowl_year", models.IntegerField(unique=True)),
+                ("version", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
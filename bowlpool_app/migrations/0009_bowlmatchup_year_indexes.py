@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0008_yearversion"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bowlmatchup",
+            name="bowl_year",
+            field=models.IntegerField(
+                help_text="Year of the matchup if before January 1, otherwise the year before"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bowlmatchup",
+            index=models.Index(
+                fields=["bowl_year", "start_time"],
+                name="bowlpool_ap_bowl_ye_45a765_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bowlmatchup",
+            index=models.Index(
+                fields=["bowl_year", "cfp_playoff_game"],
+                name="bowlpool_ap_bowl_ye_64c2b1_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0009_bowlmatchup_year_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="YearEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bowl_year", models.IntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("score", "Score"), ("winners", "Winners")],
+                        max_length=16,
+                    ),
+                ),
+                ("data", models.JSONField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["bowl_year", "id"],
+                        name="bowlpool_ap_bowl_ye_97ca3a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
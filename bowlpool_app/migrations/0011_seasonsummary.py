@@ -0,0 +1,81 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_season_summaries(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    BowlMatchup = apps.get_model("bowlpool_app", "BowlMatchup")
+    SeasonSummary = apps.get_model("bowlpool_app", "SeasonSummary")
+    Standing = apps.get_model("bowlpool_app", "Standing")
+
+    for bowl_year in (
+        BowlMatchup.objects.using(db_alias)
+        .order_by("bowl_year")
+        .values_list("bowl_year", flat=True)
+        .distinct()
+    ):
+        matchups = BowlMatchup.objects.using(db_alias).filter(bowl_year=bowl_year)
+        standings = Standing.objects.using(db_alias).filter(bowl_year=bowl_year)
+        leader = standings.filter(wins__gt=0).order_by("-wins").first()
+
+        SeasonSummary.objects.using(db_alias).create(
+            bowl_year=bowl_year,
+            bowl_count=matchups.count(),
+            participant_count=standings.count(),
+            completed_count=matchups.filter(
+                away_team_final_score__isnull=False,
+                home_team_final_score__isnull=False,
+            ).count(),
+            leader_id=leader and leader.user_id,
+            leader_wins=leader.wins if leader else 0,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0010_yearevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SeasonSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bowl_year", models.IntegerField(unique=True)),
+                ("bowl_count", models.PositiveIntegerField(default=0)),
+                ("participant_count", models.PositiveIntegerField(default=0)),
+                (
+                    "completed_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Matchups with a final score"
+                    ),
+                ),
+                ("leader_wins", models.PositiveIntegerField(default=0)),
+                (
+                    "leader",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "season summaries",
+                "ordering": ["-bowl_year"],
+            },
+        ),
+        migrations.RunPython(backfill_season_summaries, migrations.RunPython.noop),
+    ]
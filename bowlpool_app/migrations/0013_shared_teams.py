@@ -0,0 +1,96 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:29
+
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+import django.db.models.deletion
+
+
+def move_pool_teams(apps, schema_editor):
+    """Point a pool's matchups and picks at the shared teams of the same names,
+    creating any the default database doesn't have, and drop the pool's own teams"""
+
+    db_alias = schema_editor.connection.alias
+
+    if db_alias == DEFAULT_DB_ALIAS:
+        return
+
+    if "bowlpool_app_team" not in schema_editor.connection.introspection.table_names():
+        return
+
+    Team = apps.get_model("bowlpool_app", "Team")
+    BowlMatchup = apps.get_model("bowlpool_app", "BowlMatchup")
+    BowlMatchupPick = apps.get_model("bowlpool_app", "BowlMatchupPick")
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT id, name, abbreviation FROM bowlpool_app_team")
+        pool_teams = cursor.fetchall()
+
+    shared_ids = {}
+
+    for team_id, name, abbreviation in pool_teams:
+        team, _ = Team.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+            name=name, defaults={"abbreviation": abbreviation}
+        )
+        shared_ids[team_id] = team.id
+
+    # row by row, since a pool's team ids and the shared ones may overlap
+    matchups = list(BowlMatchup.objects.using(db_alias))
+
+    for m in matchups:
+        m.away_team_id = shared_ids.get(m.away_team_id)
+        m.home_team_id = shared_ids.get(m.home_team_id)
+
+    BowlMatchup.objects.using(db_alias).bulk_update(
+        matchups, ["away_team", "home_team"]
+    )
+
+    picks = list(BowlMatchupPick.objects.using(db_alias))
+
+    for p in picks:
+        p.winner_id = shared_ids[p.winner_id]
+
+    BowlMatchupPick.objects.using(db_alias).bulk_update(picks, ["winner"])
+
+    schema_editor.execute("DROP TABLE bowlpool_app_team")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0012_pools"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bowlmatchup",
+            name="away_team",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="away_team",
+                to="bowlpool_app.team",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="bowlmatchup",
+            name="home_team",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="home_team",
+                to="bowlpool_app.team",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="bowlmatchuppick",
+            name="winner",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="bowlpool_app.team",
+            ),
+        ),
+        migrations.RunPython(move_pool_teams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bowlpool_app", "0013_shared_teams"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="yearversion",
+            name="matchups_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
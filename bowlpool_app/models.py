@@ -1,6 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
@@ -44,6 +44,54 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+
+        # the name as loaded, so that saving can tell whether it changed
+        if {"first_name", "last_name"} <= set(field_names):
+            instance.loaded_names = instance.names
+
+        return instance
+
+    @property
+    def names(self):
+        return self.first_name, self.last_name
+
+
+class Pool(models.Model):
+    """A group of users with their own matchups, picks and standings, kept in a
+    database of their own; see bowlpool_app.pools"""
+
+    name = models.CharField(max_length=128)
+    slug = models.SlugField(unique=True)
+    members = models.ManyToManyField(
+        User, through="PoolMembership", related_name="pools"
+    )
+
+    def __str__(self):
+        return str(self.name)
+
+    @property
+    def database(self):
+        return f"pool_{self.slug}"
+
+    class Meta:
+        ordering = ["name"]
+
+
+class PoolMembership(models.Model):
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return f"[{self.pool}] {self.user}"
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["pool", "user"], name="unique_pool_members")
+        ]
+
 
 class Team(models.Model):
     name = models.CharField(max_length=128, unique=True)
@@ -66,24 +114,66 @@ class BowlGame(models.Model):
         ordering = ["name"]
 
 
+def describe_favorite(
+    away_team, home_team, home_team_point_spread, point_spread_extra_half
+):
+    """The favored team and its spread, e.g. "Michigan by 3.5"
+    :param away_team: The away team's name, or None if it isn't set yet
+    :param home_team: The home team's name, or None if it isn't set yet
+    """
+
+    if not home_team or not away_team or home_team_point_spread is None:
+        return "?"
+
+    if home_team_point_spread == 0 and not point_spread_extra_half:
+        return "Pick 'em"
+
+    extra_point_five = ".5" if point_spread_extra_half else ""
+
+    return (
+        f"{home_team} by {abs(home_team_point_spread)}{extra_point_five}"
+        if home_team_point_spread < 0
+        else f"{away_team} by {home_team_point_spread}{extra_point_five}"
+    )
+
+
+class BowlMatchupQuerySet(models.QuerySet):
+    def with_display(self):
+        """Annotate the bowl game name and the final margin, computed in the same
+        statement as the matchups. display_name reads the bowl game's name instead
+        of loading it.
+
+        Teams are in the default database, so they can't be annotated here; load
+        them with pools.select_shared where their names are shown.
+        """
+
+        return self.annotate(
+            display_bowl_game=F("bowl_game__name"),
+            display_final_margin=F("away_team_final_score")
+            - F("home_team_final_score"),
+        )
+
+
 class BowlMatchup(models.Model):
     # TODO: think about how to handle the CFP National Championship matchup without
     # relying on its name
     bowl_game = models.ForeignKey(BowlGame, on_delete=models.CASCADE)
     bowl_year = models.IntegerField(
-        db_index=True,
         help_text=_(
             "Year of the matchup if before January 1, otherwise the year before"
         ),
     )
     cfp_playoff_game = models.BooleanField(default=False)
     start_time = models.DateTimeField(help_text=_("Stored as UTC"))
+    # teams are in the default database, shared by every pool, so a pool's
+    # database can't constrain references to them
     away_team = models.ForeignKey(
         Team,
         on_delete=models.CASCADE,
         related_name="away_team",
         blank=True,
         null=True,
+        db_constraint=False,
     )
     home_team = models.ForeignKey(
         Team,
@@ -91,6 +181,7 @@ class BowlMatchup(models.Model):
         related_name="home_team",
         blank=True,
         null=True,
+        db_constraint=False,
     )
     home_team_point_spread = models.IntegerField(
         help_text=_(
@@ -103,22 +194,54 @@ class BowlMatchup(models.Model):
     point_spread_extra_half = models.BooleanField(default=False)
     away_team_final_score = models.IntegerField(null=True, blank=True)
     home_team_final_score = models.IntegerField(null=True, blank=True)
+    picks_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_("Incremented whenever a pick for this matchup changes"),
+    )
 
-    def bowl_favorite(self):
-        if not self.home_team or not self.away_team:
-            return "?"
+    objects = BowlMatchupQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
 
-        if self.home_team_point_spread == 0 and not self.point_spread_extra_half:
-            return "Pick 'em"
+        # the scores as loaded, so that saving can tell whether they changed
+        if {"away_team_final_score", "home_team_final_score"} <= set(field_names):
+            instance.loaded_final_scores = instance.final_scores
+
+        return instance
+
+    @property
+    def has_display(self):
+        """Whether this matchup was loaded with BowlMatchupQuerySet.with_display"""
 
-        extra_point_five = ".5" if self.point_spread_extra_half else ""
+        return "display_bowl_game" in self.__dict__
 
-        return (
-            f"{self.home_team} by {abs(self.home_team_point_spread)}{extra_point_five}"
-            if self.home_team_point_spread < 0
-            else f"{self.away_team} by {self.home_team_point_spread}{extra_point_five}"
+    def bowl_favorite(self):
+        return describe_favorite(
+            self.display_away_team,
+            self.display_home_team,
+            self.home_team_point_spread,
+            self.point_spread_extra_half,
         )
 
+    @property
+    def display_away_team(self):
+        return self.away_team.name if self.away_team_id else None
+
+    @property
+    def display_home_team(self):
+        return self.home_team.name if self.home_team_id else None
+
+    @property
+    def display_away_abbreviation(self):
+        return self.away_team.abbreviation if self.away_team_id else None
+
+    @property
+    def display_home_abbreviation(self):
+        return self.home_team.abbreviation if self.home_team_id else None
+
     def clean(self):
         if (
             self.away_team_final_score is None
@@ -128,6 +251,10 @@ class BowlMatchup(models.Model):
         ):
             raise ValidationError(_("Score must be set for both teams or neither one"))
 
+    @property
+    def final_scores(self):
+        return self.away_team_final_score, self.home_team_final_score
+
     @property
     def final_margin(self):
         """The final margin, if the game is complete: Away score minus Home score
@@ -141,10 +268,11 @@ class BowlMatchup(models.Model):
 
     @property
     def display_name(self):
-        away_team = str(self.away_team) if self.away_team else "?"
-        home_team = str(self.home_team) if self.home_team else "?"
+        bowl_game = self.display_bowl_game if self.has_display else self.bowl_game.name
+        away_team = self.display_away_team or "?"
+        home_team = self.display_home_team or "?"
 
-        dn = f"{self.bowl_game.name}: {away_team} vs {home_team}"
+        dn = f"{bowl_game}: {away_team} vs {home_team}"
 
         if self.cfp_playoff_game:
             dn += " (CFP Semifinal)"
@@ -167,12 +295,19 @@ class BowlMatchup(models.Model):
                 fields=["bowl_year", "bowl_game"], name="unique_bowls_for_year"
             )
         ]
+        # these also serve every plain bowl_year lookup
+        indexes = [
+            models.Index(fields=["bowl_year", "start_time"]),
+            models.Index(fields=["bowl_year", "cfp_playoff_game"]),
+        ]
 
 
 class BowlMatchupPick(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # users are in the default database, so a pool's database can't constrain
+    # references to them; the same goes for every other model's user and team
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     bowl_matchup = models.ForeignKey(BowlMatchup, on_delete=models.CASCADE)
-    winner = models.ForeignKey(Team, on_delete=models.CASCADE)
+    winner = models.ForeignKey(Team, on_delete=models.CASCADE, db_constraint=False)
     margin = models.IntegerField()
 
     def __str__(self):
@@ -192,3 +327,97 @@ class BowlMatchupPick(models.Model):
     def clean(self):
         if self.margin == 0:
             raise ValidationError(_("Must pick a nonzero margin"))
+
+
+class MatchupWinner(models.Model):
+    """A user whose pick came closest to the final margin of a finished matchup"""
+
+    bowl_matchup = models.ForeignKey(BowlMatchup, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+
+    def __str__(self):
+        return f"[{self.user}] {self.bowl_matchup}"
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["bowl_matchup", "user"], name="unique_winners_for_matchup"
+            )
+        ]
+
+
+class Standing(models.Model):
+    """A user's running number of matchup wins for a year, kept up to date by
+    bowlpool_app.standings"""
+
+    bowl_year = models.IntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    wins = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"[{self.bowl_year}] {self.user}: {self.wins}"
+
+    class Meta:
+        ordering = ["-wins"]
+        constraints = [
+            UniqueConstraint(
+                fields=["bowl_year", "user"], name="unique_standings_for_year"
+            )
+        ]
+        indexes = [models.Index(fields=["bowl_year", "-wins"])]
+
+
+class YearVersion(models.Model):
+    """A counter bumped on every change to a year's data; cached pages for the year
+    are keyed by it. matchups_version is bumped on every change but a pick's, for
+    what depends only on the matchups, their teams and winners."""
+
+    bowl_year = models.IntegerField(unique=True)
+    version = models.PositiveIntegerField(default=0)
+    matchups_version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"[{self.bowl_year}] {self.version}"
+
+
+class YearEvent(models.Model):
+    """A change to a year's scores or winners, pushed to clients of the year's live
+    updates stream"""
+
+    SCORE = "score"
+    WINNERS = "winners"
+    KIND_CHOICES = [(SCORE, _("Score")), (WINNERS, _("Winners"))]
+
+    bowl_year = models.IntegerField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    data = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"[{self.bowl_year}] {self.kind} {self.id}"
+
+    class Meta:
+        indexes = [models.Index(fields=["bowl_year", "id"])]
+
+
+class SeasonSummary(models.Model):
+    """Counts and the current leader for a year, kept up to date by
+    bowlpool_app.standings so the year index needn't compute them"""
+
+    bowl_year = models.IntegerField(unique=True)
+    bowl_count = models.PositiveIntegerField(default=0)
+    participant_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(
+        default=0, help_text=_("Matchups with a final score")
+    )
+    leader = models.ForeignKey(
+        User, on_delete=models.SET_NULL, blank=True, null=True, db_constraint=False
+    )
+    leader_wins = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"[{self.bowl_year}] {self.completed_count}/{self.bowl_count} complete"
+
+    class Meta:
+        ordering = ["-bowl_year"]
+        verbose_name_plural = "season summaries"
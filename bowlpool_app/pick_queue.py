@@ -0,0 +1,165 @@
+"""
+A durable, append-only queue of validated pick submissions, for the rush before
+kickoff.
+
+With settings.BOWLPOOL_PICK_QUEUE_PATH set, submissions.submit_picks validates a
+submission as usual, then appends its picks to a SQLite file of their own rather
+than saving them. Appending holds the queue file's lock for one insert, instead of
+holding the database's for the upsert and all of its bookkeeping, so a burst of
+submissions no longer queues up on the database. manage.py drain_pick_queue saves
+queued submissions in batched transactions with submissions.drain_pick_queue.
+
+Each submission is acknowledged with the server time it arrived at, and its picks
+are checked against the matchups' start times as of then rather than when they're
+drained. Until a submission is drained, its picks are shown in place of the user's
+saved ones. Drained submissions are deleted after KEEP_APPLIED.
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submission (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pool TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    bowl_year INTEGER NOT NULL,
+    submitted_at TEXT NOT NULL,
+    picks TEXT NOT NULL,
+    applied_at TEXT
+);
+CREATE INDEX IF NOT EXISTS submission_pending
+    ON submission (id) WHERE applied_at IS NULL;
+CREATE INDEX IF NOT EXISTS submission_pending_for_user
+    ON submission (pool, user_id, bowl_year) WHERE applied_at IS NULL;
+"""
+
+# how long drained submissions stay in the queue, for checking a drain against
+KEEP_APPLIED = datetime.timedelta(hours=1)
+
+# pool is the database alias of the pool the picks are for; picks is a list of
+# (matchup id, winner id, margin)
+Submission = namedtuple(
+    "Submission", ["id", "pool", "user_id", "bowl_year", "submitted_at", "picks"]
+)
+
+_local = threading.local()
+
+
+def enabled():
+    return bool(settings.BOWLPOOL_PICK_QUEUE_PATH)
+
+
+def _connection():
+    path = str(settings.BOWLPOOL_PICK_QUEUE_PATH)
+    connections = getattr(_local, "connections", None)
+
+    if connections is None:
+        connections = _local.connections = {}
+
+    if path not in connections:
+        connection = sqlite3.connect(
+            path, timeout=settings.DATABASES["default"]["OPTIONS"]["timeout"]
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        # an acknowledged submission must survive a power cut, not just a crash
+        connection.execute("PRAGMA synchronous = FULL")
+        connection.executescript(SCHEMA)
+        connections[path] = connection
+
+    return connections[path]
+
+
+def enqueue(pool, user_id, bowl_year, submitted_at, picks):
+    """Append a submission
+    :param pool: The database alias of the pool the picks are for
+    :param picks: (matchup id, winner id, margin) for each valid pick
+    :return: The submission's id
+    """
+
+    connection = _connection()
+
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO submission (pool, user_id, bowl_year, submitted_at, picks) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (pool, user_id, bowl_year, submitted_at.isoformat(), json.dumps(picks)),
+        )
+
+    return cursor.lastrowid
+
+
+def pending_picks(pool, user_id, bowl_year):
+    """A user's queued picks for a year in a pool, later submissions' picks replacing earlier
+    ones
+    :return: A dict of matchup id to (winner id, margin); empty if the queue is
+        disabled
+    """
+
+    if not enabled():
+        return {}
+
+    picks = {}
+
+    for (submission_picks,) in _connection().execute(
+        "SELECT picks FROM submission "
+        "WHERE pool = ? AND user_id = ? AND bowl_year = ? AND applied_at IS NULL "
+        "ORDER BY id",
+        (pool, user_id, bowl_year),
+    ):
+        for matchup_id, winner_id, margin in json.loads(submission_picks):
+            picks[matchup_id] = (winner_id, margin)
+
+    return picks
+
+
+def next_batch(size):
+    """The oldest submissions not yet applied, oldest first"""
+
+    return [
+        Submission(
+            id,
+            pool,
+            user_id,
+            bowl_year,
+            datetime.datetime.fromisoformat(submitted_at),
+            [tuple(p) for p in json.loads(picks)],
+        )
+        for id, pool, user_id, bowl_year, submitted_at, picks in _connection().execute(
+            "SELECT id, pool, user_id, bowl_year, submitted_at, picks FROM submission "
+            "WHERE applied_at IS NULL ORDER BY id LIMIT ?",
+            (size,),
+        )
+    ]
+
+
+def mark_applied(last_id, applied_at):
+    """Acknowledge every submission up to and including last_id as saved, and delete
+    those saved more than KEEP_APPLIED before applied_at"""
+
+    connection = _connection()
+
+    with connection:
+        connection.execute(
+            "UPDATE submission SET applied_at = ? "
+            "WHERE applied_at IS NULL AND id <= ?",
+            (applied_at.isoformat(), last_id),
+        )
+        connection.execute(
+            "DELETE FROM submission WHERE applied_at < ?",
+            ((applied_at - KEEP_APPLIED).isoformat(),),
+        )
+
+
+def close():
+    """Close this thread's queue connections"""
+
+    for connection in getattr(_local, "connections", {}).values():
+        connection.close()
+
+    _local.connections = {}
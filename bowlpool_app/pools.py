@@ -0,0 +1,137 @@
+"""
+Pools: groups of users each running their own bowl pool, with a SQLite database
+apiece so that writes in one pool never wait on another's lock.
+
+The default database holds what every pool shares: users, their sessions, teams and
+the pools themselves. It also holds the original pool, which every user belongs to.
+Each Pool keeps everything else in bowlpool_app (bowl games, matchups, picks,
+standings, year versions...) in settings.BOWLPOOL_POOL_DB_DIR/<slug>.sqlite3, which
+routers.PoolRouter sends those models' queries to while the pool is current.
+PoolMiddleware makes the pool chosen in the session current for each request, and
+using_pool does the same for a block of code.
+
+Queries can't join across databases, so a pool's data is never joined to users or
+teams; select_shared fetches them separately where that's needed.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+from .models import Pool
+
+SESSION_KEY = "bowlpool_pool"
+DATABASE_PREFIX = "pool_"
+
+current_db = contextvars.ContextVar("current_pool_db", default=DEFAULT_DB_ALIAS)
+
+
+def is_pool_database(alias):
+    return alias.startswith(DATABASE_PREFIX)
+
+
+def register_database(alias):
+    """Add a pool's database to the connection settings if it isn't there yet. It
+    shares every setting with the default database but its file name.
+    :return: alias
+    """
+
+    if alias not in connections.settings:
+        slug = alias[len(DATABASE_PREFIX) :]
+
+        connections.settings[alias] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            "NAME": Path(settings.BOWLPOOL_POOL_DB_DIR) / f"{slug}.sqlite3",
+        }
+
+    return alias
+
+
+@contextmanager
+def using_database(alias):
+    """Make the pool whose database is alias current in the block"""
+
+    if alias != DEFAULT_DB_ALIAS:
+        register_database(alias)
+
+    token = current_db.set(alias)
+
+    try:
+        yield
+    finally:
+        current_db.reset(token)
+
+
+def using_pool(pool):
+    """Make a Pool current in the block; None for the default pool"""
+
+    return using_database(pool.database if pool else DEFAULT_DB_ALIAS)
+
+
+def select_shared(queryset, *fields):
+    """select_related() for fields referring to users or teams, which can only be
+    joined in the default database and its replica. Other pools' data gets them
+    with one more query per field."""
+
+    if not is_pool_database(queryset.db):
+        return queryset.select_related(*fields)
+
+    return queryset.prefetch_related(*fields)
+
+
+def pool_for_request(request):
+    """The pool chosen in the request's session, if the user is one of its members
+    :return: A Pool, or None for the default pool
+    """
+
+    # anonymous users only see the default pool
+    if not request.user.is_authenticated:
+        return None
+
+    slug = request.session.get(SESSION_KEY)
+
+    if slug is None:
+        return None
+
+    return Pool.objects.filter(slug=slug, members=request.user).first()
+
+
+class PoolMiddleware:
+    """Make the pool chosen in the session current for the request, until the
+    response is closed; streamed responses are read after the middleware returns"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        self.set_pool(request, pool_for_request(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_pool(request, await sync_to_async(pool_for_request)(request))
+        return await self.get_response(request)
+
+    @staticmethod
+    def set_pool(request, pool):
+        request.pool = pool
+        current_db.set(register_database(pool.database) if pool else DEFAULT_DB_ALIAS)
+
+
+@receiver(request_finished)
+def reset_pool(sender, **kwargs):
+    current_db.set(DEFAULT_DB_ALIAS)
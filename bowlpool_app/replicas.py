@@ -0,0 +1,111 @@
+"""
+Read-only views read from a replica of the default database, so the crowd reloading
+the picks pages doesn't share a connection with pick submissions and score entry.
+
+The replica is the "replica" database. By default it's a second, read-only
+connection to the default database's file: WAL readers see every committed write
+and never block a writer. With settings.BOWLPOOL_DB_REPLICA_PATH set it's a copy of
+the file instead, refreshed by "manage.py sync_replica", which keeps readers off
+the primary's file and locks entirely, at the cost of lagging behind it.
+
+Views decorated with replica_reads read the default pool's data from the replica.
+Users, teams, sessions and other pools' databases are always read from their own
+database. After a user writes anything, their reads stick to the primary for
+settings.BOWLPOOL_DB_REPLICA_STICKY_SECONDS, so they never see their own picks go
+missing from a lagging copy.
+"""
+
+import contextvars
+import sqlite3
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+REPLICA_DB_ALIAS = "replica"
+STICKY_SESSION_KEY = "bowlpool_primary_until"
+
+reading_replica = contextvars.ContextVar("reading_replica", default=False)
+
+
+def replica_reads(view):
+    """Mark a view that only reads, so ReplicaMiddleware can send its reads to the
+    replica"""
+
+    view.replica_reads = True
+    return view
+
+
+def _sticks_to_primary(request):
+    return request.session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+class ReplicaMiddleware:
+    """Read from the replica in replica_reads views, until the response is closed;
+    streamed responses are read after the middleware returns"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        self.stick_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        await sync_to_async(self.stick_to_primary)(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        reading_replica.set(
+            settings.BOWLPOOL_DB_REPLICA_READS
+            and getattr(view_func, "replica_reads", False)
+            and request.method in ("GET", "HEAD")
+            and not _sticks_to_primary(request)
+        )
+
+    @staticmethod
+    def stick_to_primary(request, response):
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            request.session[STICKY_SESSION_KEY] = (
+                time.time() + settings.BOWLPOOL_DB_REPLICA_STICKY_SECONDS
+            )
+
+
+def sync_replica():
+    """Copy the default database to settings.BOWLPOOL_DB_REPLICA_PATH as of one
+    moment. The copy is in WAL mode, so its readers carry on reading the previous
+    copy until this one is committed."""
+
+    primary = sqlite3.connect(settings.DATABASES["default"]["NAME"])
+    replica = sqlite3.connect(
+        settings.BOWLPOOL_DB_REPLICA_PATH,
+        timeout=settings.DATABASES["default"]["OPTIONS"]["timeout"],
+    )
+
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
+
+
+@receiver(request_finished)
+def reset_reading_replica(sender, **kwargs):
+    reading_replica.set(False)
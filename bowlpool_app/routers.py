@@ -0,0 +1,71 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from . import pools, replicas
+
+# kept in the default database for every pool
+SHARED_MODELS = {"user", "pool", "poolmembership", "team"}
+
+
+def _is_pool_data(model):
+    return (
+        model._meta.app_label == "bowlpool_app"
+        and model._meta.model_name not in SHARED_MODELS
+    )
+
+
+class PoolRouter:
+    """Send queries for bowlpool_app's pool data to the current pool's database;
+    see bowlpool_app.pools"""
+
+    def db_for_read(self, model, **hints):
+        # otherwise Django would look for the users and teams of a pool's picks in
+        # the pool
+        if not _is_pool_data(model):
+            return DEFAULT_DB_ALIAS
+
+        # objects related to one of a pool's objects are in the same pool
+        instance = hints.get("instance")
+
+        if (
+            instance is not None
+            and _is_pool_data(instance._meta.model)
+            and instance._state.db is not None
+        ):
+            return instance._state.db
+
+        return pools.current_db.get()
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # any pool's data can refer to users and teams
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not pools.is_pool_database(db):
+            return None
+
+        return app_label == "bowlpool_app" and model_name not in SHARED_MODELS
+
+
+class ReplicaRouter:
+    """Send reads of the default pool's data to the replica while
+    replicas.reading_replica is set; see bowlpool_app.replicas. Writes, and every
+    other database, are left to PoolRouter."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            replicas.reading_replica.get()
+            and _is_pool_data(model)
+            and pools.current_db.get() == DEFAULT_DB_ALIAS
+        ):
+            return replicas.REPLICA_DB_ALIAS
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is the default database, or a copy of it
+        if db == replicas.REPLICA_DB_ALIAS:
+            return False
+
+        return None
@@ -0,0 +1,351 @@
+"""
+Bulk import of a year's matchups, spreads and final scores from a CSV or JSON file.
+
+Each row names its bowl game with "bowl_game" and may set any of IMPORT_FIELDS.
+Fields a row leaves out keep their current values, so a file of just bowl games
+and final scores records a night of results. Blank values clear a field, except
+start_time, which every matchup needs, so a blank one is left as it is. Teams and
+bowl games are looked up by name and created if they don't exist yet.
+"""
+
+import csv
+import datetime
+import io
+import json
+from typing import Dict, List
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext as _
+
+from bowlpool.db import immediate_atomic, retry_on_locked
+
+from .cache import bump_year_versions
+from .events import publish_score
+from .models import BowlGame, BowlMatchup, Team
+from .pools import current_db, select_shared
+from .standings import update_matchup_winners, update_season_summaries
+
+IMPORT_FIELDS = [
+    "cfp_playoff_game",
+    "start_time",
+    "away_team",
+    "home_team",
+    "home_team_point_spread",
+    "point_spread_extra_half",
+    "away_team_final_score",
+    "home_team_final_score",
+]
+
+TEAM_FIELDS = ["away_team", "home_team"]
+BOOLEAN_FIELDS = ["cfp_playoff_game", "point_spread_extra_half"]
+INTEGER_FIELDS = [
+    "home_team_point_spread",
+    "away_team_final_score",
+    "home_team_final_score",
+]
+
+# changes to these decide who won the matchup
+RESULT_FIELDS = TEAM_FIELDS + ["away_team_final_score", "home_team_final_score"]
+
+
+class SeasonImportReport:
+    """What an import changed, or the errors that stopped it from changing anything"""
+
+    def __init__(self):
+        self.errors = []
+        self.created_teams = []
+        self.created_bowl_games = []
+        self.created_matchups = []
+        # (matchup, {field: (old value, new value)})
+        self.updated_matchups = []
+        self.unchanged_count = 0
+
+    def lines(self) -> List[str]:
+        lines = list(self.errors)
+
+        lines.extend(f"Created team {name}" for name in self.created_teams)
+        lines.extend(f"Created bowl game {name}" for name in self.created_bowl_games)
+        lines.extend(f"Created {m}" for m in self.created_matchups)
+
+        for m, changes in self.updated_matchups:
+            lines.append(
+                f"Updated {m}: "
+                + ", ".join(
+                    f"{field} {old} -> {new}" for field, (old, new) in changes.items()
+                )
+            )
+
+        lines.append(
+            f"{len(self.created_matchups)} created, {len(self.updated_matchups)} "
+            f"updated, {self.unchanged_count} unchanged"
+        )
+
+        return lines
+
+
+def read_season_file(season_file, file_format) -> List[Dict]:
+    """Read the rows of an uploaded or opened season file
+    :param file_format: "csv" or "json"
+    :return: A list of dicts of column name to value, in file order
+    """
+
+    content = season_file.read()
+
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+
+    if file_format == "json":
+        rows = json.loads(content)
+
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError(_("A JSON season file must be a list of objects"))
+
+        return rows
+
+    return [
+        {column: value.strip() for column, value in row.items() if column}
+        for row in csv.DictReader(io.StringIO(content))
+    ]
+
+
+def _parse_value(field, value):
+    """Parse a CSV string or JSON value for one of IMPORT_FIELDS
+    :raise ValueError: If the value isn't valid for the field
+    """
+
+    if value is None or value == "":
+        if field in BOOLEAN_FIELDS:
+            return False
+
+        return None
+
+    if field in BOOLEAN_FIELDS:
+        if isinstance(value, bool):
+            return value
+
+        if str(value).lower() in ("1", "true", "yes", "y"):
+            return True
+
+        if str(value).lower() in ("0", "false", "no", "n"):
+            return False
+
+        raise ValueError(value)
+
+    if field in INTEGER_FIELDS:
+        if isinstance(value, bool):
+            raise ValueError(value)
+
+        return int(value)
+
+    if field == "start_time":
+        start_time = parse_datetime(str(value))
+
+        if start_time is None:
+            raise ValueError(value)
+
+        # start times without an offset are taken as UTC, the way they're stored
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=datetime.timezone.utc)
+
+        return start_time
+
+    return str(value).strip()
+
+
+def _parse_rows(rows, report):
+    """Parse every row into a dict of field to value, keyed by bowl game name"""
+
+    parsed_rows = {}
+
+    for line, row in enumerate(rows, start=1):
+        bowl_game = str(row.get("bowl_game") or "").strip()
+
+        if not bowl_game:
+            report.errors.append(_("Row %(line)d: no bowl_game") % {"line": line})
+            continue
+
+        if bowl_game in parsed_rows:
+            report.errors.append(
+                _("Row %(line)d: %(bowl_game)s is listed more than once")
+                % {"line": line, "bowl_game": bowl_game}
+            )
+            continue
+
+        values = {}
+
+        for field in IMPORT_FIELDS:
+            if field not in row or field == "start_time" and row[field] in (None, ""):
+                continue
+
+            try:
+                values[field] = _parse_value(field, row[field])
+            except (TypeError, ValueError):
+                report.errors.append(
+                    _("Row %(line)d: invalid %(field)s %(value)r")
+                    % {"line": line, "field": field, "value": row[field]}
+                )
+
+        parsed_rows[bowl_game] = values
+
+    return parsed_rows
+
+
+def _get_or_create_by_name(model, names, created_names, **defaults_for_name):
+    """Look up model rows by name in one query, bulk-creating the missing ones
+    :return: A dict of name to model instance
+    """
+
+    by_name = {}
+
+    # where names are duplicated, as bowl game names may be, use the oldest row
+    for instance in model.objects.filter(name__in=names).order_by("-id"):
+        by_name[instance.name] = instance
+
+    missing_names = sorted(set(names) - by_name.keys())
+
+    if missing_names:
+        for instance in model.objects.bulk_create(
+            [
+                model(name=name, **{k: f(name) for k, f in defaults_for_name.items()})
+                for name in missing_names
+            ]
+        ):
+            by_name[instance.name] = instance
+
+        created_names.extend(missing_names)
+
+    return by_name
+
+
+def _import_rows(bowl_year, parsed_rows, report, dry_run):
+    team_names = {
+        values[field]
+        for values in parsed_rows.values()
+        for field in TEAM_FIELDS
+        if values.get(field)
+    }
+
+    teams = _get_or_create_by_name(
+        Team,
+        team_names,
+        report.created_teams,
+        abbreviation=lambda name: name[:4].upper(),
+    )
+    bowl_games = _get_or_create_by_name(
+        BowlGame, parsed_rows.keys(), report.created_bowl_games
+    )
+
+    existing_matchups = {
+        m.bowl_game_id: m
+        for m in select_shared(
+            BowlMatchup.objects.filter(
+                bowl_year=bowl_year, bowl_game__in=bowl_games.values()
+            ).select_related("bowl_game"),
+            "away_team",
+            "home_team",
+        )
+    }
+
+    upserts = []
+    rescored_bowl_games = []
+
+    for bowl_game_name, values in parsed_rows.items():
+        bowl_game = bowl_games[bowl_game_name]
+        m = existing_matchups.get(bowl_game.id)
+        created = m is None
+
+        if created:
+            m = BowlMatchup(bowl_game=bowl_game, bowl_year=bowl_year)
+
+        changes = {}
+
+        for field, value in values.items():
+            if field in TEAM_FIELDS:
+                value = teams[value] if value else None
+
+            old_value = getattr(m, field)
+
+            if old_value != value:
+                changes[field] = (old_value, value)
+                setattr(m, field, value)
+
+        if m.start_time is None:
+            report.errors.append(
+                _("%(bowl_game)s is new, so it needs a start_time")
+                % {"bowl_game": bowl_game_name}
+            )
+            continue
+
+        if (m.away_team_final_score is None) != (m.home_team_final_score is None):
+            report.errors.append(
+                _("%(bowl_game)s: score must be set for both teams or neither one")
+                % {"bowl_game": bowl_game_name}
+            )
+            continue
+
+        if created:
+            report.created_matchups.append(m)
+        elif changes:
+            report.updated_matchups.append((m, changes))
+
+            if changes.keys() & set(RESULT_FIELDS):
+                rescored_bowl_games.append(bowl_game.id)
+        else:
+            report.unchanged_count += 1
+            continue
+
+        upserts.append(
+            BowlMatchup(
+                bowl_game=bowl_game,
+                bowl_year=bowl_year,
+                **{field: getattr(m, field) for field in IMPORT_FIELDS},
+            )
+        )
+
+    if report.errors or dry_run:
+        # teams are created in the default database, whatever the pool
+        for using in {current_db.get(), DEFAULT_DB_ALIAS}:
+            transaction.set_rollback(True, using=using)
+
+        return
+
+    # bulk_create skips the post_save signal, so do its work here
+    BowlMatchup.objects.bulk_create(
+        upserts,
+        update_conflicts=True,
+        unique_fields=["bowl_year", "bowl_game"],
+        update_fields=IMPORT_FIELDS,
+    )
+
+    for m in BowlMatchup.objects.filter(
+        bowl_year=bowl_year, bowl_game__in=rescored_bowl_games
+    ):
+        publish_score(m)
+        update_matchup_winners(m)
+
+    update_season_summaries([bowl_year])
+    bump_year_versions([bowl_year])
+
+
+def import_season(bowl_year, rows, dry_run=False) -> SeasonImportReport:
+    """Upsert a year's matchups from the rows of a season file in one transaction,
+    keyed on the unique_bowls_for_year constraint. Nothing is saved if any row has
+    an error, or for a dry run.
+    """
+
+    report = SeasonImportReport()
+    parsed_rows = _parse_rows(rows, report)
+
+    if report.errors:
+        return report
+
+    def save():
+        with immediate_atomic(using=current_db.get()), transaction.atomic(
+            using=DEFAULT_DB_ALIAS
+        ):
+            _import_rows(bowl_year, parsed_rows, report, dry_run)
+
+    retry_on_locked(save)
+
+    return report
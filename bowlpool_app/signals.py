@@ -0,0 +1,173 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import backends
+from .cache import (
+    bump_picks_version,
+    bump_year_versions,
+    bump_year_versions_for_bowl_games,
+    bump_year_versions_for_teams,
+)
+from .events import publish_score
+from .models import (
+    BowlGame,
+    BowlMatchup,
+    BowlMatchupPick,
+    MatchupWinner,
+    Pool,
+    Standing,
+    Team,
+    User,
+)
+from .pools import using_pool
+from .standings import (
+    ensure_standings,
+    remove_matchup_winners,
+    remove_standings_without_picks,
+    update_matchup_winners,
+    update_season_summaries,
+)
+
+
+@receiver(post_save, sender=BowlMatchupPick)
+def pick_saved(sender, instance, **kwargs):
+    bump_picks_version([instance.bowl_matchup_id])
+
+    bowl_matchup = instance.bowl_matchup
+    ensure_standings(bowl_matchup.bowl_year, [instance.user_id])
+
+    if bowl_matchup.final_margin is not None:
+        update_matchup_winners(bowl_matchup)
+
+    update_season_summaries([bowl_matchup.bowl_year])
+    bump_year_versions(
+        [bowl_matchup.bowl_year], picks_only=bowl_matchup.final_margin is None
+    )
+
+
+@receiver(post_delete, sender=BowlMatchupPick)
+def pick_deleted(sender, instance, **kwargs):
+    bump_picks_version([instance.bowl_matchup_id])
+
+    # the matchup may be going away in the same cascade
+    bowl_matchup = BowlMatchup.objects.filter(id=instance.bowl_matchup_id).first()
+
+    if bowl_matchup is None:
+        return
+
+    if bowl_matchup.final_margin is not None:
+        update_matchup_winners(bowl_matchup)
+
+    remove_standings_without_picks(bowl_matchup.bowl_year, [instance.user_id])
+    update_season_summaries([bowl_matchup.bowl_year])
+    bump_year_versions(
+        [bowl_matchup.bowl_year], picks_only=bowl_matchup.final_margin is None
+    )
+
+
+@receiver(post_save, sender=BowlMatchup)
+def matchup_saved(sender, instance, created, **kwargs):
+    # a new matchup is on nobody's page yet, and most edits leave the score alone; an
+    # instance that wasn't loaded from the database may have changed it
+    if not created and getattr(instance, "loaded_final_scores", None) != (
+        instance.final_scores
+    ):
+        publish_score(instance)
+
+    instance.loaded_final_scores = instance.final_scores
+
+    update_matchup_winners(instance)
+    update_season_summaries([instance.bowl_year])
+    bump_year_versions([instance.bowl_year])
+
+
+@receiver(pre_delete, sender=BowlMatchup)
+def matchup_deleting(sender, instance, **kwargs):
+    remove_matchup_winners(instance)
+
+
+@receiver(post_delete, sender=BowlMatchup)
+def matchup_deleted(sender, instance, **kwargs):
+    # its picks went with it, which may have been some users' only ones
+    remove_standings_without_picks(instance.bowl_year)
+    update_season_summaries([instance.bowl_year])
+    bump_year_versions([instance.bowl_year])
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_changed(sender, instance, created=False, **kwargs):
+    # a new team is in nobody's matchups yet
+    if created:
+        return
+
+    # teams are shared, so every pool's matchups may show this one
+    for pool in [None, *Pool.objects.all()]:
+        with using_pool(pool):
+            bump_year_versions_for_teams([instance.id])
+
+
+@receiver(pre_delete, sender=Team)
+def team_deleting(sender, instance, **kwargs):
+    # deleting a team cascades to the default pool's matchups and picks, but other
+    # pools' are in databases of their own
+    for pool in Pool.objects.all():
+        with using_pool(pool):
+            BowlMatchup.objects.filter(
+                Q(away_team=instance) | Q(home_team=instance)
+            ).delete()
+            BowlMatchupPick.objects.filter(winner=instance).delete()
+
+
+@receiver(post_save, sender=BowlGame)
+@receiver(post_delete, sender=BowlGame)
+def bowl_game_changed(sender, instance, **kwargs):
+    bump_year_versions_for_bowl_games([instance.id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    backends.forget_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # a new user has no picks yet, and most saves, such as logins, leave the name
+    # alone; an instance that wasn't loaded from the database may have changed it
+    if created or getattr(instance, "loaded_names", None) == instance.names:
+        return
+
+    instance.loaded_names = instance.names
+
+    # the name is on the rendered picks of every matchup the user picked, in every
+    # pool they're in
+    for pool in [None, *instance.pools.all()]:
+        with using_pool(pool):
+            picks = BowlMatchupPick.objects.filter(user=instance)
+
+            bump_picks_version(picks.values_list("bowl_matchup_id", flat=True))
+            bump_year_versions(
+                picks.values_list("bowl_matchup__bowl_year", flat=True).distinct(),
+                picks_only=True,
+            )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # deleting a user cascades to the default pool's picks and standings, but other
+    # pools' are in databases of their own
+    for pool in instance.pools.all():
+        with using_pool(pool):
+            bowl_years = set(
+                Standing.objects.filter(user=instance).values_list(
+                    "bowl_year", flat=True
+                )
+            )
+
+            BowlMatchupPick.objects.filter(user=instance).delete()
+            MatchupWinner.objects.filter(user=instance).delete()
+            Standing.objects.filter(user=instance).delete()
+            update_season_summaries(bowl_years)
+            bump_year_versions(bowl_years)
@@ -0,0 +1,158 @@
+import numpy as np
+
+from .models import BowlMatchup, BowlMatchupPick
+from .standings import ordered_standings
+
+# Standard deviation, in points, of a bowl game's final margin around the spread
+MARGIN_STDDEV = 13.5
+
+# Simulations scored at once; bounds the (simulations x users x games) arrays
+SIMULATION_BATCH_SIZE = 2000
+
+
+def expected_margin(bowl_matchup):
+    """The final margin (away score minus home score) implied by the point spread"""
+
+    spread = bowl_matchup.home_team_point_spread or 0
+
+    if bowl_matchup.point_spread_extra_half:
+        spread += -0.5 if spread < 0 else 0.5
+
+    return spread
+
+
+def sample_margins(rng, expected_margins, simulations):
+    """Sample whole-point, nonzero final margins for each remaining game
+    :return: A (simulations x games) array of away score minus home score
+    """
+
+    margins = np.rint(
+        rng.normal(
+            expected_margins, MARGIN_STDDEV, (simulations, len(expected_margins))
+        )
+    ).astype(np.float32)
+
+    # bowl games can't end in a tie, so settle them in overtime by a coin flip
+    ties = margins == 0
+    margins[ties] = rng.choice([-1, 1], size=np.count_nonzero(ties))
+
+    return margins
+
+
+def score_simulations(picked_margins, simulated_margins):
+    """Find the closest-margin winners of every game in every simulation
+    :param picked_margins: (users x games) picked away-minus-home margins, NaN if
+        the user didn't pick the game
+    :param simulated_margins: (simulations x games) final margins
+    :return: A (simulations x users x games) boolean array of matchup wins
+    """
+
+    picked = picked_margins[np.newaxis, :, :]
+    actual = simulated_margins[:, np.newaxis, :]
+
+    called_winner = np.sign(picked) == np.sign(actual)
+    distance = np.abs(picked - actual)
+    distance[~called_winner] = np.inf
+    closest = distance.min(axis=1, keepdims=True)
+
+    return called_winner & (distance == closest)
+
+
+def simulate_pool(
+    current_wins, picked_margins, expected_margins, simulations, seed=None
+):
+    """Play out the remaining games many times over
+    :param current_wins: (users) matchup wins so far
+    :param picked_margins: (users x games) as for score_simulations
+    :param expected_margins: (games) expected final margins
+    :return: (users) probability of winning the pool, with ties for first split
+        evenly, and (users x games) probability of winning each game
+    """
+
+    rng = np.random.default_rng(seed)
+    user_count, game_count = picked_margins.shape
+
+    pool_wins = np.zeros(user_count)
+    game_wins = np.zeros((user_count, game_count))
+
+    for start in range(0, simulations, SIMULATION_BATCH_SIZE):
+        batch_size = min(SIMULATION_BATCH_SIZE, simulations - start)
+
+        won = score_simulations(
+            picked_margins, sample_margins(rng, expected_margins, batch_size)
+        )
+        game_wins += won.sum(axis=0)
+
+        points = current_wins[np.newaxis, :] + won.sum(axis=2)
+        leaders = points == points.max(axis=1, keepdims=True)
+        pool_wins += (leaders / leaders.sum(axis=1, keepdims=True)).sum(axis=0)
+
+    return pool_wins / simulations, game_wins / simulations
+
+
+def simulate_year(bowl_year, simulations, seed=None):
+    """Estimate everyone's chances of winning the pool and each remaining game.
+
+    Only games with both teams set are simulated, so the CFP National Championship
+    is left out until the semifinals are decided.
+    """
+
+    remaining_matchups = list(
+        BowlMatchup.objects.filter(
+            bowl_year=bowl_year,
+            away_team__isnull=False,
+            home_team__isnull=False,
+            home_team_final_score__isnull=True,
+        ).with_display()
+    )
+
+    standings = ordered_standings(bowl_year)
+
+    user_indexes = {s.user_id: i for i, s in enumerate(standings)}
+    game_indexes = {m.id: i for i, m in enumerate(remaining_matchups)}
+
+    picked_margins = np.full(
+        (len(standings), len(remaining_matchups)), np.nan, dtype=np.float32
+    )
+
+    for user_id, matchup_id, winner_id, margin in BowlMatchupPick.objects.filter(
+        bowl_matchup__in=remaining_matchups, user_id__in=user_indexes.keys()
+    ).values_list("user_id", "bowl_matchup_id", "winner_id", "margin"):
+        away_team_id = remaining_matchups[game_indexes[matchup_id]].away_team_id
+        picked_margins[user_indexes[user_id], game_indexes[matchup_id]] = (
+            margin if winner_id == away_team_id else -margin
+        )
+
+    if not standings:
+        return {
+            "simulations": simulations,
+            "remaining_matchups": [m.display_bowl_game for m in remaining_matchups],
+            "users": [],
+        }
+
+    pool_probabilities, game_probabilities = simulate_pool(
+        np.array([s.wins for s in standings]),
+        picked_margins,
+        np.array([expected_margin(m) for m in remaining_matchups]),
+        simulations,
+        seed,
+    )
+
+    return {
+        "simulations": simulations,
+        "remaining_matchups": [m.display_bowl_game for m in remaining_matchups],
+        "users": [
+            {
+                "name": s.user.get_full_name(),
+                "wins": s.wins,
+                "pool_win_probability": float(pool_probabilities[i]),
+                "matchup_win_probabilities": dict(
+                    zip(
+                        (m.display_bowl_game for m in remaining_matchups),
+                        game_probabilities[i].tolist(),
+                    )
+                ),
+            }
+            for i, s in enumerate(standings)
+        ],
+    }
@@ -0,0 +1,381 @@
+"""
+A read-only, in-process snapshot of a year's matchups, teams and winners, and
+separately of its picks.
+
+A year's matchups change a handful of times a day but are read on every request, so
+each worker process keeps one snapshot per year of each pool, made of small __slots__
+records instead of model instances. A snapshot is rebuilt the first time it's asked
+for after the year's matchups_version changes, and shared by every request until
+then. Picks change with every submission, so they're kept apart: YearPicks, with
+everyone's picks, is rebuilt after the year's version changes, and a user's own picks
+are read on their own. Records are shared between threads and must never be
+modified.
+"""
+
+import threading
+
+from asgiref.sync import sync_to_async
+
+from .cache import amatchups_version, ayear_version, matchups_version, year_version
+from .models import (
+    BowlMatchup,
+    BowlMatchupPick,
+    MatchupWinner,
+    Team,
+    User,
+    describe_favorite,
+)
+from .pools import current_db
+
+MATCHUP_FIELDS = [
+    "id",
+    "bowl_year",
+    "cfp_playoff_game",
+    "start_time",
+    "away_team_id",
+    "home_team_id",
+    "home_team_point_spread",
+    "point_spread_extra_half",
+    "away_team_final_score",
+    "home_team_final_score",
+    "picks_version",
+    "display_bowl_game",
+]
+
+# filled in from the teams, which are in the default database
+TEAM_DISPLAY_FIELDS = [
+    "display_away_team",
+    "display_home_team",
+    "display_away_abbreviation",
+    "display_home_abbreviation",
+    "display_favorite",
+]
+
+
+class TeamRecord:
+    __slots__ = ["id", "name", "abbreviation"]
+
+    def __init__(self, id, name, abbreviation):
+        self.id = id
+        self.name = name
+        self.abbreviation = abbreviation
+
+    def __str__(self):
+        return str(self.name)
+
+
+class MatchupRecord:
+    """A matchup with the display fields of BowlMatchupQuerySet.with_display, read
+    the same way as a BowlMatchup"""
+
+    __slots__ = MATCHUP_FIELDS + TEAM_DISPLAY_FIELDS + ["no_pick"]
+
+    def __init__(self, teams_by_id, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+        away_team = teams_by_id.get(self.away_team_id)
+        home_team = teams_by_id.get(self.home_team_id)
+
+        self.display_away_team = away_team and away_team.name
+        self.display_home_team = home_team and home_team.name
+        self.display_away_abbreviation = away_team and away_team.abbreviation
+        self.display_home_abbreviation = home_team and home_team.abbreviation
+        self.display_favorite = describe_favorite(
+            self.display_away_team,
+            self.display_home_team,
+            self.home_team_point_spread,
+            self.point_spread_extra_half,
+        )
+
+        # stands in for the pick of a user who hasn't picked this matchup
+        self.no_pick = PickRecord(self, None, None, None)
+
+    @property
+    def final_margin(self):
+        if (
+            self.away_team_final_score is not None
+            and self.home_team_final_score is not None
+        ):
+            return self.away_team_final_score - self.home_team_final_score
+
+        return None
+
+    def bowl_favorite(self):
+        return self.display_favorite
+
+    @property
+    def display_name(self):
+        away_team = self.display_away_team or "?"
+        home_team = self.display_home_team or "?"
+
+        dn = f"{self.display_bowl_game}: {away_team} vs {home_team}"
+
+        if self.cfp_playoff_game:
+            dn += " (CFP Semifinal)"
+
+        return dn
+
+
+class PickRecord:
+    __slots__ = ["bowl_matchup", "user_id", "winner_id", "margin"]
+
+    def __init__(self, bowl_matchup, user_id, winner_id, margin):
+        self.bowl_matchup = bowl_matchup
+        self.user_id = user_id
+        self.winner_id = winner_id
+        self.margin = margin
+
+
+class YearSnapshot:
+    """A year's matchups, teams and winners as of one matchups_version.
+
+    matchups are ordered by start time, and indexed by id in matchups_by_id. Teams
+    are by id, and winners are lists of user ids by matchup id. fragments holds
+    whatever views render from the snapshot alone, by name, since it stays valid for
+    as long as the snapshot does.
+    """
+
+    __slots__ = [
+        "bowl_year",
+        "version",
+        "matchups",
+        "matchups_by_id",
+        "teams_by_id",
+        "winners_by_matchup",
+        "fragments",
+    ]
+
+    def __init__(self, bowl_year, version):
+        self.bowl_year = bowl_year
+        self.version = version
+
+        # teams and winners are looked up by id rather than joined in
+        matchups = list(
+            BowlMatchup.objects.filter(bowl_year=bowl_year)
+            .with_display()
+            .order_by("start_time", "id")
+            .values(*MATCHUP_FIELDS)
+        )
+
+        team_ids = set()
+
+        for m in matchups:
+            team_ids.update([m["away_team_id"], m["home_team_id"]])
+
+        self.teams_by_id = _teams_by_id(team_ids)
+        self.matchups = [MatchupRecord(self.teams_by_id, **m) for m in matchups]
+        self.matchups_by_id = {m.id: m for m in self.matchups}
+
+        self.winners_by_matchup = {}
+
+        for matchup_id, user_id in MatchupWinner.objects.filter(
+            bowl_matchup_id__in=self.matchups_by_id
+        ).values_list("bowl_matchup_id", "user_id"):
+            self.winners_by_matchup.setdefault(matchup_id, []).append(user_id)
+
+        self.fragments = {}
+
+    def _picks(self):
+        return BowlMatchupPick.objects.filter(bowl_matchup_id__in=self.matchups_by_id)
+
+    def _picks_in_order(self, picks):
+        picks_by_matchup = {
+            matchup_id: PickRecord(
+                self.matchups_by_id[matchup_id], user_id, winner_id, margin
+            )
+            for matchup_id, user_id, winner_id, margin in picks
+        }
+
+        return [picks_by_matchup.get(m.id, m.no_pick) for m in self.matchups]
+
+    def picks_for_user(self, user_id):
+        """The user's pick for every matchup in start time order, with the matchup's
+        no_pick record where they haven't picked. Reads only the user's picks."""
+
+        return self._picks_in_order(
+            self._picks()
+            .filter(user_id=user_id)
+            .values_list("bowl_matchup_id", "user_id", "winner_id", "margin")
+        )
+
+    async def apicks_for_user(self, user_id):
+        """Async version of picks_for_user"""
+
+        return self._picks_in_order(
+            [
+                p
+                async for p in self._picks()
+                .filter(user_id=user_id)
+                .values_list("bowl_matchup_id", "user_id", "winner_id", "margin")
+            ]
+        )
+
+    def cfp_teams(self):
+        return [
+            self.teams_by_id[team_id]
+            for m in self.matchups
+            if m.cfp_playoff_game
+            for team_id in [m.home_team_id, m.away_team_id]
+            if team_id
+        ]
+
+
+class YearPicks:
+    """Everyone's picks for the matchups of a snapshot, as of one year version.
+
+    Picks are indexed by user id and then matchup id in picks_by_user, and listed by
+    matchup id in picks_by_matchup. teams_by_id adds the teams picked to the
+    snapshot's, and user_names are by id.
+    """
+
+    __slots__ = [
+        "snapshot",
+        "version",
+        "teams_by_id",
+        "user_names",
+        "picks_by_user",
+        "picks_by_matchup",
+    ]
+
+    def __init__(self, snapshot, version):
+        self.snapshot = snapshot
+        self.version = version
+
+        picks = list(
+            snapshot._picks().values_list(
+                "bowl_matchup_id", "user_id", "winner_id", "margin"
+            )
+        )
+
+        # a pick's winner is normally one of the matchups' teams, unless the
+        # matchup's teams changed after it was made
+        missing_team_ids = {winner_id for _, _, winner_id, _ in picks} - set(
+            snapshot.teams_by_id
+        )
+        self.teams_by_id = (
+            {**snapshot.teams_by_id, **_teams_by_id(missing_team_ids)}
+            if missing_team_ids
+            else snapshot.teams_by_id
+        )
+
+        self.picks_by_user = {}
+        self.picks_by_matchup = {m.id: [] for m in snapshot.matchups}
+
+        for matchup_id, user_id, winner_id, margin in picks:
+            pick = PickRecord(
+                snapshot.matchups_by_id[matchup_id], user_id, winner_id, margin
+            )
+            self.picks_by_user.setdefault(user_id, {})[matchup_id] = pick
+            self.picks_by_matchup[matchup_id].append(pick)
+
+        self.user_names = {
+            user_id: " ".join((first_name, last_name))
+            for user_id, first_name, last_name in User.objects.filter(
+                id__in=self.picks_by_user
+            ).values_list("id", "first_name", "last_name")
+        }
+
+
+def _teams_by_id(team_ids):
+    return {
+        team_id: TeamRecord(team_id, name, abbreviation)
+        for team_id, name, abbreviation in Team.objects.filter(id__in=team_ids - {None})
+        .order_by()
+        .values_list("id", "name", "abbreviation")
+    }
+
+
+# by pool database and year
+_snapshots = {}
+_year_picks = {}
+
+# one build of a year at a time, rather than one per waiting request, while other
+# years and pools build alongside it. Building picks may build the snapshot, so the
+# locks are reentrant.
+_build_locks = {}
+
+
+def _current(built, bowl_year, version):
+    """What was built for the year in the current pool, if it's of version"""
+
+    current = built.get((current_db.get(), bowl_year))
+
+    if current is not None and current.version == version:
+        return current
+
+    return None
+
+
+def _build(built, bowl_year, version, build):
+    key = current_db.get(), bowl_year
+
+    with _build_locks.setdefault(key, threading.RLock()):
+        current = _current(built, bowl_year, version)
+
+        if current is None:
+            current = built[key] = build()
+
+        return current
+
+
+def get_snapshot(bowl_year, version=None):
+    """The snapshot of the year's matchups, rebuilding it if they've changed
+    :param version: The year's current matchups_version, if already read
+    """
+
+    if version is None:
+        version = matchups_version(bowl_year)
+
+    # read the version before the data, so a change in between causes a rebuild
+    # rather than a stale snapshot
+    return _current(_snapshots, bowl_year, version) or _build(
+        _snapshots, bowl_year, version, lambda: YearSnapshot(bowl_year, version)
+    )
+
+
+async def aget_snapshot(bowl_year, version=None):
+    """Async version of get_snapshot"""
+
+    if version is None:
+        version = await amatchups_version(bowl_year)
+
+    return _current(_snapshots, bowl_year, version) or await sync_to_async(_build)(
+        _snapshots, bowl_year, version, lambda: YearSnapshot(bowl_year, version)
+    )
+
+
+def get_year_picks(bowl_year, version=None):
+    """Everyone's picks for the year, rebuilding them if the year has changed
+    :param version: The year's current version, if already read
+    """
+
+    if version is None:
+        version = year_version(bowl_year)
+
+    # every change to the matchups changes the year's version too, so picks of the
+    # current version were built from the current snapshot
+    return _current(_year_picks, bowl_year, version) or _build(
+        _year_picks,
+        bowl_year,
+        version,
+        lambda: YearPicks(get_snapshot(bowl_year), version),
+    )
+
+
+async def aget_year_picks(bowl_year, version=None):
+    """Async version of get_year_picks"""
+
+    if version is None:
+        version = await ayear_version(bowl_year)
+
+    return _current(_year_picks, bowl_year, version) or await sync_to_async(
+        get_year_picks
+    )(bowl_year, version)
+
+
+def clear():
+    """Drop every snapshot, for when year versions restart, as they do in tests"""
+
+    _snapshots.clear()
+    _year_picks.clear()
@@ -0,0 +1,231 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from .cache import bump_year_versions
+from .events import publish_winners
+from .models import (
+    BowlMatchup,
+    BowlMatchupPick,
+    MatchupWinner,
+    SeasonSummary,
+    Standing,
+)
+from .pools import current_db, select_shared
+
+
+def closest_margin_winners(final_margin, away_team_id, home_team_id, picks):
+    """Find the picks that called the winner and came closest to the final margin
+    :param final_margin: Away score minus home score
+    :param picks: Iterable of (key, winner id, margin) tuples
+    :return: The keys of the winning picks
+    """
+
+    winning_team_id = away_team_id if final_margin > 0 else home_team_id
+
+    closest_distance = None
+    key_distances = {}
+
+    for key, winner_id, margin in picks:
+        if winner_id != winning_team_id:
+            continue
+
+        picked_margin = -margin if winner_id == home_team_id else margin
+        distance = abs(picked_margin - final_margin)
+
+        if closest_distance is None or distance < closest_distance:
+            closest_distance = distance
+
+        key_distances[key] = distance
+
+    return [
+        key for key, distance in key_distances.items() if distance == closest_distance
+    ]
+
+
+def ensure_standings(bowl_year, user_ids):
+    """Give every user with picks for the year a row in the standings, even with no
+    wins yet"""
+
+    Standing.objects.bulk_create(
+        [Standing(bowl_year=bowl_year, user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def remove_standings_without_picks(bowl_year, user_ids=None):
+    """Drop the standings of users left with no picks for the year
+    :param user_ids: The users whose picks went away, or None for every user
+    """
+
+    standings = Standing.objects.filter(bowl_year=bowl_year)
+
+    if user_ids is not None:
+        standings = standings.filter(user_id__in=user_ids)
+
+    standings.exclude(
+        user_id__in=BowlMatchupPick.objects.filter(
+            bowl_matchup__bowl_year=bowl_year
+        ).values("user_id")
+    ).delete()
+
+
+def ordered_standings(bowl_year):
+    """A year's standings, most wins first, then by name"""
+
+    return sorted(
+        select_shared(Standing.objects.filter(bowl_year=bowl_year), "user"),
+        key=lambda s: (-s.wins, s.user.first_name, s.user.last_name),
+    )
+
+
+def update_matchup_winners(bowl_matchup):
+    """Recompute the winners of one matchup and apply only the difference to the
+    standings. Clearing the score removes the matchup's winners.
+    """
+
+    final_margin = bowl_matchup.final_margin
+
+    with transaction.atomic(using=current_db.get()):
+        old_winners = set(
+            MatchupWinner.objects.filter(bowl_matchup=bowl_matchup).values_list(
+                "user_id", flat=True
+            )
+        )
+
+        if final_margin is None:
+            new_winners = set()
+        else:
+            new_winners = set(
+                closest_margin_winners(
+                    final_margin,
+                    bowl_matchup.away_team_id,
+                    bowl_matchup.home_team_id,
+                    BowlMatchupPick.objects.filter(
+                        bowl_matchup=bowl_matchup
+                    ).values_list("user_id", "winner_id", "margin"),
+                )
+            )
+
+        lost_winners = old_winners - new_winners
+        gained_winners = new_winners - old_winners
+
+        if lost_winners:
+            MatchupWinner.objects.filter(
+                bowl_matchup=bowl_matchup, user_id__in=lost_winners
+            ).delete()
+            Standing.objects.filter(
+                bowl_year=bowl_matchup.bowl_year, user_id__in=lost_winners
+            ).update(wins=F("wins") - 1)
+
+        if gained_winners:
+            MatchupWinner.objects.bulk_create(
+                [
+                    MatchupWinner(bowl_matchup=bowl_matchup, user_id=user_id)
+                    for user_id in gained_winners
+                ]
+            )
+            ensure_standings(bowl_matchup.bowl_year, gained_winners)
+            Standing.objects.filter(
+                bowl_year=bowl_matchup.bowl_year, user_id__in=gained_winners
+            ).update(wins=F("wins") + 1)
+
+        if lost_winners or gained_winners:
+            publish_winners(bowl_matchup, new_winners)
+
+
+def remove_matchup_winners(bowl_matchup):
+    """Take a matchup's wins back out of the standings before it is deleted"""
+
+    with transaction.atomic(using=current_db.get()):
+        winners = MatchupWinner.objects.filter(bowl_matchup=bowl_matchup)
+
+        Standing.objects.filter(
+            bowl_year=bowl_matchup.bowl_year,
+            user_id__in=list(winners.values_list("user_id", flat=True)),
+        ).update(wins=F("wins") - 1)
+
+        winners.delete()
+
+
+def update_season_summaries(bowl_years):
+    """Recount the given years' SeasonSummary rows from their matchups and standings,
+    deleting the summary of a year that has no matchups left"""
+
+    for bowl_year in set(bowl_years):
+        matchup_counts = BowlMatchup.objects.filter(bowl_year=bowl_year).aggregate(
+            bowl_count=Count("id"),
+            completed_count=Count(
+                "id",
+                filter=Q(
+                    away_team_final_score__isnull=False,
+                    home_team_final_score__isnull=False,
+                ),
+            ),
+        )
+
+        if not matchup_counts["bowl_count"]:
+            SeasonSummary.objects.filter(bowl_year=bowl_year).delete()
+            continue
+
+        standings = Standing.objects.filter(bowl_year=bowl_year)
+        leader = standings.filter(wins__gt=0).order_by("-wins").first()
+
+        SeasonSummary.objects.bulk_create(
+            [
+                SeasonSummary(
+                    bowl_year=bowl_year,
+                    participant_count=standings.count(),
+                    **matchup_counts,
+                    leader_id=leader and leader.user_id,
+                    leader_wins=leader.wins if leader else 0,
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["bowl_year"],
+            update_fields=[
+                "bowl_count",
+                "participant_count",
+                "completed_count",
+                "leader",
+                "leader_wins",
+            ],
+        )
+
+
+def update_season_participants(bowl_year):
+    """Recount only the participants in a year's SeasonSummary, in one query, for
+    changes that can't affect the rest of it"""
+
+    SeasonSummary.objects.filter(bowl_year=bowl_year).update(
+        participant_count=Subquery(
+            Standing.objects.filter(bowl_year=OuterRef("bowl_year"))
+            .values("bowl_year")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+    )
+
+
+def rebuild_standings(bowl_year):
+    """Recompute a year's winners and standings from scratch"""
+
+    with transaction.atomic(using=current_db.get()):
+        MatchupWinner.objects.filter(bowl_matchup__bowl_year=bowl_year).delete()
+        Standing.objects.filter(bowl_year=bowl_year).delete()
+
+        ensure_standings(
+            bowl_year,
+            BowlMatchupPick.objects.filter(bowl_matchup__bowl_year=bowl_year)
+            .values_list("user_id", flat=True)
+            .distinct(),
+        )
+
+        for bowl_matchup in BowlMatchup.objects.filter(
+            bowl_year=bowl_year,
+            away_team_final_score__isnull=False,
+            home_team_final_score__isnull=False,
+        ):
+            update_matchup_winners(bowl_matchup)
+
+        update_season_summaries([bowl_year])
+        bump_year_versions([bowl_year])
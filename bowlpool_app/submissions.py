@@ -0,0 +1,292 @@
+from typing import Dict, List, Optional
+
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from bowlpool.db import immediate_atomic, retry_on_locked
+
+from . import pick_queue
+from .cache import bump_picks_version, bump_year_versions
+from .models import BowlMatchup, BowlMatchupPick, User
+from .pools import current_db, select_shared, using_database
+from .standings import ensure_standings, update_season_participants
+
+CFP_CHAMPIONSHIP_NAME = "CFP National Championship"
+
+
+def parse_posted_picks(post_data) -> Dict[int, Dict[str, str]]:
+    """Group the "<matchup id>-<field>" inputs of the picks form by matchup id
+    :return: A dict of matchup id to a dict of field name ("winner", "margin") to value
+    """
+
+    picks_for_matchups = {}
+
+    # TODO: create a custom form for picks
+    for form_key in post_data.keys():
+        if "-" not in form_key:
+            continue
+
+        key, field = form_key.split("-", 1)
+
+        if not key.isdigit():
+            continue
+
+        picks_for_matchups.setdefault(int(key), {})[field] = post_data[form_key]
+
+    return picks_for_matchups
+
+
+def _parse_pick(pick) -> Optional[tuple]:
+    try:
+        return int(pick["winner"]), int(pick["margin"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _save_picks(new_picks):
+    bowl_years = {p.bowl_matchup.bowl_year for p in new_picks}
+
+    with immediate_atomic(using=current_db.get()):
+        BowlMatchupPick.objects.bulk_create(
+            new_picks,
+            update_conflicts=True,
+            unique_fields=["user", "bowl_matchup"],
+            update_fields=["winner", "margin"],
+        )
+
+        # bulk_create skips post_save, so do the signal handlers' work here. The
+        # picks are all for matchups that hadn't started, so there are no matchup
+        # winners or leaders to update.
+        bump_picks_version([p.bowl_matchup_id for p in new_picks])
+
+        for bowl_year in bowl_years:
+            ensure_standings(
+                bowl_year,
+                {p.user_id for p in new_picks if p.bowl_matchup.bowl_year == bowl_year},
+            )
+            update_season_participants(bowl_year)
+
+        bump_year_versions(bowl_years, picks_only=True)
+
+
+def submit_picks(user, bowl_year, picks_for_matchups, now=None) -> List[str]:
+    """Validate a user's picks for a year in memory and upsert the valid ones in a
+    single transaction, or append them to the pick_queue if it's enabled.
+
+    Picks for matchups that have already started are ignored. The CFP National
+    Championship pick is only accepted if it is one of the user's semifinal winners,
+    counting semifinal picks made in this same submission and queued ones.
+
+    :param picks_for_matchups: Output of parse_posted_picks
+    :param now: The submission time that picks are checked against; defaults to now
+    :return: Error messages for the picks that were not saved
+    """
+
+    if now is None:
+        now = timezone.now()
+
+    new_picks, errors = _validate_picks(user, bowl_year, picks_for_matchups, now)
+
+    if new_picks and pick_queue.enabled():
+        pick_queue.enqueue(
+            current_db.get(),
+            user.id,
+            bowl_year,
+            now,
+            [(p.bowl_matchup_id, p.winner_id, p.margin) for p in new_picks],
+        )
+    elif new_picks:
+        retry_on_locked(lambda: _save_picks(new_picks))
+
+    return errors
+
+
+def _validate_picks(user, bowl_year, picks_for_matchups, now):
+    # looked up by primary key and sorted here, so SQLite needn't sort them itself
+    matchups = sorted(
+        # error messages name the teams
+        select_shared(
+            BowlMatchup.objects.filter(
+                bowl_year=bowl_year, id__in=picks_for_matchups.keys()
+            )
+            .with_display()
+            .order_by(),
+            "away_team",
+            "home_team",
+        ),
+        key=lambda m: m.start_time,
+    )
+
+    errors = []
+    new_picks = []
+    champ_matchup = None
+
+    for bowl_matchup in matchups:
+        if now >= bowl_matchup.start_time:
+            continue
+
+        if bowl_matchup.display_bowl_game == CFP_CHAMPIONSHIP_NAME:
+            # this depends on the semifinal picks, so it is checked last
+            champ_matchup = bowl_matchup
+            continue
+
+        pick = picks_for_matchups[bowl_matchup.id]
+
+        if not pick.get("winner") or not pick.get("margin"):
+            errors.append(
+                _("Matchup %(name)s not picked") % {"name": bowl_matchup.display_name}
+            )
+            continue
+
+        parsed_pick = _parse_pick(pick)
+
+        if parsed_pick is None or parsed_pick[0] not in (
+            bowl_matchup.away_team_id,
+            bowl_matchup.home_team_id,
+        ):
+            errors.append(
+                _("Invalid pick for %(name)s") % {"name": bowl_matchup.display_name}
+            )
+            continue
+
+        winner_id, margin = parsed_pick
+
+        if margin == 0:
+            errors.append(
+                _("Must pick a nonzero margin for %(name)s")
+                % {"name": bowl_matchup.display_name}
+            )
+            continue
+
+        new_picks.append(
+            BowlMatchupPick(
+                user=user,
+                bowl_matchup=bowl_matchup,
+                winner_id=winner_id,
+                margin=margin,
+            )
+        )
+
+    if champ_matchup is not None:
+        champ_pick = picks_for_matchups[champ_matchup.id]
+
+        if not champ_pick.get("winner") or not champ_pick.get("margin"):
+            errors.append(_("CFP National Championship not picked"))
+        else:
+            semifinal_winners = dict(
+                BowlMatchupPick.objects.filter(
+                    user=user,
+                    bowl_matchup__bowl_year=bowl_year,
+                    bowl_matchup__cfp_playoff_game=True,
+                ).values_list("bowl_matchup_id", "winner_id")
+            )
+
+            pending_picks = pick_queue.pending_picks(
+                current_db.get(), user.id, bowl_year
+            )
+
+            if pending_picks:
+                semifinal_winners.update(
+                    (matchup_id, pending_picks[matchup_id][0])
+                    for matchup_id in BowlMatchup.objects.filter(
+                        id__in=pending_picks, cfp_playoff_game=True
+                    ).values_list("id", flat=True)
+                )
+
+            semifinal_winners.update(
+                (p.bowl_matchup_id, p.winner_id)
+                for p in new_picks
+                if p.bowl_matchup.cfp_playoff_game
+            )
+
+            parsed_pick = _parse_pick(champ_pick)
+
+            if len(semifinal_winners) != 2:
+                errors.append(_("Pick the CFP semifinal games before the final!"))
+            elif (
+                parsed_pick is None or parsed_pick[0] not in semifinal_winners.values()
+            ):
+                errors.append(_("Champ pick must be one of your semifinal winners"))
+            elif parsed_pick[1] == 0:
+                errors.append(
+                    _("Must pick a nonzero margin for %(name)s")
+                    % {"name": CFP_CHAMPIONSHIP_NAME}
+                )
+            else:
+                new_picks.append(
+                    BowlMatchupPick(
+                        user=user,
+                        bowl_matchup=champ_matchup,
+                        winner_id=parsed_pick[0],
+                        margin=parsed_pick[1],
+                    )
+                )
+
+    return new_picks, errors
+
+
+def _save_queued_picks(submissions, user_ids):
+    """Save one pool's queued submissions, oldest first"""
+
+    matchups = BowlMatchup.objects.only("id", "bowl_year", "start_time").in_bulk(
+        {matchup_id for s in submissions for matchup_id, _, _ in s.picks}
+    )
+
+    # later submissions replace earlier picks for the same matchup, once picks
+    # submitted after kickoff are dropped, so a late one can't replace a valid one
+    latest_picks = {
+        (s.user_id, matchup_id): (winner_id, margin)
+        for s in submissions
+        if s.user_id in user_ids
+        for matchup_id, winner_id, margin in s.picks
+        if matchup_id in matchups and s.submitted_at < matchups[matchup_id].start_time
+    }
+
+    new_picks = [
+        BowlMatchupPick(
+            user_id=user_id,
+            bowl_matchup=matchups[matchup_id],
+            winner_id=winner_id,
+            margin=margin,
+        )
+        for (user_id, matchup_id), (winner_id, margin) in latest_picks.items()
+    ]
+
+    if new_picks:
+        retry_on_locked(lambda: _save_picks(new_picks))
+
+
+def drain_pick_queue(batch_size=500) -> int:
+    """Save the oldest submissions in the pick_queue in one transaction per pool.
+
+    Each pick is checked against its matchup's start time as of when it was
+    submitted. A submission saved again after a crash, before it was marked as
+    applied, saves the same picks.
+
+    :return: The number of submissions saved
+    """
+
+    submissions = pick_queue.next_batch(batch_size)
+
+    if not submissions:
+        return 0
+
+    # users may have been deleted since they submitted
+    user_ids = set(
+        User.objects.filter(id__in={s.user_id for s in submissions}).values_list(
+            "id", flat=True
+        )
+    )
+
+    pools = {}
+
+    for s in submissions:
+        pools.setdefault(s.pool, []).append(s)
+
+    for pool, pool_submissions in pools.items():
+        with using_database(pool):
+            _save_queued_picks(pool_submissions, user_ids)
+
+    pick_queue.mark_applied(submissions[-1].id, timezone.now())
+
+    return len(submissions)
@@ -1,3 +1,2290 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest.mock
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth import SESSION_KEY
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router
+from django.http import JsonResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.client import AsyncClientHandler
+from django.test.utils import CaptureQueriesContext
+from django.template import engines
+from django.urls import reverse
+from django.utils import timezone
+
+from bowlpool import hashers, metrics, middleware, warmup
+from bowlpool.db import immediate_atomic, retry_on_locked
+from bowlpool.handlers import AsyncViewsMixin
+from bowlpool.static import StaticFilesMiddleware
+
+from . import async_views, backends, events, pick_queue, pools, replicas, snapshot, urls
+from .models import (
+    BowlGame,
+    BowlMatchup,
+    BowlMatchupPick,
+    MatchupWinner,
+    Pool,
+    SeasonSummary,
+    Standing,
+    Team,
+    User,
+    YearEvent,
+    YearVersion,
+)
+from .pools import using_pool
+from .simulation import score_simulations, simulate_year
+from .standings import ordered_standings, rebuild_standings
+from .submissions import drain_pick_queue, submit_picks
+
+BOWL_YEAR = 2023
+
+
+def create_season(bowl_count, start_time=None):
+    """Create bowl_count regular bowls plus two CFP semifinals and the championship
+    :return: The regular matchups, the semifinal matchups and the championship matchup
+    """
+
+    if start_time is None:
+        start_time = timezone.now() + datetime.timedelta(days=1)
+
+    def create_matchup(name, index, **kwargs):
+        return BowlMatchup.objects.create(
+            bowl_game=BowlGame.objects.create(name=name),
+            bowl_year=BOWL_YEAR,
+            start_time=start_time + datetime.timedelta(hours=index),
+            home_team_point_spread=-3,
+            **kwargs,
+        )
+
+    def create_team(index):
+        # teams are shared, so another pool's season reuses them
+        return Team.objects.get_or_create(
+            name=f"Team {index}", defaults={"abbreviation": f"T{index}"}
+        )[0]
+
+    matchups = [
+        create_matchup(
+            f"Bowl {i}",
+            i,
+            away_team=create_team(2 * i),
+            home_team=create_team(2 * i + 1),
+        )
+        for i in range(bowl_count)
+    ]
+
+    semifinals = [
+        create_matchup(
+            f"Semifinal {i}",
+            bowl_count + i,
+            cfp_playoff_game=True,
+            away_team=create_team(2 * (bowl_count + i)),
+            home_team=create_team(2 * (bowl_count + i) + 1),
+        )
+        for i in range(2)
+    ]
+
+    championship = create_matchup("CFP National Championship", bowl_count + 2)
+
+    return matchups, semifinals, championship
+
+
+# the replica is a second connection to the test database, which can't see the
+# writes of a TestCase's open transaction
+@override_settings(BOWLPOOL_DB_REPLICA_READS=False)
+class BowlPoolTestCase(TestCase):
+    def setUp(self):
+        # year versions restart with every test's database, so cached pages and
+        # snapshots would otherwise leak between tests
+        cache.clear()
+        snapshot.clear()
+        backends.clear()
+
+
+class SubmitPicksTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("fan@example.com", "password")
+        cls.matchups, cls.semifinals, cls.championship = create_season(3)
+
+    def picks_for(self, matchups, margin=7):
+        return {
+            m.id: {"winner": str(m.away_team_id), "margin": str(margin)}
+            for m in matchups
+        }
+
+    def test_upserts_all_picks_in_constant_queries(self):
+        picks = self.picks_for(self.matchups + self.semifinals)
+        picks[self.championship.id] = {
+            "winner": str(self.semifinals[0].away_team_id),
+            "margin": "3",
+        }
+
+        # matchups, semifinal picks, then the upsert, the picks_version bump, the
+        # standings row, the participant count and the year version bump inside a
+        # savepoint
+        with self.assertNumQueries(10):
+            errors = submit_picks(self.user, BOWL_YEAR, picks)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(BowlMatchupPick.objects.filter(user=self.user).count(), 6)
+
+        picks = self.picks_for(self.matchups, margin=10)
+        self.assertEqual(submit_picks(self.user, BOWL_YEAR, picks), [])
+        self.assertEqual(
+            set(
+                BowlMatchupPick.objects.filter(
+                    bowl_matchup__in=self.matchups
+                ).values_list("margin", flat=True)
+            ),
+            {10},
+        )
+
+    def test_reports_errors_per_matchup(self):
+        picks = self.picks_for(self.matchups)
+        picks[self.matchups[0].id] = {"winner": "", "margin": ""}
+        picks[self.matchups[1].id]["margin"] = "0"
+        picks[self.matchups[2].id]["winner"] = str(self.semifinals[0].home_team_id)
+        picks[self.championship.id] = {
+            "winner": str(self.semifinals[0].away_team_id),
+            "margin": "3",
+        }
+
+        errors = submit_picks(self.user, BOWL_YEAR, picks)
+
+        self.assertEqual(len(errors), 4)
+        self.assertIn("Pick the CFP semifinal games before the final!", errors)
+        self.assertFalse(BowlMatchupPick.objects.exists())
+
+    def test_champ_pick_must_be_a_semifinal_winner(self):
+        picks = self.picks_for(self.semifinals)
+        picks[self.championship.id] = {
+            "winner": str(self.semifinals[0].home_team_id),
+            "margin": "3",
+        }
+
+        errors = submit_picks(self.user, BOWL_YEAR, picks)
+
+        self.assertEqual(errors, ["Champ pick must be one of your semifinal winners"])
+        self.assertEqual(BowlMatchupPick.objects.count(), 2)
+
+    def test_ignores_started_matchups(self):
+        picks = self.picks_for(self.matchups)
+        now = self.matchups[1].start_time
+
+        self.assertEqual(submit_picks(self.user, BOWL_YEAR, picks, now=now), [])
+        self.assertEqual(
+            list(BowlMatchupPick.objects.values_list("bowl_matchup_id", flat=True)),
+            [self.matchups[2].id],
+        )
+
+    def test_submit_view_reports_errors_as_messages(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            reverse("submit_my_picks_for_year", args=(BOWL_YEAR,)),
+            {f"{self.matchups[0].id}-winner": "", f"{self.matchups[0].id}-margin": ""},
+            follow=True,
+        )
+
+        self.assertEqual(
+            [str(m) for m in response.context["messages"]],
+            [f"Matchup {self.matchups[0].display_name} not picked"],
+        )
+
+
+class PickQueueTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("fan@example.com", "password")
+        cls.matchups, cls.semifinals, cls.championship = create_season(2)
+
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        queue_settings = override_settings(
+            BOWLPOOL_PICK_QUEUE_PATH=os.path.join(directory.name, "queue.sqlite3")
+        )
+        queue_settings.enable()
+        self.addCleanup(queue_settings.disable)
+        self.addCleanup(pick_queue.close)
+
+    def picks_for(self, matchups):
+        return {m.id: {"winner": str(m.away_team_id), "margin": "7"} for m in matchups}
+
+    def test_queued_picks_are_shown_until_drained(self):
+        self.assertEqual(
+            submit_picks(self.user, BOWL_YEAR, self.picks_for(self.semifinals)), []
+        )
+
+        # the championship pick is checked against the queued semifinal picks
+        champ_picks = {
+            self.championship.id: {
+                "winner": str(self.semifinals[1].away_team_id),
+                "margin": "3",
+            }
+        }
+        self.assertEqual(submit_picks(self.user, BOWL_YEAR, champ_picks), [])
+        self.assertFalse(BowlMatchupPick.objects.exists())
+
+        self.client.force_login(self.user)
+        url = reverse("view_my_picks_for_year", args=(BOWL_YEAR,))
+
+        picks = self.client.get(url).context["picks_for_year"]
+        self.assertEqual(
+            [p.winner_id for p in picks],
+            [None, None]
+            + [m.away_team_id for m in self.semifinals]
+            + [self.semifinals[1].away_team_id],
+        )
+
+        self.assertEqual(drain_pick_queue(), 2)
+        self.assertEqual(drain_pick_queue(), 0)
+        self.assertEqual(BowlMatchupPick.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            pick_queue.pending_picks("default", self.user.id, BOWL_YEAR), {}
+        )
+
+        picks = self.client.get(url).context["picks_for_year"]
+        self.assertEqual(sum(p.winner_id is not None for p in picks), 3)
+
+    def test_late_submissions_leave_earlier_picks(self):
+        m = self.matchups[0]
+
+        submit_picks(
+            self.user,
+            BOWL_YEAR,
+            self.picks_for([m]),
+            now=m.start_time - datetime.timedelta(minutes=1),
+        )
+        pick_queue.enqueue(
+            "default",
+            self.user.id,
+            BOWL_YEAR,
+            m.start_time,
+            [(m.id, m.home_team_id, 3)],
+        )
+
+        self.assertEqual(drain_pick_queue(), 2)
+        self.assertEqual(
+            BowlMatchupPick.objects.values_list("winner_id", "margin").get(),
+            (m.away_team_id, 7),
+        )
+
+    def test_drained_submissions_are_deleted_later(self):
+        submit_picks(self.user, BOWL_YEAR, self.picks_for(self.semifinals))
+        drained_at = timezone.now()
+        pick_queue.mark_applied(pick_queue.next_batch(1)[0].id, drained_at)
+
+        submit_picks(self.user, BOWL_YEAR, self.picks_for(self.matchups))
+        pick_queue.mark_applied(
+            pick_queue.next_batch(1)[0].id,
+            drained_at + pick_queue.KEEP_APPLIED + datetime.timedelta(seconds=1),
+        )
+
+        self.assertEqual(
+            pick_queue._connection()
+            .execute("SELECT COUNT(*) FROM submission")
+            .fetchone()[0],
+            1,
+        )
+
+    def test_picks_are_checked_against_the_submission_time(self):
+        m = self.matchups[0]
+        before_kickoff = m.start_time - datetime.timedelta(minutes=1)
+
+        # submitted before kickoff, but drained after it
+        submit_picks(self.user, BOWL_YEAR, self.picks_for([m]), now=before_kickoff)
+        # the matchup's start time was moved up after this was submitted
+        pick_queue.enqueue(
+            "default",
+            self.user.id,
+            BOWL_YEAR,
+            m.start_time,
+            [(self.matchups[1].id, self.matchups[1].away_team_id, 7)],
+        )
+        BowlMatchup.objects.filter(id=self.matchups[1].id).update(
+            start_time=m.start_time
+        )
+
+        self.assertEqual(drain_pick_queue(), 2)
+        self.assertEqual(
+            list(BowlMatchupPick.objects.values_list("bowl_matchup_id", flat=True)),
+            [m.id],
+        )
+
+
+class ViewMyPicksForYearTests(BowlPoolTestCase):
+    # the year's matchups version and the user's picks, and the first time the user
+    # and the year snapshot's matchups, teams and winners; the session comes from the
+    # cache
+    QUERY_BUDGET = 2
+    FIRST_REQUEST_QUERIES = 4
+
+    def assert_page_within_budget(self, bowl_count):
+        user = User.objects.create_user(f"fan{bowl_count}@example.com", "password")
+        matchups, semifinals, _ = create_season(bowl_count)
+        submit_picks(
+            user,
+            BOWL_YEAR,
+            {
+                m.id: {"winner": str(m.home_team_id), "margin": "3"}
+                for m in matchups[::2] + semifinals
+            },
+        )
+
+        self.client.force_login(user)
+
+        with self.assertNumQueries(self.QUERY_BUDGET + self.FIRST_REQUEST_QUERIES):
+            self.client.get(reverse("view_my_picks_for_year", args=(BOWL_YEAR,)))
+
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(
+                reverse("view_my_picks_for_year", args=(BOWL_YEAR,))
+            )
+
+        self.assertEqual(len(response.context["picks_for_year"]), bowl_count + 3)
+        self.assertEqual(len(response.context["cfp_teams"]), 4)
+
+        return response
+
+    def test_query_budget_with_few_bowls(self):
+        self.assert_page_within_budget(2)
+
+    def test_query_budget_with_many_bowls(self):
+        response = self.assert_page_within_budget(40)
+
+        picks = response.context["picks_for_year"]
+        self.assertEqual(
+            [p.bowl_matchup.start_time for p in picks],
+            sorted(p.bowl_matchup.start_time for p in picks),
+        )
+        self.assertEqual(sum(p.winner_id is not None for p in picks), 22)
+
+    def test_rows_rendered_once_per_snapshot(self):
+        user = User.objects.create_user("fan@example.com", "password")
+        matchups, _, _ = create_season(2)
+        submit_picks(
+            user,
+            BOWL_YEAR,
+            {matchups[0].id: {"winner": str(matchups[0].home_team_id), "margin": "3"}},
+        )
+        self.client.force_login(user)
+        url = reverse("view_my_picks_for_year", args=(BOWL_YEAR,))
+
+        response = self.client.get(url)
+        self.assertEqual(
+            [t.name for t in response.templates].count("user_picks_for_matchup.html"),
+            5,
+        )
+        self.assertContains(
+            response,
+            f'<option value="{matchups[0].home_team_id}" selected="selected">',
+        )
+
+        response = self.client.get(url)
+        self.assertNotIn(
+            "user_picks_for_matchup.html", [t.name for t in response.templates]
+        )
+        self.assertContains(response, 'name="semifinal-one-winner"', count=1)
+
+
+class SnapshotTests(BowlPoolTestCase):
+    def test_snapshot_is_shared_until_the_matchups_change(self):
+        matchups, _, _ = create_season(2)
+        user = User.objects.create_user("fan@example.com", "password")
+        submit_picks(
+            user,
+            BOWL_YEAR,
+            {matchups[0].id: {"winner": str(matchups[0].away_team_id), "margin": "7"}},
+        )
+
+        first = snapshot.get_snapshot(BOWL_YEAR)
+
+        with self.assertNumQueries(1):
+            self.assertIs(snapshot.get_snapshot(BOWL_YEAR), first)
+
+        picks = snapshot.get_year_picks(BOWL_YEAR)
+        self.assertIs(picks.snapshot, first)
+
+        (pick,) = picks.picks_by_matchup[matchups[0].id]
+        self.assertEqual(
+            (pick.user_id, pick.winner_id, pick.margin),
+            (user.id, matchups[0].away_team_id, 7),
+        )
+
+        # submitting picks changes the picks, but not the snapshot
+        submit_picks(
+            user,
+            BOWL_YEAR,
+            {matchups[1].id: {"winner": str(matchups[1].home_team_id), "margin": "3"}},
+        )
+
+        self.assertIs(snapshot.get_snapshot(BOWL_YEAR), first)
+        self.assertIsNot(snapshot.get_year_picks(BOWL_YEAR), picks)
+
+        matchups[0].away_team_final_score = 10
+        matchups[0].home_team_final_score = 3
+        matchups[0].save()
+
+        second = snapshot.get_snapshot(BOWL_YEAR)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.matchups_by_id[matchups[0].id].final_margin, 7)
+        self.assertEqual(second.winners_by_matchup, {matchups[0].id: [user.id]})
+        self.assertIs(snapshot.get_year_picks(BOWL_YEAR).snapshot, second)
+
+    def test_picks_for_user_reads_only_their_picks(self):
+        matchups, _, _ = create_season(2)
+        users = [
+            User.objects.create_user(f"fan{i}@example.com", "password")
+            for i in range(2)
+        ]
+
+        for user in users:
+            submit_picks(
+                user,
+                BOWL_YEAR,
+                {
+                    matchups[0].id: {
+                        "winner": str(matchups[0].away_team_id),
+                        "margin": str(user.id),
+                    }
+                },
+            )
+
+        year_snapshot = snapshot.get_snapshot(BOWL_YEAR)
+
+        with self.assertNumQueries(1):
+            picks = year_snapshot.picks_for_user(users[1].id)
+
+        self.assertEqual(
+            (picks[0].user_id, picks[0].margin), (users[1].id, users[1].id)
+        )
+        self.assertIs(picks[1], year_snapshot.matchups[1].no_pick)
+        self.assertNotIn((DEFAULT_DB_ALIAS, BOWL_YEAR), snapshot._year_picks)
+
+    def test_other_years_build_while_one_builds(self):
+        building = threading.Event()
+        built = threading.Event()
+        snapshots = {}
+
+        def slow_build():
+            building.set()
+            built.wait(5)
+            return types.SimpleNamespace(version=0)
+
+        thread = threading.Thread(
+            target=snapshot._build, args=(snapshots, BOWL_YEAR, 0, slow_build)
+        )
+        thread.start()
+        building.wait(5)
+
+        try:
+            # another year doesn't wait for BOWL_YEAR's build
+            snapshot._build(
+                snapshots, BOWL_YEAR + 1, 0, lambda: types.SimpleNamespace(version=0)
+            )
+            self.assertTrue(thread.is_alive())
+        finally:
+            built.set()
+            thread.join()
+
+        self.assertEqual(
+            set(snapshots),
+            {(DEFAULT_DB_ALIAS, BOWL_YEAR), (DEFAULT_DB_ALIAS, BOWL_YEAR + 1)},
+        )
+
+
+class ViewAllPicksForYearTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, _, _ = create_season(3)
+        cls.users = [
+            User.objects.create_user(f"fan{i}@example.com", "password", first_name=n)
+            for i, n in enumerate(["Carol", "Alice", "Bob"])
+        ]
+
+        # interleave the picks so that no matchup's picks are adjacent by id
+        for user in cls.users:
+            for m in cls.matchups:
+                BowlMatchupPick.objects.create(
+                    user=user, bowl_matchup=m, winner=m.away_team, margin=3
+                )
+
+    def get_page(self):
+        return self.client.get(reverse("view_all_picks_for_year", args=(BOWL_YEAR,)))
+
+    def test_groups_each_matchup_once_in_start_time_order(self):
+        # year version, matchups, picks
+        with self.assertNumQueries(3):
+            response = self.get_page()
+
+        fragments = response.context["picks_for_year"]
+        self.assertEqual(len(fragments), 3)
+
+        for m, fragment in zip(self.matchups, fragments):
+            self.assertIn(m.display_name, fragment)
+            self.assertLess(fragment.index("Alice"), fragment.index("Bob"))
+            self.assertLess(fragment.index("Bob"), fragment.index("Carol"))
+
+    def test_only_changed_matchups_are_rerendered(self):
+        self.get_page()
+
+        pick = BowlMatchupPick.objects.get(
+            user=self.users[0], bowl_matchup=self.matchups[1]
+        )
+        pick.margin = 17
+        pick.save()
+
+        # year version, matchups, and the picks of only the changed matchup
+        with self.assertNumQueries(3):
+            response = self.get_page()
+
+        self.assertContains(response, "by 17")
+
+    def test_renaming_a_team_rerenders_its_matchups(self):
+        self.get_page()
+
+        team = self.matchups[0].away_team
+        team.name = "Renamed State"
+        team.save()
+
+        self.assertContains(self.get_page(), "Renamed State by 3", count=3)
+
+    def test_renaming_a_user_rerenders_their_picks(self):
+        self.get_page()
+
+        user = User.objects.get(id=self.users[1].id)
+        user.first_name = "Alicia"
+        user.save()
+
+        response = self.get_page()
+        self.assertContains(response, "Alicia", count=3)
+        self.assertNotContains(response, "Alice")
+
+        # logging in saves the user, but leaves the year's caches alone
+        version = YearVersion.objects.get(bowl_year=BOWL_YEAR).version
+        self.client.force_login(user)
+        self.assertEqual(YearVersion.objects.get(bowl_year=BOWL_YEAR).version, version)
+
+
+class StandingsTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (cls.matchup, cls.other_matchup), _, _ = create_season(2)
+        cls.users = [
+            User.objects.create_user(f"fan{i}@example.com", "password", first_name=n)
+            for i, n in enumerate(["Alice", "Bob", "Carol"])
+        ]
+
+        for user, winner, margin in [
+            (cls.users[0], cls.matchup.away_team, 7),
+            (cls.users[1], cls.matchup.away_team, 3),
+            (cls.users[2], cls.matchup.home_team, 1),
+        ]:
+            BowlMatchupPick.objects.create(
+                user=user, bowl_matchup=cls.matchup, winner=winner, margin=margin
+            )
+
+    def set_score(self, away_team_final_score, home_team_final_score):
+        self.matchup.away_team_final_score = away_team_final_score
+        self.matchup.home_team_final_score = home_team_final_score
+        self.matchup.save()
+
+    def wins(self):
+        return dict(
+            Standing.objects.filter(bowl_year=BOWL_YEAR).values_list(
+                "user__first_name", "wins"
+            )
+        )
+
+    def test_pickers_get_standings_before_any_scores(self):
+        self.assertEqual(self.wins(), {"Alice": 0, "Bob": 0, "Carol": 0})
+
+    def test_score_entry_and_correction_update_standings(self):
+        self.set_score(24, 20)
+        self.assertEqual(self.wins(), {"Alice": 0, "Bob": 1, "Carol": 0})
+
+        self.set_score(28, 20)
+        self.assertEqual(self.wins(), {"Alice": 1, "Bob": 0, "Carol": 0})
+
+        self.set_score(17, 20)
+        self.assertEqual(self.wins(), {"Alice": 0, "Bob": 0, "Carol": 1})
+
+        self.set_score(None, None)
+        self.assertEqual(self.wins(), {"Alice": 0, "Bob": 0, "Carol": 0})
+        self.assertFalse(MatchupWinner.objects.exists())
+
+    def test_ties_all_win(self):
+        self.set_score(25, 20)
+        self.assertEqual(self.wins(), {"Alice": 1, "Bob": 1, "Carol": 0})
+
+    def test_pick_changes_and_deleted_matchups_update_standings(self):
+        self.set_score(24, 20)
+
+        pick = BowlMatchupPick.objects.get(user=self.users[0])
+        pick.margin = 4
+        pick.save()
+        self.assertEqual(self.wins(), {"Alice": 1, "Bob": 0, "Carol": 0})
+
+        # with their only picks gone, nobody is left in the standings
+        self.matchup.delete()
+        self.assertEqual(self.wins(), {})
+
+    def test_rebuild_matches_incremental_standings(self):
+        self.set_score(24, 20)
+        wins = self.wins()
+
+        Standing.objects.update(wins=5)
+        rebuild_standings(BOWL_YEAR)
+
+        self.assertEqual(self.wins(), wins)
+
+    def test_standings_endpoints(self):
+        self.set_score(24, 20)
+
+        response = self.client.get(
+            reverse("view_standings_for_year", args=(BOWL_YEAR,))
+        )
+        self.assertContains(response, "<td>Bob</td>", html=True)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("json_standings_for_year", args=(BOWL_YEAR,))
+            )
+
+        self.assertEqual(
+            response.json(),
+            [
+                {"name": "Bob", "wins": 1},
+                {"name": "Alice", "wins": 0},
+                {"name": "Carol", "wins": 0},
+            ],
+        )
+
+        response = self.client.get(reverse("json_picks_for_year", args=(BOWL_YEAR,)))
+        (pick_object,) = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(pick_object["winners"], ["Bob "])
+
+
+class JsonPicksForYearTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, _, _ = create_season(3)
+        cls.users = [
+            User.objects.create_user(
+                f"fan{i}@example.com", "password", first_name=n, last_name="Fan"
+            )
+            for i, n in enumerate(["Bob", "Alice"])
+        ]
+
+        for user in cls.users:
+            for m in reversed(cls.matchups):
+                BowlMatchupPick.objects.create(
+                    user=user, bowl_matchup=m, winner=m.home_team, margin=3
+                )
+
+        cls.matchups[0].away_team_final_score = 10
+        cls.matchups[0].home_team_final_score = 14
+        cls.matchups[0].save()
+
+    def expected_picks(self, m):
+        pick_object = {
+            "matchup": {
+                "bowl_game": m.bowl_game.name,
+                "start_time": m.start_time,
+                "home_team": m.home_team.name,
+                "away_team": m.away_team.name,
+                "cfp_playoff_game": False,
+                "away_team_score": m.away_team_final_score,
+                "home_team_score": m.home_team_final_score,
+            },
+            "picks": [
+                {"name": "Alice Fan", "winner": m.home_team.name, "margin": 3},
+                {"name": "Bob Fan", "winner": m.home_team.name, "margin": 3},
+            ],
+        }
+
+        if m.final_margin is not None:
+            pick_object["winners"] = ["Alice Fan", "Bob Fan"]
+
+        return pick_object
+
+    def test_streams_the_same_bytes_as_json_response(self):
+        response = self.client.get(reverse("json_picks_for_year", args=(BOWL_YEAR,)))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            JsonResponse(
+                [self.expected_picks(m) for m in self.matchups], safe=False
+            ).content,
+        )
+
+    def test_empty_year(self):
+        response = self.client.get(reverse("json_picks_for_year", args=(1999,)))
+
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+
+
+class SimulationTests(BowlPoolTestCase):
+    def test_score_simulations(self):
+        picked_margins = np.array(
+            [[7, -3, np.nan], [3, -10, 1], [-7, -3, 2]], dtype=np.float32
+        )
+        simulated_margins = np.array([[4, -3, -1], [10, 5, 3]], dtype=np.float32)
+
+        won = score_simulations(picked_margins, simulated_margins)
+
+        np.testing.assert_array_equal(
+            won,
+            [
+                [[False, True, False], [True, False, False], [False, True, False]],
+                [[True, False, False], [False, False, False], [False, False, True]],
+            ],
+        )
+
+    def test_simulate_year(self):
+        (scored, remaining), _, _ = create_season(2)
+        leader, trailer = [
+            User.objects.create_user(f"{n}@example.com", "password", first_name=n)
+            for n in ["Alice", "Bob"]
+        ]
+
+        for user, margin in [(leader, 3), (trailer, 10)]:
+            BowlMatchupPick.objects.create(
+                user=user, bowl_matchup=scored, winner=scored.home_team, margin=margin
+            )
+            BowlMatchupPick.objects.create(
+                user=user, bowl_matchup=remaining, winner=remaining.home_team, margin=3
+            )
+
+        scored.away_team_final_score = 17
+        scored.home_team_final_score = 21
+        scored.save()
+
+        results = simulate_year(BOWL_YEAR, 1000, seed=1)
+
+        self.assertEqual(
+            results["remaining_matchups"], ["Bowl 1", "Semifinal 0", "Semifinal 1"]
+        )
+        alice, bob = results["users"]
+        self.assertEqual((alice["name"], alice["wins"]), ("Alice", 1))
+        self.assertEqual(alice["pool_win_probability"], 1)
+        self.assertEqual(bob["pool_win_probability"], 0)
+        self.assertEqual(
+            alice["matchup_win_probabilities"], bob["matchup_win_probabilities"]
+        )
+        # the home team is favored by 3, so it should win a bit over half the time
+        self.assertGreater(alice["matchup_win_probabilities"]["Bowl 1"], 0.5)
+        self.assertLess(alice["matchup_win_probabilities"]["Bowl 1"], 0.7)
+        self.assertEqual(alice["matchup_win_probabilities"]["Semifinal 0"], 0)
+
+        url = reverse("json_simulate_year", args=(BOWL_YEAR,))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(leader)
+        response = self.client.get(url, {"simulations": 100})
+        self.assertEqual(response.json()["simulations"], 100)
+
+        # the year hasn't changed, so the simulation is served from the cache
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, {"simulations": 100})
+
+        self.assertEqual(cached.json(), response.json())
+
+
+class BowlMatchupDisplayTests(BowlPoolTestCase):
+    def test_with_display_matches_the_model_without_loading_relations(self):
+        matchups, _, championship = create_season(4)
+        spreads = [(-3, False), (7, True), (0, False), (0, True)]
+
+        for m, (spread, extra_half) in zip(matchups, spreads):
+            m.home_team_point_spread = spread
+            m.point_spread_extra_half = extra_half
+            m.save()
+
+        matchups[0].away_team_final_score = 14
+        matchups[0].home_team_final_score = 10
+        matchups[0].save()
+
+        expected = {
+            m.id: (m.display_name, m.bowl_favorite(), str(m), m.final_margin)
+            for m in BowlMatchup.objects.filter(bowl_year=BOWL_YEAR)
+        }
+
+        with self.assertNumQueries(1):
+            displayed = {
+                m.id: (m.display_name, m.bowl_favorite(), str(m), m.final_margin)
+                for m in pools.select_shared(
+                    BowlMatchup.objects.filter(bowl_year=BOWL_YEAR).with_display(),
+                    "away_team",
+                    "home_team",
+                )
+            }
+
+        self.assertEqual(displayed, expected)
+        self.assertEqual(expected[matchups[0].id][1], "Team 1 by 3")
+        self.assertEqual(expected[matchups[1].id][1], "Team 2 by 7.5")
+        self.assertEqual(expected[matchups[2].id][1], "Pick 'em")
+        self.assertEqual(expected[matchups[3].id][1], "Team 6 by 0.5")
+        self.assertEqual(expected[championship.id][1], "?")
+
+
+class SeasonSummaryTests(BowlPoolTestCase):
+    def test_summaries_follow_changes_and_feed_the_year_index(self):
+        matchups, semifinals, _ = create_season(2)
+        alice = User.objects.create_user("alice@example.com", "password")
+        bob = User.objects.create_user("bob@example.com", "password")
+
+        for user, margin in [(alice, 3), (bob, 7)]:
+            submit_picks(
+                user,
+                BOWL_YEAR,
+                {
+                    m.id: {"winner": str(m.home_team_id), "margin": str(margin)}
+                    for m in matchups
+                },
+            )
+
+        matchups[0].away_team_final_score = 7
+        matchups[0].home_team_final_score = 10
+        matchups[0].save()
+
+        BowlMatchup.objects.create(
+            bowl_game=matchups[0].bowl_game,
+            bowl_year=BOWL_YEAR - 1,
+            start_time=matchups[0].start_time,
+        )
+
+        summary = SeasonSummary.objects.get(bowl_year=BOWL_YEAR)
+        self.assertEqual(summary.bowl_count, 5)
+        self.assertEqual(summary.participant_count, 2)
+        self.assertEqual(summary.completed_count, 1)
+        self.assertEqual(summary.leader, alice)
+        self.assertEqual(summary.leader_wins, 1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("year_index"))
+
+        self.assertEqual(
+            [s.bowl_year for s in response.context["season_summaries"]],
+            [BOWL_YEAR, BOWL_YEAR - 1],
+        )
+
+        BowlMatchup.objects.filter(bowl_year=BOWL_YEAR - 1).delete()
+        self.assertFalse(SeasonSummary.objects.filter(bowl_year=BOWL_YEAR - 1).exists())
+
+    def test_deleting_a_users_only_pick_drops_them(self):
+        matchups, _, _ = create_season(2)
+        alice = User.objects.create_user("alice@example.com", "password")
+        bob = User.objects.create_user("bob@example.com", "password")
+
+        for user, picked in [(alice, matchups), (bob, matchups[:1])]:
+            submit_picks(
+                user,
+                BOWL_YEAR,
+                {m.id: {"winner": str(m.home_team_id), "margin": "3"} for m in picked},
+            )
+
+        BowlMatchupPick.objects.get(user=alice, bowl_matchup=matchups[0]).delete()
+        self.assertEqual(
+            SeasonSummary.objects.get(bowl_year=BOWL_YEAR).participant_count, 2
+        )
+
+        BowlMatchupPick.objects.get(user=bob).delete()
+        self.assertEqual(
+            SeasonSummary.objects.get(bowl_year=BOWL_YEAR).participant_count, 1
+        )
+        self.assertEqual([s.user for s in ordered_standings(BOWL_YEAR)], [alice])
+
+        # the picks of a deleted matchup go with it
+        matchups[1].delete()
+        self.assertEqual(
+            SeasonSummary.objects.get(bowl_year=BOWL_YEAR).participant_count, 0
+        )
+
+
+class YearCacheTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, _, _ = create_season(2)
+        cls.user = User.objects.create_user("fan@example.com", "password")
+
+        for m in cls.matchups:
+            BowlMatchupPick.objects.create(
+                user=cls.user, bowl_matchup=m, winner=m.home_team, margin=3
+            )
+
+    def get_json(self):
+        response = self.client.get(reverse("json_picks_for_year", args=(BOWL_YEAR,)))
+
+        if response.streaming:
+            return json.loads(b"".join(response.streaming_content))
+
+        return response.json()
+
+    def test_cached_reads_cost_one_version_check(self):
+        picks = self.get_json()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_json(), picks)
+
+        self.client.get(reverse("view_all_picks_for_year", args=(BOWL_YEAR,)))
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse("view_all_picks_for_year", args=(BOWL_YEAR,)))
+
+    def test_changes_invalidate_the_year(self):
+        self.get_json()
+
+        self.matchups[0].away_team_final_score = 21
+        self.matchups[0].home_team_final_score = 24
+        self.matchups[0].save()
+        self.assertEqual(self.get_json()[0]["winners"], [" "])
+
+        team = self.matchups[1].home_team
+        team.name = "Renamed"
+        team.save()
+        self.assertEqual(self.get_json()[1]["matchup"]["home_team"], "Renamed")
+
+        submit_picks(
+            self.user,
+            BOWL_YEAR,
+            {self.matchups[1].id: {"winner": str(team.id), "margin": "10"}},
+        )
+        self.assertEqual(self.get_json()[1]["picks"][0]["margin"], 10)
+
+
+class QueryPlanTests(BowlPoolTestCase):
+    """Run EXPLAIN QUERY PLAN over every query each view makes against a seeded
+    database, and fail if one has to read a whole table or sort a whole result"""
+
+    # tables with a row per year, which are cheaper to scan than to index
+    SCANNABLE_TABLES = {"bowlpool_app_yearversion"}
+
+    # index scans that read every row on purpose: the year index lists every year
+    INTENDED_SCANS = {
+        "SCAN bowlpool_app_seasonsummary USING INDEX "
+        "sqlite_autoindex_bowlpool_app_seasonsummary_1",
+    }
+
+    # also matches "SCAN t USING INDEX i" and "SCAN t USING COVERING INDEX i",
+    # which read the whole index
+    FULL_SCAN = re.compile(r"^SCAN (\w+)")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, cls.semifinals, _ = create_season(10)
+        cls.user = User.objects.create_user("fan@example.com", "password")
+        cls.staff_user = User.objects.create_user(
+            "staff@example.com", "password", is_staff=True
+        )
+
+        for user in [cls.user, cls.staff_user]:
+            submit_picks(
+                user,
+                BOWL_YEAR,
+                {
+                    m.id: {"winner": str(m.home_team_id), "margin": "3"}
+                    for m in cls.matchups + cls.semifinals
+                },
+            )
+
+        cls.matchups[0].away_team_final_score = 3
+        cls.matchups[0].home_team_final_score = 10
+        cls.matchups[0].save()
+
+    def query_plan_problems(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        self.assertLess(response.status_code, 400, url)
+
+        problems = []
+
+        for query in queries.captured_queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plan = [row[3] for row in cursor.fetchall()]
+
+            for step in plan:
+                full_scan = self.FULL_SCAN.match(step)
+
+                if (
+                    full_scan
+                    and full_scan[1] not in self.SCANNABLE_TABLES
+                    and step not in self.INTENDED_SCANS
+                ) or step == "USE TEMP B-TREE FOR ORDER BY":
+                    problems.append(f"{url}: {step} in {query['sql']}")
+
+        return problems
+
+    def test_no_view_scans_or_sorts_a_whole_table(self):
+        self.client.force_login(self.staff_user)
+
+        requests = [
+            ("get", reverse("year_index")),
+            ("get", reverse("view_all_picks_for_year", args=(BOWL_YEAR,))),
+            ("get", reverse("json_picks_for_year", args=(BOWL_YEAR,))),
+            ("get", reverse("view_my_picks_for_year", args=(BOWL_YEAR,))),
+            ("get", reverse("view_standings_for_year", args=(BOWL_YEAR,))),
+            ("get", reverse("json_standings_for_year", args=(BOWL_YEAR,))),
+            ("get", reverse("json_simulate_year", args=(BOWL_YEAR,))),
+            # a cursor without an event id, and then one with
+            ("get", reverse("year_events", args=(BOWL_YEAR,))),
+            (
+                "get",
+                reverse("year_events", args=(BOWL_YEAR,)),
+                {"since": f"1:{time.time()}"},
+            ),
+            ("get", reverse("json_year_events", args=(BOWL_YEAR,))),
+            (
+                "post",
+                reverse("submit_my_picks_for_year", args=(BOWL_YEAR,)),
+                {
+                    f"{self.matchups[1].id}-winner": self.matchups[1].away_team_id,
+                    f"{self.matchups[1].id}-margin": 7,
+                },
+            ),
+        ]
+
+        problems = [
+            p for request in requests for p in self.query_plan_problems(*request)
+        ]
+
+        self.assertEqual(problems, [])
+
+
+class SQLiteConnectionProfileTests(SimpleTestCase):
+    """Hammer one database file with simulated submitters and readers"""
+
+    ALIAS = "concurrency"
+    SUBMITTERS = 16
+    READERS = 4
+    PICKS_PER_SUBMITTER = 20
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        connections.settings[self.ALIAS] = {
+            **connections["default"].settings_dict,
+            "NAME": os.path.join(directory.name, "db.sqlite3"),
+            "CONN_MAX_AGE": 0,
+        }
+        self.addCleanup(connections.settings.pop, self.ALIAS)
+        self.addCleanup(connections.__delitem__, self.ALIAS)
+
+        with connections[self.ALIAS].cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE pick (user_id INTEGER, matchup_id INTEGER, "
+                "margin INTEGER, UNIQUE (user_id, matchup_id))"
+            )
+        connections[self.ALIAS].close()
+
+    def run_threads(self, target, count):
+        errors = []
+
+        def run(i):
+            try:
+                target(i)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections[self.ALIAS].close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+
+        for thread in threads:
+            thread.start()
+
+        return threads, errors
+
+    def submit(self, user_id):
+        def save_pick(matchup_id):
+            with immediate_atomic(using=self.ALIAS):
+                with connections[self.ALIAS].cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO pick VALUES (%s, %s, %s) ON CONFLICT "
+                        "(user_id, matchup_id) DO UPDATE SET margin = excluded.margin",
+                        [user_id, matchup_id, 7],
+                    )
+                    # hold the write lock about as long as a real submission does
+                    time.sleep(0.001)
+
+        for matchup_id in range(self.PICKS_PER_SUBMITTER):
+            retry_on_locked(lambda: save_pick(matchup_id))
+
+    def test_profile_pragmas(self):
+        with connections[self.ALIAS].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_concurrent_submitters_never_see_a_locked_database(self):
+        submitting = threading.Event()
+        submitting.set()
+
+        def read(_):
+            while submitting.is_set():
+                with connections[self.ALIAS].cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM pick")
+
+        readers, read_errors = self.run_threads(read, self.READERS)
+        submitters, submit_errors = self.run_threads(self.submit, self.SUBMITTERS)
+
+        for thread in submitters:
+            thread.join()
+
+        submitting.clear()
+
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(submit_errors + read_errors, [])
+
+        with connections[self.ALIAS].cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM pick")
+            self.assertEqual(
+                cursor.fetchone()[0], self.SUBMITTERS * self.PICKS_PER_SUBMITTER
+            )
+
+
+class GeneratePoolDataTests(BowlPoolTestCase):
+    def test_generated_year_is_complete_and_benchmarkable(self):
+        call_command(
+            "generate_pool_data",
+            BOWL_YEAR,
+            users=5,
+            bowls=6,
+            scored=3,
+            stdout=StringIO(),
+        )
+
+        # six bowls, two semifinals and the championship, all picked by everyone
+        self.assertEqual(BowlMatchup.objects.filter(bowl_year=BOWL_YEAR).count(), 9)
+        self.assertEqual(
+            BowlMatchupPick.objects.filter(bowl_matchup__bowl_year=BOWL_YEAR).count(),
+            45,
+        )
+        self.assertEqual(
+            Standing.objects.filter(bowl_year=BOWL_YEAR).count(),
+            5,
+        )
+        self.assertGreaterEqual(
+            MatchupWinner.objects.filter(bowl_matchup__bowl_year=BOWL_YEAR).count(), 3
+        )
+
+        for pick in BowlMatchupPick.objects.filter(
+            bowl_matchup__bowl_game__name="CFP National Championship"
+        ):
+            self.assertTrue(
+                BowlMatchupPick.objects.filter(
+                    user=pick.user,
+                    bowl_matchup__cfp_playoff_game=True,
+                    winner=pick.winner,
+                ).exists()
+            )
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, "baseline.json")
+
+            call_command(
+                "benchmark_views",
+                BOWL_YEAR,
+                iterations=2,
+                simulations=10,
+                output=output_path,
+                stdout=StringIO(),
+            )
+
+            with open(output_path) as f:
+                views = json.load(f)["views"]
+
+        self.assertEqual(set(views), {p.name for p in urls.urlpatterns})
+        self.assertEqual(
+            set(views["view_all_picks_for_year"]),
+            {"p50", "p95", "p99", "queries", "peak_memory_kb"},
+        )
+
+
+class MetricsTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, _, _ = create_season(2)
+        cls.user = User.objects.create_user("fan@example.com", "password")
+        cls.staff = User.objects.create_user(
+            "staff@example.com", "password", is_staff=True
+        )
+
+        for m in cls.matchups:
+            BowlMatchupPick.objects.create(
+                user=cls.user, bowl_matchup=m, winner=m.away_team, margin=3
+            )
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def get_metrics(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_server_timing_reports_queries_and_rendering(self):
+        response = self.client.get(
+            reverse("view_all_picks_for_year", args=(BOWL_YEAR,))
+        )
+
+        server_timing = dict(
+            entry.split(";", 1)[0:2] for entry in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(set(server_timing), {"db", "tpl", "app"})
+        self.assertIn('desc="3 queries"', server_timing["db"])
+        self.assertNotEqual(server_timing["tpl"], "dur=0.0")
+
+    def test_streamed_responses_are_recorded_once_consumed(self):
+        response = self.client.get(reverse("json_picks_for_year", args=(BOWL_YEAR,)))
+        self.assertNotIn("json_picks_for_year", self.get_metrics())
+
+        body = b"".join(response.streaming_content)
+        text = self.get_metrics()
+
+        self.assertIn(
+            'bowlpool_response_size_bytes_count{view="json_picks_for_year"} 1', text
+        )
+        self.assertIn(
+            f'bowlpool_response_size_bytes_sum{{view="json_picks_for_year"}} '
+            f"{len(body)}",
+            text,
+        )
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 302)
+
+    def test_merges_saved_worker_metrics(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            with open(os.path.join(metrics_dir, "1.json"), "w") as f:
+                json.dump(
+                    [
+                        {
+                            "name": "bowlpool_db_queries",
+                            "view": "year_index",
+                            "counts": [0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0],
+                            "total": 3,
+                        }
+                    ],
+                    f,
+                )
+
+            with self.settings(BOWLPOOL_METRICS_DIR=metrics_dir):
+                self.client.get(reverse("year_index"))
+                text = self.get_metrics()
+
+        self.assertIn('bowlpool_db_queries_count{view="year_index"} 3', text)
+        self.assertIn('bowlpool_db_queries_bucket{view="year_index",le="+Inf"} 3', text)
+
+    def test_removes_files_of_gone_workers(self):
+        # a process that has exited, and a running one that has been idle for long
+        gone = subprocess.Popen([sys.executable, "-c", ""])
+        gone.wait()
+        idle_pid = os.getppid()
+        saved = time.time() - 24 * 60 * 60
+
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            paths = {}
+
+            for pid in [gone.pid, idle_pid]:
+                paths[pid] = os.path.join(metrics_dir, f"{pid}.json")
+
+                with open(paths[pid], "w") as f:
+                    json.dump(
+                        [
+                            {
+                                "name": "bowlpool_db_queries",
+                                "view": "year_index",
+                                "counts": [0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0],
+                                "total": 3,
+                            }
+                        ],
+                        f,
+                    )
+
+                os.utime(paths[pid], (saved, saved))
+
+            with self.settings(
+                BOWLPOOL_METRICS_DIR=metrics_dir, BOWLPOOL_METRICS_SAVE_INTERVAL=10
+            ):
+                self.client.get(reverse("year_index"))
+                text = self.get_metrics()
+
+            self.assertFalse(os.path.exists(paths[gone.pid]))
+            self.assertTrue(os.path.exists(paths[idle_pid]))
+
+        self.assertIn('bowlpool_db_queries_count{view="year_index"} 3', text)
+
+    def test_records_queries_of_connections_opened_mid_request(self):
+        # like a pool's database, registered and connected to by the request
+        new_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+
+        try:
+            with new_connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        finally:
+            metrics.current_request.reset(token)
+            new_connection.close()
+
+        self.assertIn(middleware._record_query, new_connection.execute_wrappers)
+        self.assertEqual(request_metrics.queries, 1)
+
+
+class AsyncViewsClientHandler(AsyncViewsMixin, AsyncClientHandler):
+    pass
+
+
+class AsyncViewsTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, cls.semifinals, cls.championship = create_season(3)
+        cls.users = [
+            User.objects.create_user(
+                f"fan{i}@example.com", "password", first_name=n, last_name="Fan"
+            )
+            for i, n in enumerate(["Bob", "Alice"])
+        ]
+
+        for user in cls.users:
+            for m in cls.matchups:
+                BowlMatchupPick.objects.create(
+                    user=user, bowl_matchup=m, winner=m.away_team, margin=3
+                )
+
+        cls.matchups[0].away_team_final_score = 10
+        cls.matchups[0].home_team_final_score = 7
+        cls.matchups[0].save()
+
+    def setUp(self):
+        super().setUp()
+        self.async_client.handler = AsyncViewsClientHandler(enforce_csrf_checks=False)
+
+    async def get_body(self, response):
+        if response.streaming:
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        return response.content
+
+    def test_asgi_serves_the_async_views(self):
+        request = RequestFactory().get(reverse("json_picks_for_year", args=(1999,)))
+
+        self.assertIs(
+            AsyncViewsClientHandler().resolve_request(request).func,
+            async_views.json_picks_for_year,
+        )
+
+    async def test_json_picks_match_the_sync_view(self):
+        url = reverse("json_picks_for_year", args=(BOWL_YEAR,))
+        expected = await sync_to_async(
+            lambda: b"".join(self.client.get(url).streaming_content)
+        )()
+
+        await sync_to_async(cache.clear)()
+
+        streamed = await self.async_client.get(url)
+        self.assertTrue(streamed.is_async)
+        self.assertEqual(await self.get_body(streamed), expected)
+
+        # the stream filled the cache
+        cached = await self.async_client.get(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached.content, expected)
+
+    async def test_all_picks_match_the_sync_view(self):
+        url = reverse("view_all_picks_for_year", args=(BOWL_YEAR,))
+        expected = (await sync_to_async(self.client.get)(url)).context["picks_for_year"]
+
+        await sync_to_async(cache.clear)()
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.context["picks_for_year"], expected)
+
+        # under ASGI the page streams its live updates
+        self.assertTrue(response.context["events_stream"])
+        self.assertEqual(
+            response.context["events_url"], reverse("year_events", args=(BOWL_YEAR,))
+        )
+
+    async def test_my_picks_require_login(self):
+        response = await self.async_client.get(
+            reverse("view_my_picks_for_year", args=(BOWL_YEAR,))
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse("login")))
+
+    async def test_submit_and_view_my_picks(self):
+        await sync_to_async(self.async_client.force_login)(self.users[0])
+
+        picks = {
+            f"{m.id}-{field}": value
+            for m in self.semifinals
+            for field, value in [("winner", m.home_team_id), ("margin", 10)]
+        }
+        picks[f"{self.championship.id}-winner"] = self.semifinals[0].home_team_id
+        picks[f"{self.championship.id}-margin"] = 1
+
+        response = await self.async_client.post(
+            reverse("submit_my_picks_for_year", args=(BOWL_YEAR,)), picks
+        )
+        self.assertEqual(
+            response.url, reverse("view_my_picks_for_year", args=(BOWL_YEAR,))
+        )
+
+        response = await self.async_client.get(response.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sum(p.winner_id is not None for p in response.context["picks_for_year"]), 6
+        )
+        self.assertEqual(len(response.context["cfp_teams"]), 4)
+
+
+class YearEventsTests(BowlPoolTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.matchups, _, _ = create_season(2)
+        cls.users = [
+            User.objects.create_user(f"fan{i}@example.com", "password", first_name=n)
+            for i, n in enumerate(["Alice", "Bob"])
+        ]
+
+        for user, margin in zip(cls.users, [3, 10]):
+            BowlMatchupPick.objects.create(
+                user=user,
+                bowl_matchup=cls.matchups[0],
+                winner=cls.matchups[0].home_team,
+                margin=margin,
+            )
+
+    def get_events(self, **headers):
+        response = self.client.get(
+            reverse("year_events", args=(BOWL_YEAR,)),
+            {"since": self.since},
+            headers=headers,
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        messages = []
+
+        for block in b"".join(response.streaming_content).decode().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+
+            if "id" in fields:
+                messages.append(fields)
+
+        return messages
+
+    def setUp(self):
+        super().setUp()
+        self.since = events.page_cursor()
+
+    def test_streams_score_and_winner_changes(self):
+        m = self.matchups[0]
+        m.away_team_final_score = 7
+        m.home_team_final_score = 10
+        m.save()
+
+        score, winners = self.get_events()
+
+        self.assertEqual(score["event"], "score")
+        self.assertEqual(
+            json.loads(score["data"]),
+            {"matchup": m.id, "away_team_score": 7, "home_team_score": 10},
+        )
+        self.assertEqual(winners["event"], "winners")
+        self.assertEqual(
+            json.loads(winners["data"]),
+            {
+                "matchup": m.id,
+                "winners": [{"user_id": self.users[0].id, "name": "Alice "}],
+            },
+        )
+
+        # resuming from the last event sends nothing new, just an id to resume from
+        (heartbeat,) = self.get_events(last_event_id=winners["id"])
+        self.assertEqual(heartbeat.keys(), {"id"})
+
+        m.home_team_final_score = 17
+        m.save()
+
+        score, winners = self.get_events(last_event_id=heartbeat["id"])
+        self.assertEqual(json.loads(score["data"])["home_team_score"], 17)
+        self.assertEqual(
+            json.loads(winners["data"])["winners"][0]["user_id"], self.users[1].id
+        )
+
+    def test_announces_picks_locking(self):
+        m = self.matchups[1]
+        m.start_time = timezone.now() - datetime.timedelta(seconds=1)
+        BowlMatchup.objects.filter(id=m.id).update(start_time=m.start_time)
+
+        self.since = str(
+            events.Cursor(None, m.start_time - datetime.timedelta(minutes=1))
+        )
+
+        (lock,) = self.get_events()
+        self.assertEqual(lock["event"], "lock")
+        self.assertEqual(json.loads(lock["data"]), {"matchup": m.id})
+
+        self.assertEqual(self.get_events(last_event_id=lock["id"])[0].keys(), {"id"})
+
+    @override_settings(
+        BOWLPOOL_EVENTS_STREAM_SECONDS=55, BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS=30
+    )
+    def test_wsgi_sends_one_batch_without_waiting(self):
+        start = time.monotonic()
+        response = self.client.get(
+            reverse("year_events", args=(BOWL_YEAR,)), {"since": self.since}
+        )
+        body = b"".join(response.streaming_content).decode()
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(body.startswith("retry: 30000\n\n"))
+        self.assertEqual(body.count("id: "), 1)
+
+    def test_polls_for_updates_under_wsgi(self):
+        response = self.client.get(
+            reverse("view_all_picks_for_year", args=(BOWL_YEAR,))
+        )
+        self.assertFalse(response.context["events_stream"])
+        self.assertEqual(
+            response.context["events_url"],
+            reverse("json_year_events", args=(BOWL_YEAR,)),
+        )
+
+        m = self.matchups[0]
+        m.away_team_final_score = 7
+        m.home_team_final_score = 10
+        m.save()
+
+        url = reverse("json_year_events", args=(BOWL_YEAR,))
+        poll = self.client.get(url, {"since": self.since}).json()
+        self.assertEqual([u["kind"] for u in poll["updates"]], ["score", "winners"])
+        self.assertEqual(
+            poll["updates"][0]["data"],
+            {"matchup": m.id, "away_team_score": 7, "home_team_score": 10},
+        )
+
+        self.assertEqual(
+            self.client.get(url, {"since": poll["since"]}).json()["updates"], []
+        )
+
+    def test_publishes_scores_only_when_they_change(self):
+        m = BowlMatchup.objects.get(id=self.matchups[0].id)
+        m.home_team_point_spread = -3
+        m.save()
+
+        m.away_team_final_score = 7
+        m.home_team_final_score = 10
+        m.save()
+        m.save()
+
+        self.assertEqual(
+            YearEvent.objects.filter(bowl_year=BOWL_YEAR, kind="score").count(), 1
+        )
+
+    @override_settings(BOWLPOOL_EVENTS_KEEP_SECONDS=60)
+    def test_publishing_prunes_old_events(self):
+        old = YearEvent.objects.create(bowl_year=BOWL_YEAR - 1, kind="score", data={})
+        YearEvent.objects.filter(id=old.id).update(
+            created=timezone.now() - datetime.timedelta(minutes=2)
+        )
+
+        m = self.matchups[0]
+        m.away_team_final_score = 7
+        m.home_team_final_score = 10
+        m.save()
+
+        self.assertFalse(YearEvent.objects.filter(id=old.id).exists())
+        self.assertTrue(YearEvent.objects.filter(bowl_year=BOWL_YEAR).exists())
+
+
+class SeasonImportTests(BowlPoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.matchups, _, _ = create_season(2)
+        self.user = User.objects.create_user("fan@example.com", "password")
+
+        BowlMatchupPick.objects.create(
+            user=self.user,
+            bowl_matchup=self.matchups[0],
+            winner=self.matchups[0].home_team,
+            margin=3,
+        )
+
+    def import_csv(self, content, **options):
+        with tempfile.TemporaryDirectory() as season_dir:
+            path = os.path.join(season_dir, "season.csv")
+
+            with open(path, "w") as f:
+                f.write(content)
+
+            call_command("import_season", BOWL_YEAR, path, stdout=StringIO(), **options)
+
+    def test_creates_new_matchups_and_scores_existing_ones(self):
+        self.import_csv(
+            "bowl_game,away_team,home_team,start_time,home_team_point_spread,"
+            "away_team_final_score,home_team_final_score\n"
+            "New Bowl,New Away,Team 0,2023-12-20T18:00:00,7,,\n"
+            "Bowl 0,Team 0,Team 1,,-3,7,10\n"
+        )
+
+        new_matchup = BowlMatchup.objects.get(
+            bowl_year=BOWL_YEAR, bowl_game__name="New Bowl"
+        )
+        self.assertEqual(new_matchup.away_team.name, "New Away")
+        self.assertEqual(new_matchup.home_team, self.matchups[0].away_team)
+        self.assertEqual(
+            new_matchup.start_time,
+            datetime.datetime(2023, 12, 20, 18, tzinfo=datetime.timezone.utc),
+        )
+        self.assertEqual(new_matchup.home_team_point_spread, 7)
+
+        # a blank start_time is left as it is
+        scored = BowlMatchup.objects.get(id=self.matchups[0].id)
+        self.assertEqual(scored.final_margin, -3)
+        self.assertEqual(scored.start_time, self.matchups[0].start_time)
+        self.assertEqual(
+            list(
+                MatchupWinner.objects.filter(bowl_matchup=scored).values_list(
+                    "user", flat=True
+                )
+            ),
+            [self.user.id],
+        )
+        self.assertTrue(
+            YearEvent.objects.filter(bowl_year=BOWL_YEAR, kind="score").exists()
+        )
+
+    def test_errors_and_dry_runs_save_nothing(self):
+        with self.assertRaises(CommandError):
+            self.import_csv(
+                "bowl_game,away_team_final_score,home_team_final_score\n"
+                "Bowl 0,7,10\n"
+                "Bowl 1,7,\n"
+            )
+
+        self.import_csv(
+            "bowl_game,away_team_final_score,home_team_final_score\nBowl 0,7,10\n",
+            dry_run=True,
+        )
+
+        self.assertFalse(
+            BowlMatchup.objects.filter(away_team_final_score__isnull=False).exists()
+        )
+
+    def test_admin_upload(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin@example.com", "password")
+        )
+
+        season_file = SimpleUploadedFile(
+            "season.json",
+            json.dumps([{"bowl_game": "Bowl 1", "home_team_point_spread": 4}]).encode(),
+        )
+
+        response = self.client.post(
+            reverse("admin:bowlpool_app_bowlmatchup_import"),
+            {"bowl_year": BOWL_YEAR, "season_file": season_file},
+        )
+
+        self.assertRedirects(
+            response, reverse("admin:bowlpool_app_bowlmatchup_changelist")
+        )
+        self.assertEqual(
+            BowlMatchup.objects.get(id=self.matchups[1].id).home_team_point_spread, 4
+        )
+
+
+class AdminTests(BowlPoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.matchups, _, _ = create_season(2)
+        self.client.force_login(
+            User.objects.create_superuser("admin@example.com", "password")
+        )
+
+    def add_picks(self, first_user, last_user):
+        for i in range(first_user, last_user):
+            user = User.objects.create_user(f"fan{i}@example.com", "password")
+
+            for m in self.matchups:
+                BowlMatchupPick.objects.create(
+                    user=user, bowl_matchup=m, winner=m.home_team, margin=3
+                )
+
+    def query_count(self, url, data=None):
+        # every request loads the admin user, rather than only the first
+        backends.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_dont_grow_with_rows(self):
+        requests = [
+            (reverse("admin:bowlpool_app_bowlmatchuppick_changelist"), None),
+            (
+                reverse("admin:bowlpool_app_bowlmatchuppick_changelist"),
+                {"bowl_matchup__bowl_year": BOWL_YEAR},
+            ),
+            (reverse("admin:bowlpool_app_bowlmatchup_changelist"), None),
+            (
+                reverse("admin:autocomplete"),
+                {
+                    "app_label": "bowlpool_app",
+                    "model_name": "bowlmatchuppick",
+                    "field_name": "bowl_matchup",
+                },
+            ),
+        ]
+
+        self.add_picks(0, 2)
+        query_counts = [self.query_count(*request) for request in requests]
+
+        self.add_picks(2, 10)
+
+        for m in self.matchups:
+            BowlMatchup.objects.create(
+                bowl_game=m.bowl_game,
+                bowl_year=BOWL_YEAR + 1,
+                start_time=m.start_time,
+                away_team=m.home_team,
+                home_team=m.away_team,
+            )
+
+        self.assertEqual(
+            [self.query_count(*request) for request in requests], query_counts
+        )
+
+    def test_list_editable_score_entry(self):
+        self.add_picks(0, 1)
+        m = self.matchups[0]
+
+        data = {
+            "form-TOTAL_FORMS": 1,
+            "form-INITIAL_FORMS": 1,
+            "form-0-id": m.id,
+            "form-0-home_team_point_spread": -3,
+            "form-0-away_team_final_score": 10,
+            "form-0-home_team_final_score": 14,
+            "_save": "Save",
+        }
+
+        response = self.client.post(
+            reverse("admin:bowlpool_app_bowlmatchup_changelist")
+            + f"?bowl_game__id__exact={m.bowl_game_id}",
+            data,
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BowlMatchup.objects.get(id=m.id).final_margin, -4)
+        self.assertEqual(
+            MatchupWinner.objects.filter(bowl_matchup=m).count(),
+            1,
+        )
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.static_root = directory.name
+
+        with override_settings(STATIC_ROOT=self.static_root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            self.hashed_name = staticfiles_storage.stored_name(
+                "bowlpool_app/css/base.css"
+            )
+
+        self.fallthrough_calls = []
+        self.middleware = StaticFilesMiddleware(
+            self.fallthrough, static_root=self.static_root, static_url="/static/"
+        )
+
+    def fallthrough(self, environ, start_response):
+        self.fallthrough_calls.append(environ["PATH_INFO"])
+        start_response("200 OK", [])
+        return [b"django"]
+
+    def request(self, path, method="GET", **headers):
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        body = b"".join(
+            self.middleware(
+                {"PATH_INFO": path, "REQUEST_METHOD": method, **headers},
+                start_response,
+            )
+        )
+
+        return response["status"], response["headers"], body
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        self.assertRegex(
+            self.hashed_name, r"^bowlpool_app/css/base\.[0-9a-f]{12}\.css$"
+        )
+
+        with open(os.path.join(self.static_root, "staticfiles.json")) as f:
+            manifest = json.load(f)["paths"]
+
+        self.assertEqual(manifest["bowlpool_app/css/base.css"], self.hashed_name)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.static_root, self.hashed_name + ".gz"))
+        )
+
+    def test_serves_hashed_files_with_immutable_cache_headers(self):
+        path = "/static/" + self.hashed_name
+
+        status, headers, body = self.request(path)
+        self.assertEqual(status, "200 OK")
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertIn(b"spin-button", body)
+
+        status, headers, gzipped = self.request(path, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(gzipped), body)
+
+        # an encoding refused with q=0 is never used
+        for accept_encoding in ["gzip;q=0, br", "*;q=0", "br, *; q=0"]:
+            _, refused_headers, _ = self.request(
+                path, HTTP_ACCEPT_ENCODING=accept_encoding
+            )
+            self.assertNotIn("Content-Encoding", refused_headers, accept_encoding)
+
+        for accept_encoding in ["gzip;q=0.5", "*"]:
+            _, accepted_headers, _ = self.request(
+                path, HTTP_ACCEPT_ENCODING=accept_encoding
+            )
+            self.assertEqual(accepted_headers["Content-Encoding"], "gzip")
+
+        status, _, body = self.request(path, HTTP_IF_NONE_MATCH=headers["ETag"])
+        self.assertEqual(status, "304 Not Modified")
+        self.assertEqual(body, b"")
+
+        _, headers, _ = self.request("/static/bowlpool_app/css/base.css")
+        self.assertNotIn("immutable", headers["Cache-Control"])
+
+        self.assertEqual(self.fallthrough_calls, [])
+
+    def test_passes_other_requests_to_django(self):
+        self.request("/bowl-pool/")
+        self.request("/static/bowlpool_app/css/missing.css")
+        self.request("/static/" + self.hashed_name, method="POST")
+
+        self.assertEqual(len(self.fallthrough_calls), 3)
+
+
+class WarmupTests(BowlPoolTestCase):
+    def test_warmup_compiles_every_template(self):
+        loader = engines["template_backend"].engine.template_loaders[0]
+        loader.reset()
+
+        self.assertEqual(list(warmup.warmup()), ["templates", "urls", "auth"])
+        self.assertIn("user_picks_for_year.html", loader.get_template_cache)
+        self.assertIn("registration/login.html", loader.get_template_cache)
+
+    @override_settings(BOWLPOOL_WARMUP=False)
+    def test_warmup_can_be_disabled(self):
+        application = object()
+
+        with unittest.mock.patch.object(warmup, "warmup") as mock_warmup:
+            self.assertIs(warmup.warmup_application(application), application)
+
+        mock_warmup.assert_not_called()
+
+
+# the test runner gives this pool an in-memory database alongside the default one
+TEST_POOL_DATABASE = pools.register_database("pool_test")
+
+
+class PoolTests(BowlPoolTestCase):
+    databases = {"default", TEST_POOL_DATABASE}
+
+    def setUp(self):
+        super().setUp()
+
+        self.pool = Pool.objects.create(name="Test Pool", slug="test")
+        self.user = User.objects.create_user(
+            "fan@example.com", "password", first_name="Fan"
+        )
+        self.pool.members.add(self.user)
+
+        create_season(1)
+
+        with using_pool(self.pool):
+            self.matchups, _, _ = create_season(2)
+
+    def use_pool(self, slug):
+        session = self.client.session
+        session[pools.SESSION_KEY] = slug
+        session.save()
+
+    def test_rebuild_standings_rebuilds_every_pool(self):
+        with using_pool(self.pool):
+            submit_picks(
+                self.user,
+                BOWL_YEAR,
+                {
+                    self.matchups[0].id: {
+                        "winner": str(self.matchups[0].away_team_id),
+                        "margin": "3",
+                    }
+                },
+            )
+            Standing.objects.update(wins=5)
+
+        call_command("rebuild_standings", "--pool", "test", stdout=StringIO())
+        self.assertEqual(Standing.objects.using(TEST_POOL_DATABASE).get().wins, 0)
+
+        Standing.objects.using(TEST_POOL_DATABASE).update(wins=5)
+        call_command("rebuild_standings", stdout=StringIO())
+        self.assertEqual(Standing.objects.using(TEST_POOL_DATABASE).get().wins, 0)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_standings", "--pool", "nope", stdout=StringIO())
+
+    def test_pool_data_is_kept_in_the_pools_database(self):
+        with using_pool(self.pool):
+            submit_picks(
+                self.user,
+                BOWL_YEAR,
+                {
+                    self.matchups[0].id: {
+                        "winner": str(self.matchups[0].away_team_id),
+                        "margin": "3",
+                    }
+                },
+            )
+
+            self.assertEqual(
+                [s.user for s in ordered_standings(BOWL_YEAR)], [self.user]
+            )
+
+        self.assertEqual(
+            BowlMatchupPick.objects.using(TEST_POOL_DATABASE).get().user, self.user
+        )
+        self.assertFalse(BowlMatchupPick.objects.exists())
+        self.assertEqual(BowlMatchup.objects.count(), 4)
+        self.assertEqual(BowlMatchup.objects.using(TEST_POOL_DATABASE).count(), 5)
+
+    def test_session_chooses_one_of_the_users_pools(self):
+        self.client.force_login(self.user)
+        url = reverse("view_my_picks_for_year", args=(BOWL_YEAR,))
+
+        self.assertEqual(len(self.client.get(url).context["picks_for_year"]), 4)
+
+        self.client.get(reverse("select_pool"), {"pool": "test"})
+        response = self.client.get(url)
+        self.assertEqual(response.context["request"].pool, self.pool)
+        self.assertEqual(len(response.context["picks_for_year"]), 5)
+
+        self.client.get(reverse("select_pool"))
+        self.assertEqual(len(self.client.get(url).context["picks_for_year"]), 4)
+
+        # a pool the user has left
+        self.use_pool("test")
+        self.pool.members.remove(self.user)
+        self.assertEqual(len(self.client.get(url).context["picks_for_year"]), 4)
+        self.assertEqual(
+            self.client.get(reverse("select_pool"), {"pool": "test"}).status_code, 404
+        )
+
+    def test_standings_are_read_from_the_pool(self):
+        with using_pool(self.pool):
+            submit_picks(
+                self.user,
+                BOWL_YEAR,
+                {
+                    self.matchups[0].id: {
+                        "winner": str(self.matchups[0].away_team_id),
+                        "margin": "3",
+                    }
+                },
+            )
+            self.matchups[0].away_team_final_score = 21
+            self.matchups[0].home_team_final_score = 17
+            self.matchups[0].save()
+
+        self.client.force_login(self.user)
+        self.use_pool("test")
+
+        response = self.client.get(
+            reverse("json_standings_for_year", args=(BOWL_YEAR,))
+        )
+        self.assertEqual(response.json()[0]["wins"], 1)
+
+        response = self.client.get(reverse("year_index"))
+        self.assertEqual(
+            [s.leader for s in response.context["season_summaries"]], [self.user]
+        )
+
+    def test_deleting_a_user_deletes_their_picks_in_every_pool(self):
+        with using_pool(self.pool):
+            submit_picks(
+                self.user,
+                BOWL_YEAR,
+                {
+                    self.matchups[0].id: {
+                        "winner": str(self.matchups[0].away_team_id),
+                        "margin": "3",
+                    }
+                },
+            )
+
+        self.user.delete()
+
+        self.assertFalse(BowlMatchupPick.objects.using(TEST_POOL_DATABASE).exists())
+        self.assertFalse(Standing.objects.using(TEST_POOL_DATABASE).exists())
+
+    def test_teams_are_shared_by_every_pool(self):
+        self.assertNotIn(
+            "bowlpool_app_team",
+            connections[TEST_POOL_DATABASE].introspection.table_names(),
+        )
+
+        with using_pool(self.pool):
+            submit_picks(
+                self.user,
+                BOWL_YEAR,
+                {
+                    self.matchups[0].id: {
+                        "winner": str(self.matchups[0].away_team_id),
+                        "margin": "3",
+                    }
+                },
+            )
+
+        self.client.force_login(self.user)
+        self.use_pool("test")
+        urls = [
+            reverse(name, args=(BOWL_YEAR,))
+            for name in ["view_my_picks_for_year", "view_all_picks_for_year"]
+        ]
+
+        for url in urls:
+            self.client.get(url)
+
+        # the pool's matchups show the teams of the default database
+        team = self.matchups[0].away_team
+        team.name = "Renamed State"
+        team.save()
+
+        self.assertContains(self.client.get(urls[0]), "Renamed State")
+        self.assertContains(self.client.get(urls[1]), "Renamed State by 3")
+
+        team.delete()
+
+        with using_pool(self.pool):
+            self.assertFalse(
+                BowlMatchup.objects.filter(id=self.matchups[0].id).exists()
+            )
+            self.assertEqual(BowlMatchup.objects.count(), 4)
+
+    def test_admin_finds_a_pools_matchups_by_team(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.use_pool("test")
+
+        response = self.client.get(
+            reverse("admin:bowlpool_app_bowlmatchup_changelist"), {"q": "Team 1"}
+        )
+
+        self.assertEqual(list(response.context["cl"].result_list), [self.matchups[0]])
+        self.assertContains(response, "Team 0")
+
+
+class ReplicaTests(TransactionTestCase):
+    # the replica only sees committed writes, so this can't run in a transaction
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        snapshot.clear()
+
+        self.user = User.objects.create_user("fan@example.com", "password")
+        self.matchups, _, _ = create_season(2)
+
+    def replica_queries(self, url):
+        with CaptureQueriesContext(connections["replica"]) as queries:
+            response = self.client.get(url)
+            # read a streamed body, and close it
+            response.getvalue()
+
+        self.assertEqual(response.status_code, 200)
+
+        return len(queries)
+
+    def test_router_reads_only_the_default_pools_data_from_the_replica(self):
+        token = replicas.reading_replica.set(True)
+
+        try:
+            self.assertEqual(router.db_for_read(BowlMatchupPick), "replica")
+            self.assertEqual(router.db_for_read(User), "default")
+            self.assertEqual(router.db_for_write(BowlMatchupPick), "default")
+
+            with pools.using_database(TEST_POOL_DATABASE):
+                self.assertEqual(
+                    router.db_for_read(BowlMatchupPick), TEST_POOL_DATABASE
+                )
+        finally:
+            replicas.reading_replica.reset(token)
+
+        self.assertEqual(router.db_for_read(BowlMatchupPick), "default")
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.client.force_login(self.user)
+        url = reverse("json_picks_for_year", args=(BOWL_YEAR,))
+
+        self.assertGreater(self.replica_queries(url), 0)
+        self.assertEqual(
+            self.replica_queries(reverse("view_my_picks_for_year", args=(BOWL_YEAR,))),
+            0,
+        )
+
+        self.client.post(
+            reverse("submit_my_picks_for_year", args=(BOWL_YEAR,)),
+            {
+                f"{self.matchups[0].id}-winner": self.matchups[0].away_team_id,
+                f"{self.matchups[0].id}-margin": 7,
+            },
+        )
+        self.assertEqual(self.replica_queries(url), 0)
+
+        with override_settings(BOWLPOOL_DB_REPLICA_STICKY_SECONDS=0):
+            self.client.post(reverse("submit_my_picks_for_year", args=(BOWL_YEAR,)), {})
+            self.assertGreater(self.replica_queries(url), 0)
+
+
+class AuthTests(BowlPoolTestCase):
+    PASSWORD = "correct horse battery staple"
+
+    def test_registration_logs_in_without_verifying_the_password(self):
+        with unittest.mock.patch.object(
+            hashers.PBKDF2PasswordHasher, "verify"
+        ) as verify:
+            response = self.client.post(
+                reverse("register"),
+                {
+                    "email": "fan@example.com",
+                    "first_name": "Fan",
+                    "last_name": "Natic",
+                    "password1": self.PASSWORD,
+                    "password2": self.PASSWORD,
+                },
+            )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            int(self.client.session[SESSION_KEY]),
+            User.objects.get(email="fan@example.com").id,
+        )
+        verify.assert_not_called()
+
+    def test_wrong_password_is_verified_once(self):
+        User.objects.create_user("fan@example.com", self.PASSWORD)
+
+        with unittest.mock.patch.object(
+            hashers.PBKDF2PasswordHasher, "verify", return_value=False
+        ) as verify:
+            self.assertFalse(
+                self.client.login(username="fan@example.com", password="wrong")
+            )
+
+        verify.assert_called_once()
+
+    def test_passwords_are_rehashed_with_the_configured_iterations(self):
+        with override_settings(BOWLPOOL_PASSWORD_ITERATIONS=1000):
+            user = User.objects.create_user("fan@example.com", self.PASSWORD)
+
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+
+        with override_settings(BOWLPOOL_PASSWORD_ITERATIONS=2000):
+            self.assertTrue(
+                self.client.login(username="fan@example.com", password=self.PASSWORD)
+            )
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$2000$"))
+
+    def test_users_are_cached_until_saved(self):
+        user = User.objects.create_user("fan@example.com", first_name="Fan")
+        backend = backends.CachedModelBackend()
+
+        with self.assertNumQueries(1):
+            cached_user = backend.get_user(user.id)
+
+        with self.assertNumQueries(0):
+            self.assertIsNot(backend.get_user(user.id), cached_user)
+
+        user.first_name = "Former fan"
+        user.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(user.id).first_name, "Former fan")
+
+        with override_settings(BOWLPOOL_USER_CACHE_SECONDS=0):
+            with self.assertNumQueries(1):
+                backend.get_user(user.id)
+
+    def test_sessions_from_before_the_cached_backend_still_work(self):
+        user = User.objects.create_user("fan@example.com")
+        self.client.force_login(user, "django.contrib.auth.backends.ModelBackend")
+
+        response = self.client.get(reverse("year_index"))
+        self.assertEqual(response.context["user"], user)
@@ -1,5 +1,8 @@
 from django.urls import path
-from . import views
+
+from bowlpool.handlers import with_async_view
+
+from . import async_views, views
 
 urlpatterns = [
     path(
@@ -9,23 +12,55 @@ urlpatterns = [
     ),
     path(
         "<int:bowl_year>/",
-        views.view_all_picks_for_year,
+        with_async_view(
+            views.view_all_picks_for_year, async_views.view_all_picks_for_year
+        ),
         name="view_all_picks_for_year",
     ),
     path(
         "<int:bowl_year>/json",
-        views.json_picks_for_year,
+        with_async_view(views.json_picks_for_year, async_views.json_picks_for_year),
         name="json_picks_for_year",
     ),
+    path(
+        "<int:bowl_year>/events",
+        with_async_view(views.year_events, async_views.year_events),
+        name="year_events",
+    ),
+    path(
+        "<int:bowl_year>/events/json",
+        views.json_year_events,
+        name="json_year_events",
+    ),
+    path(
+        "<int:bowl_year>/standings",
+        views.view_standings_for_year,
+        name="view_standings_for_year",
+    ),
+    path(
+        "<int:bowl_year>/standings/json",
+        views.json_standings_for_year,
+        name="json_standings_for_year",
+    ),
+    path(
+        "<int:bowl_year>/simulate/json",
+        views.json_simulate_year,
+        name="json_simulate_year",
+    ),
     path(
         "<int:bowl_year>/my-picks",
-        views.view_my_picks_for_year,
+        with_async_view(
+            views.view_my_picks_for_year, async_views.view_my_picks_for_year
+        ),
         name="view_my_picks_for_year",
     ),
     path(
         "<int:bowl_year>/my-picks/submit",
-        views.submit_my_picks_for_year,
+        with_async_view(
+            views.submit_my_picks_for_year, async_views.submit_my_picks_for_year
+        ),
         name="submit_my_picks_for_year",
     ),
+    path("pools", views.select_pool, name="select_pool"),
     path("accounts/register", views.register_user, name="register"),
 ]
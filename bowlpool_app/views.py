@@ -1,20 +1,50 @@
-from typing import Dict, List
+import json
 import zoneinfo
 import datetime
 from itertools import groupby
 
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import authenticate, login
+from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.forms.models import model_to_dict
-from django.http import HttpResponseRedirect, JsonResponse
-from django.shortcuts import render
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
-from django.utils.translation import gettext_lazy as _
 
-from .models import BowlMatchupPick, BowlMatchup, Team
+from . import events, pick_queue
+from .cache import (
+    cache_chunks,
+    get_or_set_for_year,
+    matchup_picks_fragment_key,
+    year_cache_key,
+    year_version,
+)
+from .models import (
+    BowlMatchupPick,
+    BowlMatchup,
+    SeasonSummary,
+)
 from .forms import BowlPoolUserCreationForm
+from .pools import SESSION_KEY, current_db, select_shared
+from .replicas import replica_reads
+from .simulation import simulate_year
+from .snapshot import PickRecord, get_snapshot, get_year_picks
+from .standings import closest_margin_winners, ordered_standings
+from .submissions import CFP_CHAMPIONSHIP_NAME, parse_posted_picks, submit_picks
+
+DEFAULT_SIMULATIONS = 2000
+MAX_SIMULATIONS = 5000
 
 
 def register_user(request):
@@ -22,15 +52,13 @@ def register_user(request):
         form = BowlPoolUserCreationForm(request.POST)
 
         if form.is_valid():
-            form.save()
-
-            new_user = authenticate(
-                username=form.cleaned_data["email"],
-                password=form.cleaned_data["password1"],
+            # the password was just hashed by save(), so don't verify it again
+            login(
+                request,
+                form.save(),
+                backend="bowlpool_app.backends.CachedModelBackend",
             )
 
-            login(request, new_user)
-
             return HttpResponseRedirect(
                 reverse("view_my_picks_for_year", kwargs={"bowl_year": 2023})
             )
@@ -40,280 +68,402 @@ def register_user(request):
     return render(request, "registration/register.html", {"form": form})
 
 
+@replica_reads
 def year_index(request):
-    try:
-        years = (
-            BowlMatchup.objects.order_by("bowl_year")
-            .values_list("bowl_year")
-            .distinct()
-        )[0]
-    except IndexError:
-        years = []
-
     return render(
         request,
         "year_index.html",
         {
-            "years": years,
+            "season_summaries": select_shared(SeasonSummary.objects.all(), "leader"),
+            # a user's few pools are quicker to sort here than in SQLite
+            "pools": (
+                sorted(request.user.pools.order_by(), key=lambda p: p.name)
+                if request.user.is_authenticated
+                else []
+            ),
         },
     )
 
 
 @login_required
-def view_my_picks_for_year(request, bowl_year):
-    matchups_for_year = BowlMatchup.objects.filter(bowl_year=bowl_year)
+def select_pool(request):
+    """Switch the session to the user's pool given by the "pool" parameter's slug,
+    or to the default pool without one"""
 
-    picks_for_year = list(
-        BowlMatchupPick.objects.filter(
-            bowl_matchup__bowl_year=bowl_year, user=request.user
-        )
+    slug = request.GET.get("pool")
+
+    if not slug:
+        request.session.pop(SESSION_KEY, None)
+    else:
+        request.session[SESSION_KEY] = get_object_or_404(
+            request.user.pools, slug=slug
+        ).slug
+
+    return HttpResponseRedirect(reverse("year_index"))
+
+
+def _matchups_for_year(bowl_year):
+    return select_shared(
+        BowlMatchup.objects.filter(bowl_year=bowl_year).with_display(),
+        "away_team",
+        "home_team",
     )
 
-    picked_matchups = [p.bowl_matchup for p in picks_for_year]
 
-    cfp_matchups = BowlMatchup.objects.filter(
-        bowl_year=bowl_year, cfp_playoff_game=True
-    ).select_related("home_team", "away_team")
+class PicksTableRow:
+    """A matchup's row of the my-picks table, less the user's pick. cells is the
+    rendered, user-independent part of the row."""
 
-    cfp_teams = [t for m in cfp_matchups for t in [m.home_team, m.away_team]]
+    __slots__ = ["matchup_id", "start_time", "select_id", "options", "cells"]
 
-    for m in matchups_for_year:
-        if m not in picked_matchups:
-            picks_for_year.append(BowlMatchupPick(user=request.user, bowl_matchup=m))
+    def __init__(self, matchup, cfp_teams):
+        championship = matchup.display_bowl_game == CFP_CHAMPIONSHIP_NAME
 
-    picks_for_year.sort(key=lambda m: m.bowl_matchup.start_time)
+        self.matchup_id = matchup.id
+        self.start_time = matchup.start_time
+        self.select_id = matchup.display_bowl_game
+
+        if championship:
+            self.options = [(team.id, team.name) for team in cfp_teams]
+        else:
+            self.options = [
+                (matchup.away_team_id, matchup.display_away_team),
+                (matchup.home_team_id, matchup.display_home_team),
+            ]
+
+        self.cells = render_to_string(
+            "user_picks_for_matchup.html",
+            {"bowl_matchup": matchup, "championship": championship},
+        )
+
+
+def _picks_table_rows(snapshot):
+    """Every matchup's PicksTableRow, rendered once per snapshot"""
+
+    rows = snapshot.fragments.get("picks_table_rows")
+
+    if rows is None:
+        cfp_teams = snapshot.cfp_teams()
+        rows = [PicksTableRow(m, cfp_teams) for m in snapshot.matchups]
+        # rendering twice in a race is harmless; the results are identical
+        snapshot.fragments["picks_table_rows"] = rows
+
+    return rows
+
+
+def _my_picks_for_year_context(user, snapshot, picks, pending_picks):
+    """
+    :param picks: The user's saved picks, from snapshot.picks_for_user
+    :param pending_picks: The user's picks in the pick_queue, shown in place of
+        their saved ones
+    """
+
+    picks_for_year = [
+        (
+            PickRecord(p.bowl_matchup, user.id, *pending_picks[p.bowl_matchup.id])
+            if p.bowl_matchup.id in pending_picks
+            else p
+        )
+        for p in picks
+    ]
+
+    return {
+        "bowl_year": snapshot.bowl_year,
+        "picks_for_year": picks_for_year,
+        "picks_table": list(zip(_picks_table_rows(snapshot), picks_for_year)),
+        "cfp_teams": snapshot.cfp_teams(),
+        "now": timezone.now(),
+    }
+
+
+def _live_updates_context(bowl_year, stream):
+    """Where a year's page gets its live updates from
+
+    :param stream: Whether to stream them, which holds a connection open; only async
+        views, served under ASGI, should
+    """
+
+    return {
+        "events_url": reverse(
+            "year_events" if stream else "json_year_events", args=(bowl_year,)
+        ),
+        "events_stream": stream,
+        "events_poll_seconds": settings.BOWLPOOL_EVENTS_BROWSER_POLL_SECONDS,
+        "events_since": events.page_cursor(),
+    }
+
+
+@login_required
+def view_my_picks_for_year(request, bowl_year):
+    snapshot = get_snapshot(bowl_year)
 
     return render(
         request,
         "user_picks_for_year.html",
         {
-            "bowl_year": bowl_year,
-            "picks_for_year": picks_for_year,
-            "cfp_teams": cfp_teams,
+            **_my_picks_for_year_context(
+                request.user,
+                snapshot,
+                snapshot.picks_for_user(request.user.id),
+                pick_queue.pending_picks(current_db.get(), request.user.id, bowl_year),
+            ),
+            **_live_updates_context(bowl_year, stream=False),
         },
     )
 
 
-def view_all_picks_for_year(request, bowl_year):
-    now = timezone.now()
+def _stale_fragment_picks(stale_matchups):
+    return select_shared(
+        BowlMatchupPick.objects.filter(bowl_matchup__in=stale_matchups).order_by(
+            "bowl_matchup_id"
+        ),
+        "user",
+        "winner",
+    )
 
-    if now < datetime.datetime(2023, 12, 26, 0, tzinfo=zoneinfo.ZoneInfo("UTC")):
-        return render(
-            request,
-            "all_picks_for_year.html",
-            {"bowl_year": bowl_year, "message": "No peeking until December 26!"},
+
+def _render_fragments(stale_matchups, fragment_keys, picks):
+    """Render the all-picks blocks of the given matchups
+    :param picks: The matchups' picks, as ordered by _stale_fragment_picks
+    :return: A dict of fragment key to rendered block
+    """
+
+    picks_by_matchup_id = {
+        k: sorted(g, key=lambda p: (p.user.first_name, p.user.last_name))
+        for k, g in groupby(picks, key=lambda p: p.bowl_matchup_id)
+    }
+
+    def render_fragment(m):
+        picks = picks_by_matchup_id[m.id]
+
+        if m.final_margin is None:
+            winner_ids = []
+        else:
+            winner_ids = closest_margin_winners(
+                m.final_margin,
+                m.away_team_id,
+                m.home_team_id,
+                [(p.user_id, p.winner_id, p.margin) for p in picks],
+            )
+
+        return render_to_string(
+            "all_picks_for_matchup.html",
+            {"bowl_matchup": m, "picks": picks, "winner_ids": winner_ids},
         )
 
-    all_picks_for_year = BowlMatchupPick.objects.filter(
-        bowl_matchup__bowl_year=bowl_year,
+    # matchups nobody picked are cached as empty fragments and left off the page
+    return {
+        fragment_keys[m.id]: (render_fragment(m) if m.id in picks_by_matchup_id else "")
+        for m in stale_matchups
+    }
+
+
+def _all_picks_for_year_fragments(bowl_year):
+    """Render the all-picks block of every picked matchup in the year, reusing the
+    cached blocks of matchups whose picks and score haven't changed"""
+
+    matchups_for_year = list(_matchups_for_year(bowl_year))
+
+    fragment_keys = {m.id: matchup_picks_fragment_key(m) for m in matchups_for_year}
+    fragments = cache.get_many(fragment_keys.values())
+    stale_matchups = [
+        m for m in matchups_for_year if fragment_keys[m.id] not in fragments
+    ]
+
+    if stale_matchups:
+        new_fragments = _render_fragments(
+            stale_matchups, fragment_keys, _stale_fragment_picks(stale_matchups)
+        )
+
+        cache.set_many(new_fragments)
+        fragments.update(new_fragments)
+
+    return [
+        fragments[fragment_keys[m.id]]
+        for m in matchups_for_year
+        if fragments[fragment_keys[m.id]]
+    ]
+
+
+def _picks_revealed():
+    return timezone.now() >= datetime.datetime(
+        2023, 12, 26, 0, tzinfo=zoneinfo.ZoneInfo("UTC")
     )
 
-    picks_by_bowl_game = {}
 
-    for k, g in groupby(all_picks_for_year, key=lambda p: p.bowl_matchup):
-        picks_by_bowl_game[k] = list(g)
+@replica_reads
+def view_all_picks_for_year(request, bowl_year):
+    if not _picks_revealed():
+        return render(
+            request,
+            "all_picks_for_year.html",
+            {"bowl_year": bowl_year, "message": "No peeking until December 26!"},
+        )
 
     return render(
         request,
         "all_picks_for_year.html",
         {
             "bowl_year": bowl_year,
-            "picks_for_year": picks_by_bowl_game,
+            "picks_for_year": get_or_set_for_year(
+                "all_picks",
+                bowl_year,
+                lambda: _all_picks_for_year_fragments(bowl_year),
+            ),
+            **_live_updates_context(bowl_year, stream=False),
         },
     )
 
 
-def json_picks_for_year(request, bowl_year):
-    all_picks_for_year = BowlMatchupPick.objects.filter(
-        bowl_matchup__bowl_year=bowl_year,
-    ).values(
-        "bowl_matchup__bowl_game__name",
-        "bowl_matchup__start_time",
-        "bowl_matchup__cfp_playoff_game",
-        "bowl_matchup__away_team__name",
-        "bowl_matchup__home_team__name",
-        "bowl_matchup__away_team_final_score",
-        "bowl_matchup__home_team_final_score",
-        "user__first_name",
-        "user__last_name",
-        "winner__name",
-        "margin",
+def _events_cursor(request):
+    return events.Cursor.parse(
+        request.headers.get("Last-Event-ID") or request.GET.get("since"),
+        timezone.now(),
     )
 
-    picks_by_bowl_game: Dict[BowlMatchup, List[BowlMatchupPick]] = groupby(
-        all_picks_for_year, key=lambda p: p["bowl_matchup__bowl_game__name"]
+
+def _events_response(streaming_content):
+    return StreamingHttpResponse(
+        streaming_content,
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
     )
 
-    picks_list = []
 
-    def calculate_winners(picks):
-        margin = (
-            picks["matchup"]["away_team_score"] - picks["matchup"]["home_team_score"]
-        )
+def year_events(request, bowl_year):
+    """Score, winner and pick lock updates for the year as Server-Sent Events. Under
+    WSGI they're sent in a single batch, rather than streamed as async_views does, so
+    the request never holds a worker."""
 
-        winning_team = (
-            picks["matchup"]["away_team"]
-            if margin > 0
-            else picks["matchup"]["home_team"]
-        )
+    return _events_response(events.batch(bowl_year, _events_cursor(request)))
 
-        closest_distance = 999
 
-        name_distances = {}
+def json_year_events(request, bowl_year):
+    """Score, winner and pick lock updates for the year since the "since" cursor, for
+    pages served under WSGI to poll"""
 
-        for pick in filter(lambda p: p["winner"] == winning_team, picks["picks"]):
-            picked_margin = pick["margin"]
+    return JsonResponse(events.poll(bowl_year, _events_cursor(request)))
 
-            if pick["winner"] == picks["matchup"]["home_team"]:
-                picked_margin = -picked_margin
 
-            distance = abs(picked_margin - margin)
+def _json_pick_object(year_picks, matchup, picks):
+    """Serialize one matchup of a snapshot and its picks"""
 
-            if distance < closest_distance:
-                closest_distance = distance
+    pick_object = {
+        "matchup": {
+            "bowl_game": matchup.display_bowl_game,
+            "start_time": matchup.start_time,
+            "home_team": matchup.display_home_team,
+            "away_team": matchup.display_away_team,
+            "cfp_playoff_game": matchup.cfp_playoff_game,
+            "away_team_score": matchup.away_team_final_score,
+            "home_team_score": matchup.home_team_final_score,
+        },
+        "picks": [
+            {
+                "name": year_picks.user_names[p.user_id],
+                "winner": year_picks.teams_by_id[p.winner_id].name,
+                "margin": p.margin,
+            }
+            for p in picks
+        ],
+    }
+
+    if matchup.final_margin is not None:
+        pick_object["winners"] = sorted(
+            year_picks.user_names[user_id]
+            for user_id in year_picks.snapshot.winners_by_matchup.get(matchup.id, [])
+        )
 
-            name_distances[pick["name"]] = distance
+    pick_object["picks"].sort(key=lambda p: p["name"])
 
-        return [
-            name
-            for name, distance in name_distances.items()
-            if distance == closest_distance
-        ]
+    return json.dumps(pick_object, cls=DjangoJSONEncoder)
 
-    for matchup, picks in picks_by_bowl_game:
-        picks = list(picks)
 
-        pick_object = {
-            "matchup": {
-                "bowl_game": matchup,
-                "start_time": picks[0]["bowl_matchup__start_time"],
-                "home_team": picks[0]["bowl_matchup__home_team__name"],
-                "away_team": picks[0]["bowl_matchup__away_team__name"],
-                "cfp_playoff_game": picks[0]["bowl_matchup__cfp_playoff_game"],
-                "away_team_score": picks[0]["bowl_matchup__away_team_final_score"],
-                "home_team_score": picks[0]["bowl_matchup__home_team_final_score"],
-            },
-            "picks": [
-                {
-                    "name": " ".join((p["user__first_name"], p["user__last_name"])),
-                    "winner": p["winner__name"],
-                    "margin": p["margin"],
-                }
-                for p in picks
-            ],
-        }
+def _json_picks_for_year_chunks(year_picks):
+    """Yield the JSON for a year's picked matchups one object at a time, byte for
+    byte what JsonResponse would produce for the whole list"""
 
-        if (
-            pick_object["matchup"]["away_team_score"] is not None
-            and pick_object["matchup"]["home_team_score"] is not None
-        ):
-            pick_object["winners"] = calculate_winners(pick_object)
+    yield "["
 
-        pick_object["picks"].sort(key=lambda p: p["name"])
+    picked_matchups = [
+        m for m in year_picks.snapshot.matchups if year_picks.picks_by_matchup[m.id]
+    ]
 
-        picks_list.append(pick_object)
+    for i, m in enumerate(picked_matchups):
+        if i:
+            yield ", "
 
-    return JsonResponse(picks_list, safe=False)
+        yield _json_pick_object(year_picks, m, year_picks.picks_by_matchup[m.id])
 
+    yield "]"
 
-@login_required
-def submit_my_picks_for_year(request, bowl_year):
-    picks_for_matchups = {}
-    now = timezone.now()
 
-    # TODO: create a custom form for picks
-    for form_key in request.POST.keys():
-        if "-" not in form_key:
-            continue
-
-        key, matchup_type = form_key.split("-")
-        pick_for_matchup = picks_for_matchups.get(key, {})
-        pick_for_matchup[matchup_type] = request.POST[form_key]
-        picks_for_matchups[key] = pick_for_matchup
-
-    champ_matchup_id = None
-    champ_pick = None
+@replica_reads
+def json_picks_for_year(request, bowl_year):
+    version = year_version(bowl_year)
+    key = year_cache_key("json_picks", bowl_year, version)
+    cached_json = cache.get(key)
+
+    if cached_json is not None:
+        return HttpResponse(cached_json, content_type="application/json")
+
+    return StreamingHttpResponse(
+        cache_chunks(
+            key, _json_picks_for_year_chunks(get_year_picks(bowl_year, version))
+        ),
+        content_type="application/json",
+    )
 
-    for matchup_id, pick in picks_for_matchups.items():
-        bowl_matchup = BowlMatchup.objects.get(id=matchup_id)
 
-        if now >= bowl_matchup.start_time:
-            continue
+def _standings_for_year(bowl_year):
+    return [
+        {"name": s.user.get_full_name(), "wins": s.wins}
+        for s in ordered_standings(bowl_year)
+    ]
 
-        if bowl_matchup.bowl_game.name == "CFP National Championship":
-            # we'll deal with this after everything else is persisted
-            champ_matchup_id = matchup_id
-            champ_pick = pick
-            continue
 
-        if not pick["winner"] or not pick["margin"]:
-            messages.error(
-                request, _(f"Matchup {bowl_matchup.display_name} not picked")
-            )
+@replica_reads
+def view_standings_for_year(request, bowl_year):
+    return render(
+        request,
+        "standings_for_year.html",
+        {
+            "bowl_year": bowl_year,
+            "standings": _standings_for_year(bowl_year),
+        },
+    )
 
-            continue
 
-        winner = Team(id=pick["winner"])
-        margin = int(pick["margin"])
+@replica_reads
+def json_standings_for_year(request, bowl_year):
+    return JsonResponse(_standings_for_year(bowl_year), safe=False)
 
-        try:
-            db_pick = BowlMatchupPick.objects.get(
-                user=request.user, bowl_matchup=bowl_matchup
-            )
 
-            db_pick.winner = winner
-            db_pick.margin = margin
-        except BowlMatchupPick.DoesNotExist:
-            db_pick = BowlMatchupPick(
-                user=request.user,
-                bowl_matchup=bowl_matchup,
-                winner=winner,
-                margin=margin,
-            )
+@login_required
+def json_simulate_year(request, bowl_year):
+    try:
+        simulations = int(request.GET.get("simulations", DEFAULT_SIMULATIONS))
+    except ValueError:
+        return HttpResponseBadRequest("simulations must be a number")
+
+    simulations = max(1, min(simulations, MAX_SIMULATIONS))
+
+    # the results only change with the picks and scores, so each version of the
+    # year is simulated once
+    return JsonResponse(
+        get_or_set_for_year(
+            f"simulate_year_{simulations}",
+            bowl_year,
+            lambda: simulate_year(bowl_year, simulations),
+        )
+    )
 
-        db_pick.full_clean()
-        db_pick.save()
 
-    if not champ_pick["winner"] or not champ_pick["margin"]:
-        messages.error(request, _("CFP National Championship not picked"))
-    else:
-        playoff_picks = list(
-            BowlMatchupPick.objects.filter(
-                user=request.user, bowl_matchup__cfp_playoff_game=True
-            )
-        )
+@login_required
+def submit_my_picks_for_year(request, bowl_year):
+    picks_for_matchups = parse_posted_picks(request.POST)
 
-        if len(playoff_picks) != 2:
-            messages.error(request, _("Pick the CFP semifinal games before the final!"))
-        else:
-            print(champ_pick["winner"])
-            champ_winner = Team(id=int(champ_pick["winner"]))
-            champ_margin = int(champ_pick["margin"])
-
-            if not any(champ_winner.id == pick.winner.id for pick in playoff_picks):
-                messages.error(
-                    request, _("Champ pick must be one of your semifinal winners")
-                )
-            else:
-                champ_matchup = BowlMatchup.objects.get(id=champ_matchup_id)
-
-                if now < champ_matchup.start_time:
-                    try:
-                        db_pick = BowlMatchupPick.objects.get(
-                            user=request.user, bowl_matchup=champ_matchup
-                        )
-
-                        db_pick.winner = champ_winner
-                        db_pick.margin = champ_margin
-                    except BowlMatchupPick.DoesNotExist:
-                        db_pick = BowlMatchupPick(
-                            user=request.user,
-                            bowl_matchup=champ_matchup,
-                            winner=champ_winner,
-                            margin=champ_margin,
-                        )
-
-                    db_pick.full_clean()
-                    db_pick.save()
+    for error in submit_picks(request.user, bowl_year, picks_for_matchups):
+        messages.error(request, error)
 
     return HttpResponseRedirect(reverse("view_my_picks_for_year", args=(bowl_year,)))
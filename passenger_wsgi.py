@@ -1,5 +1,6 @@
 import os
 import sys
+from urllib.parse import unquote
 
 from django.core.wsgi import get_wsgi_application
 
@@ -7,6 +8,10 @@ from django.core.wsgi import get_wsgi_application
 sys.path.append(os.getcwd())
 os.environ["DJANGO_SETTINGS_MODULE"] = "bowlpool.settings"
 
+# bowlpool is importable once the path is set up
+from bowlpool.static import StaticFilesMiddleware  # noqa: E402
+from bowlpool.warmup import warmup_application  # noqa: E402
+
 # Set script name for the PATH_INFO fix below
 SCRIPT_NAME = os.getcwd()
 
@@ -20,8 +25,6 @@ class PassengerPathInfoFix(object):
         self.app = app
 
     def __call__(self, environ, start_response):
-        from urllib.parse import unquote
-
         environ["SCRIPT_NAME"] = SCRIPT_NAME
         request_uri = unquote(environ["REQUEST_URI"])
         script_name = unquote(environ.get("SCRIPT_NAME", ""))
@@ -33,5 +36,6 @@ class PassengerPathInfoFix(object):
 
 
 # Set the application
-application = get_wsgi_application()
+application = warmup_application(get_wsgi_application())
+application = StaticFilesMiddleware(application)
 application = PassengerPathInfoFix(application)
@@ -0,0 +1,87 @@
+// Applies a year's live updates to the matchups on the page marked with
+// data-matchup-id. #live-updates gives the URL and starting point, and whether to
+// stream the updates (data-stream) or poll for them every data-poll-seconds.
+(() => {
+  const config = document.getElementById("live-updates");
+
+  if (!config) {
+    return;
+  }
+
+  const streaming = "stream" in config.dataset;
+
+  if (streaming && !window.EventSource) {
+    return;
+  }
+
+  const url = new URL(config.dataset.eventsUrl, window.location.href);
+  url.searchParams.set("since", config.dataset.since);
+
+  const handlers = {};
+
+  const matchupElements = (matchupId) =>
+    document.querySelectorAll(`[data-matchup-id="${matchupId}"]`);
+
+  const handle = (kind, apply) => {
+    handlers[kind] = (data) => {
+      for (const element of matchupElements(data.matchup)) {
+        apply(element, data);
+      }
+    };
+  };
+
+  handle("score", (element, data) => {
+    const finished =
+      data.away_team_score !== null && data.home_team_score !== null;
+
+    for (const score of element.querySelectorAll(".final-score")) {
+      score.textContent = finished
+        ? `(${data.away_team_score} - ${data.home_team_score})`
+        : "";
+    }
+  });
+
+  handle("winners", (element, data) => {
+    const winnerIds = new Set(data.winners.map((w) => String(w.user_id)));
+
+    for (const pick of element.querySelectorAll("[data-user-id]")) {
+      pick.classList.toggle("fw-bold", winnerIds.has(pick.dataset.userId));
+    }
+  });
+
+  handle("lock", (element) => {
+    for (const input of element.querySelectorAll("select, input")) {
+      input.disabled = true;
+    }
+  });
+
+  if (streaming) {
+    // the browser reconnects on its own, resuming from the last id it was sent
+    const source = new EventSource(url);
+
+    for (const [kind, apply] of Object.entries(handlers)) {
+      source.addEventListener(kind, (event) => apply(JSON.parse(event.data)));
+    }
+  } else {
+    const poll = async () => {
+      try {
+        const response = await fetch(url, {
+          headers: { Accept: "application/json" },
+        });
+
+        if (response.ok) {
+          const { since, updates } = await response.json();
+          url.searchParams.set("since", since);
+
+          for (const { kind, data } of updates) {
+            handlers[kind](data);
+          }
+        }
+      } finally {
+        setTimeout(poll, config.dataset.pollSeconds * 1000);
+      }
+    };
+
+    setTimeout(poll, config.dataset.pollSeconds * 1000);
+  }
+})();
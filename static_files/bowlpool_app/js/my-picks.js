@@ -0,0 +1,46 @@
+// TODO make this more generic - this is hard-coded for 2023
+const champSelector = document.getElementsByName("26-winner")[0];
+const semifinalOneSelector = document.getElementsByName("24-winner")[0];
+const semifinalTwoSelector = document.getElementsByName("25-winner")[0];
+
+const originalChampOptions = [];
+
+for (const o of champSelector.children) {
+  originalChampOptions.push(o.cloneNode(true));
+}
+
+semifinalChangeListener = () => {
+  const optionsToRemove = [];
+  const semiOneSelection = semifinalOneSelector.options[semifinalOneSelector.selectedIndex];
+  const semiTwoSelection = semifinalTwoSelector.options[semifinalTwoSelector.selectedIndex];
+
+  for (let i = 0; i < champSelector.children.length; i++) {
+    const option = champSelector.children[i];
+
+    if (option.value !== '' && (
+      !option.selected || (option.value !== semiOneSelection.value && option.value !== semiTwoSelection.value))) {
+      optionsToRemove.push(i);
+    }
+  }
+
+  // remove in reverse order so we don't goof up the indices
+  optionsToRemove.sort((a, b) => b - a);
+
+  for (const i of optionsToRemove) {
+    champSelector.remove(i);
+  }
+
+
+
+  for (const o of originalChampOptions) {
+    if (o.value !== '' && o.value !== champSelector.selectedOptions[0].value && (o.value === semiOneSelection.value || o.value === semiTwoSelection.value)) {
+      champSelector.appendChild(o);
+    }
+  }
+}
+
+semifinalOneSelector.onchange = semifinalChangeListener;
+semifinalTwoSelector.onchange = semifinalChangeListener;
+
+// fire the listener once to set initial state correctly
+semifinalChangeListener();